@@ -0,0 +1,508 @@
+"""Benchmarks for DiSi's hot paths: batch analysis, the playback callback, GUI updates and spectrum streaming.
+
+    python benchmark.py [-o results.json] [--quick] [--only NAME]
+    python benchmark.py compare old.json new.json [--threshold 10]
+    python benchmark.py imports [module ...]
+
+Every case runs headlessly in its own spawned process so peak RSS is per case. Inputs
+are synthetic WAV files (tones, chirps, noise, silence at several lengths, sample rates
+and channel counts) plus the bundled test.wav. GUI cases use Qt's offscreen platform.
+`imports` prints a `python -X importtime` report of the slowest imports per module.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+import numpy as np
+from scipy.io import wavfile
+from scipy.signal import chirp
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_WAV = os.path.join(BENCH_DIR, 'test.wav')
+SIGNAL_KINDS = ('tone', 'chirp', 'noise', 'silence', 'sparse')
+# (sample rate, channels) combinations analysed for every signal kind
+FORMATS = ((44100, 1), (48000, 2), (96000, 2), (44100, 6))
+CALLBACK_BLOCK_SIZES = (256, 1024)
+# Metric compared by `compare` for each kind of result, and whether higher is better
+KEY_METRICS = {'analysis': ('throughput', True), 'callback': ('p99_us', False), 'fft_at_position': ('p99_us', False),
+               'update_plot': ('p99_us', False), 'first_plot': ('time_to_first_plot_s', False),
+               'cold_start': ('window_shown_s', False), 'stream': ('p99_ms', False)}
+COLD_START_BUDGET_S = 1.5  # Fresh interpreter to first painted window; the run fails beyond it
+GUI_MODULES = ('PyQt5', 'pyqtgraph', 'sounddevice')  # Must not be imported by the analysis core
+IMPORT_REPORT_MODULES = ('disi', 'disi.batch', 'disi.stream', 'disi.gui')
+
+
+def synth(kind, seconds, sample_rate, channels, seed=0):
+    """Return a float32 samples x channels test signal; channels differ slightly so mixes are non-trivial."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    rng = np.random.default_rng(seed)
+    columns = []
+    for ch in range(channels):
+        if kind == 'tone':
+            f0 = 440.0 * (1 + 0.01 * ch)
+            signal = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+        elif kind == 'chirp':
+            signal = chirp(t, 20, max(seconds, 1e-3), 0.45 * sample_rate, method='logarithmic', phi=30 * ch)
+        elif kind == 'noise':
+            signal = rng.standard_normal(len(t))
+        elif kind == 'silence':
+            signal = np.zeros(len(t))
+        elif kind == 'sparse':  # Half-second tone bursts every 5 s over a faint noise floor: 90% silence
+            burst = (t % 5.0) < 0.5
+            signal = np.sin(2 * np.pi * 440.0 * (1 + 0.01 * ch) * t) * burst + 1e-4 * rng.standard_normal(len(t))
+        else:
+            raise ValueError(f"Unknown signal kind {kind}")
+        columns.append(signal)
+    data = np.column_stack(columns)
+    peak = np.max(np.abs(data))
+    return (data / peak * 0.5 if peak > 0 else data).astype(np.float32)
+
+
+def write_synth(directory, kind, seconds, sample_rate, channels):
+    """Write a 16-bit synthetic WAV file (the common, memory-mapped case) and return its path."""
+    path = os.path.join(directory, f"{kind}_{seconds:g}s_{sample_rate}hz_{channels}ch.wav")
+    if not os.path.exists(path):
+        wavfile.write(path, sample_rate, (synth(kind, seconds, sample_rate, channels) * 32767).astype(np.int16))
+    return path
+
+
+def percentiles(samples_s, unit=1e6, suffix='us'):
+    """Summarise a list of durations in seconds as percentiles in the given unit."""
+    values = np.asarray(samples_s) * unit
+    summary = {f"p{p:g}_{suffix}": float(np.percentile(values, p)) for p in (50, 90, 99, 99.9)}
+    summary.update({f"max_{suffix}": float(values.max()), f"mean_{suffix}": float(values.mean()), 'count': len(values)})
+    return summary
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in KiB on Linux
+
+
+def bench_analysis(path, repeats, bands=None):
+    """Throughput of the block-wise peak-track analysis of a file, as the GUI worker runs it, optionally with bands."""
+    import disi
+    config = disi.AnalysisConfig(bands=bands)
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        reader = disi.WavReader(path)
+        data = disi.MappedAudio(reader)
+        data.compute_gain()
+        _, _, mix = disi.channel_mixes(reader.channels)
+        n_frames = config.frame_count(len(data))
+        spectrogram = disi.SpectrogramImage(n_frames, config.plan(reader.sample_rate).n_bins, mix.shape[1])
+        band_tracks = None if bands is None else disi.BandTracks(config.filterbank, n_frames, mix.shape[1])
+        disi.compute_peak_tracks(data, reader.sample_rate, config, mix=mix, spectrogram=spectrogram, bands=band_tracks)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    audio_seconds = reader.n_frames / reader.sample_rate
+    return {'kind': 'analysis', 'audio_seconds': audio_seconds, 'sample_rate': reader.sample_rate,
+            'channels': reader.channels, 'wall_seconds': best, 'throughput': audio_seconds / best}
+
+
+def bench_callback(path, block_size, seconds):
+    """Latency of the playback callback body (read_into + ring write) with the analyzer thread running."""
+    import disi
+    from disi import realtime
+    reader = disi.WavReader(path)
+    data = disi.MappedAudio(reader)
+    data.compute_gain()
+    channels = reader.channels
+    config = disi.DEFAULT_CONFIG
+    ring = realtime.SampleRing(max(config.fft_size * 8, reader.sample_rate // 2), channels)
+    spectrogram = realtime.SpectrogramRing(realtime.SPECTROGRAM_LIVE_COLUMNS, config.plan(reader.sample_rate).n_bins)
+    _, _, mix = disi.channel_mixes(channels)
+    analyzer = realtime.SpectrumAnalyzer(ring, reader.sample_rate, realtime.LatestMailbox(), realtime.SpectrumCache(),
+                                         ('ch1', mix[:, 0]), config=config, spectrogram=spectrogram)
+    outdata = np.zeros((block_size, channels), dtype=np.float32)
+    period = block_size / reader.sample_rate
+    latencies = []
+    position = 0
+    analyzer.start()
+    try:
+        deadline = time.perf_counter()
+        for _ in range(int(seconds / period)):
+            # Pace the calls like a device would so the analyzer competes realistically
+            deadline += period
+            started = time.perf_counter()
+            n = data.read_into(position, outdata)
+            ring.write(outdata[:n])
+            position = position + n if n == block_size else 0
+            latencies.append(time.perf_counter() - started)
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+    finally:
+        analyzer.stop()
+    result = {'kind': 'callback', 'block_size': block_size, 'sample_rate': reader.sample_rate,
+              'channels': channels, 'budget_us': period * 1e6}
+    result.update(percentiles(latencies))
+    return result
+
+
+def bench_stream(path, clients, seconds, encoding, delta):
+    """Loopback spectrum streaming: capture-to-receive latency and delivery to fast clients beside one slow client.
+
+    The server replays path in real time with a short hop; the clients connect over
+    127.0.0.1 and decode every frame. The slow client reads one frame every 50 ms through
+    a small receive buffer, so the server must drop its frames (dropped) without
+    delaying the others.
+    """
+    import socket
+    import asyncio
+    import threading
+    import disi
+    from disi import realtime, stream
+    reader = disi.WavReader(path)
+    data = disi.MappedAudio(reader)
+    data.compute_gain()
+    config = disi.AnalysisConfig(hop=disi.CHUNK_SIZE // 4)
+    started, stop = threading.Event(), threading.Event()
+    servers = []
+
+    def on_started(server):
+        servers.append(server)
+        started.set()
+
+    def make_source():
+        return realtime.FakeDeviceSource(data, reader.sample_rate)
+
+    server_thread = threading.Thread(target=lambda: asyncio.run(stream.serve(
+        make_source, config, '127.0.0.1', 0, encoding, delta, started=on_started, stop=stop)))
+    server_thread.start()
+    started.wait()
+    port = servers[0].port
+
+    async def client(slow, latencies, stats):
+        sock = socket.socket()
+        if slow:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ('127.0.0.1', port))
+        reader, writer = await asyncio.open_connection(sock=sock, limit=4096 if slow else 1 << 16)
+        decoder = stream.FrameDecoder(json.loads((await stream.read_message_async(reader))[1:]))
+        received = bytes_received = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            payload = await stream.read_message_async(reader)
+            if payload is None:
+                break
+            _, _, captured, _ = decoder.decode(payload)
+            if not slow:
+                latencies.append(time.time() - captured)
+            received += 1
+            bytes_received += len(payload) + stream.MESSAGE_LENGTH.size
+            if slow:
+                await asyncio.sleep(0.05)
+        writer.close()
+        stats.append({'slow': slow, 'received': received, 'missed': decoder.missed, 'bytes': bytes_received})
+
+    async def run_clients():
+        tasks = [client(i == clients - 1, latencies, stats) for i in range(clients)]
+        await asyncio.gather(*tasks)
+
+    latencies, stats = [], []
+    try:
+        asyncio.run(run_clients())
+    finally:
+        stop.set()
+        server_thread.join()
+    fast = [s for s in stats if not s['slow']]
+    slow = [s for s in stats if s['slow']][0]
+    delivery = min(s['received'] / max(1, s['received'] + s['missed']) for s in fast)
+    budget_s = realtime.LIVE_LATENCY_BUDGET_MS / 1000
+    result = {'kind': 'stream', 'clients': clients, 'encoding': encoding, 'delta': delta, 'seconds': seconds,
+              'frames_per_s': sum(s['received'] for s in stats) / seconds,
+              'bytes_per_frame': sum(s['bytes'] for s in fast) / max(1, sum(s['received'] for s in fast)),
+              'fast_delivery': delivery, 'slow_received': slow['received'], 'dropped': servers[0].dropped,
+              'budget_s': budget_s}
+    result.update(percentiles(latencies, unit=1e3, suffix='ms'))
+    result['within_budget'] = result['p99_ms'] <= budget_s * 1e3
+    return result
+
+
+def make_window(path):
+    """Show an offscreen main window for path (without the disk cache) and wait for its analysis."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from disi.gui import RealTimeFFT
+    app = QApplication.instance() or QApplication([])
+    started = time.perf_counter()
+    window = RealTimeFFT(audio_file=path, cache_dir=None)
+    window.show()
+    first_plot = None
+    while window.analysis_job_id == 0 or window.analysis_worker is not None:  # Loading starts after the first paint
+        app.processEvents()
+        if first_plot is None and window.track_len > 0:
+            first_plot = time.perf_counter() - started
+        time.sleep(0.001)
+    return app, window, first_plot, time.perf_counter() - started
+
+
+def bench_first_plot(path):
+    """Time from opening a file until the first peak-track block is plotted, and until analysis ends."""
+    app, window, first_plot, analysed = make_window(path)
+    result = {'kind': 'first_plot', 'time_to_first_plot_s': first_plot, 'time_to_full_analysis_s': analysed,
+              'audio_seconds': window.total_duration}
+    window.close()
+    return result
+
+
+def bench_fft_at_position(path, count, warm):
+    """Latency of compute_fft_at_position at random positions, with a cold or warm spectrum cache."""
+    app, window, _, _ = make_window(path)  # app must stay referenced while the window is in use
+    positions = np.random.default_rng(1).integers(0, len(window.data), count)
+    if warm:
+        for position in positions:
+            window.compute_fft_at_position(position)
+    latencies = []
+    for position in positions:
+        if not warm:
+            window.spectrum_cache.clear()
+        started = time.perf_counter()
+        window.compute_fft_at_position(position)
+        latencies.append(time.perf_counter() - started)
+    window.close()
+    result = {'kind': 'fft_at_position', 'cache': 'warm' if warm else 'cold'}
+    result.update(percentiles(latencies))
+    return result
+
+
+def bench_update_plot(path, count):
+    """Latency of one playback display update: new spectrum, scrolling spectrogram and time label."""
+    from disi import realtime
+    app, window, _, _ = make_window(path)
+    config = window.analysis_config
+    n_bins = config.plan(window.sample_rate).n_bins
+    spectra = [window.compute_fft_at_position(i * config.hop) for i in range(min(count, len(window.track_times)))]
+    # Stand in for a running stream: the analyzer would fill the mailbox and the spectrogram ring
+    window.spectrogram_ring = realtime.SpectrogramRing(realtime.SPECTROGRAM_LIVE_COLUMNS, n_bins)
+    window.is_playing = True
+    latencies = []
+    for i in range(count):
+        spectrum = spectra[i % len(spectra)]
+        window.mailbox.put(spectrum)
+        window.spectrogram_ring.write(i, spectrum[1])
+        window.start_idx = (i * config.hop) % len(window.data)
+        started = time.perf_counter()
+        window.update_plot()
+        for widget in (window.fft_plot_widget, window.spectrogram_plot_widget):
+            widget.grab()  # Force the repaint the timer tick would cause
+        latencies.append(time.perf_counter() - started)
+        app.processEvents()
+    window.is_playing = False
+    window.spectrogram_ring = None
+    window.close()
+    result = {'kind': 'update_plot', 'fps_at_p99': 1 / np.percentile(latencies, 99)}
+    result.update(percentiles(latencies))
+    return result
+
+
+COLD_START_SCRIPT = """
+import os, sys, time
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5.QtWidgets import QApplication
+from disi.gui import RealTimeFFT
+app = QApplication([])
+window = RealTimeFFT(audio_file={path!r}, cache_dir=None)
+window.show()
+while window.pending_file is not None:  # Cleared by the first paint
+    app.processEvents()
+print('window_shown_s', flush=True)
+while window.track_len == 0:
+    app.processEvents()
+    time.sleep(0.001)
+print('first_plot_s', flush=True)
+"""
+
+
+def bench_cold_start(path):
+    """Wall time from launching a fresh interpreter until the window has painted and until the first plot."""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', COLD_START_SCRIPT.format(path=path)], cwd=BENCH_DIR,
+                               stdout=subprocess.PIPE, text=True)
+    result = {'kind': 'cold_start', 'budget_s': COLD_START_BUDGET_S}
+    for line in process.stdout:
+        result[line.strip()] = time.perf_counter() - started
+    if process.wait() != 0 or 'first_plot_s' not in result:
+        raise RuntimeError(f"Startup script exited with status {process.returncode}")
+    result['within_budget'] = result['window_shown_s'] <= COLD_START_BUDGET_S
+    result['slowest_imports'] = import_times('disi.gui')[:10]
+    return result
+
+
+def import_times(module):
+    """Run `python -X importtime -c "import module"` and return [(name, cumulative_ms)], slowest first."""
+    with tempfile.TemporaryFile('w+') as log:
+        subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], cwd=BENCH_DIR,
+                       stderr=log, check=True)
+        log.seek(0)
+        times = []
+        for line in log:
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times.append((name.strip(), int(cumulative) / 1000))
+    return sorted(times, key=lambda item: -item[1])
+
+
+def run_imports(argv):
+    parser = argparse.ArgumentParser(prog='benchmark.py imports', description="Report the slowest imports of DiSi's modules.")
+    parser.add_argument('modules', nargs='*', default=IMPORT_REPORT_MODULES)
+    parser.add_argument('-n', '--top', type=int, default=15, help="Imports listed per module (default: 15)")
+    args = parser.parse_args(argv)
+    failures = 0
+    for module in args.modules:
+        times = import_times(module)
+        total = next(ms for name, ms in times if name == module)
+        print(f"{module}: {total:.0f} ms")
+        for name, ms in times[:args.top]:
+            print(f"  {ms:8.1f} ms  {name}")
+        if not module.startswith('disi.gui'):
+            loaded = sorted({name.split('.')[0] for name, _ in times} & set(GUI_MODULES))
+            if loaded:
+                print(f"  imports GUI or audio modules: {', '.join(loaded)}")
+                failures += 1
+    return 1 if failures else 0
+
+
+def run_case(queue, func, args):
+    """Child process entry point: run one benchmark and report its result with the peak RSS."""
+    try:
+        result = func(*args)
+        result['peak_rss_mb'] = peak_rss_mb()
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+    queue.put(result)
+
+
+def plan_cases(quick, directory):
+    """Return (name, function, args) for every benchmark case."""
+    seconds = 5 if quick else 60
+    repeats = 1 if quick else 3
+    cases = []
+    for kind in SIGNAL_KINDS:
+        for sample_rate, channels in FORMATS:
+            path = write_synth(directory, kind, seconds, sample_rate, channels)
+            cases.append((f"analysis/{kind}/{seconds}s/{sample_rate}hz/{channels}ch", bench_analysis, (path, repeats)))
+    for length in ((1, 30) if quick else (1, 600)):
+        path = write_synth(directory, 'chirp', length, 44100, 2)
+        cases.append((f"analysis/chirp/{length}s/44100hz/2ch", bench_analysis, (path, repeats)))
+    cases.append(("analysis/test.wav", bench_analysis, (TEST_WAV, repeats)))
+    path = write_synth(directory, 'noise', seconds, 48000, 2)
+    for bands in ('third-octave', 'mel:64'):
+        cases.append((f"analysis/noise/{seconds}s/48000hz/2ch/bands-{bands}", bench_analysis, (path, repeats, bands)))
+    callback_seconds = 2 if quick else 10
+    for block_size in CALLBACK_BLOCK_SIZES:
+        cases.append((f"callback/test.wav/{block_size}", bench_callback, (TEST_WAV, block_size, callback_seconds)))
+    multichannel = write_synth(directory, 'noise', seconds, 48000, 6)
+    cases.append(("callback/noise/48000hz/6ch/256", bench_callback, (multichannel, 256, callback_seconds)))
+    count = 200 if quick else 2000
+    cases.append(("cold_start/test.wav", bench_cold_start, (TEST_WAV,)))
+    cases.append(("first_plot/test.wav", bench_first_plot, (TEST_WAV,)))
+    cases.append((f"first_plot/chirp/{seconds * 10}s", bench_first_plot,
+                  (write_synth(directory, 'chirp', seconds * 10, 44100, 2),)))
+    cases.append(("fft_at_position/test.wav/cold", bench_fft_at_position, (TEST_WAV, count, False)))
+    cases.append(("fft_at_position/test.wav/warm", bench_fft_at_position, (TEST_WAV, count, True)))
+    cases.append(("update_plot/test.wav", bench_update_plot, (TEST_WAV, count)))
+    stream_seconds = 3 if quick else 10
+    for encoding, delta in (('uint8', True), ('float16', False)):
+        for clients in (2, 8):
+            cases.append((f"stream/{encoding}{'-delta' if delta else ''}/{clients}clients", bench_stream,
+                          (TEST_WAV, clients, stream_seconds, encoding, delta)))
+    return cases
+
+
+def environment():
+    """Describe the machine and code version so results from different runs can be matched up."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit or None, 'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+
+
+def run_benchmarks(argv):
+    parser = argparse.ArgumentParser(description="Run the DiSi benchmark suite and save the results as JSON.")
+    parser.add_argument('-o', '--output', default='benchmark.json', help="Result file (default: benchmark.json)")
+    parser.add_argument('--quick', action='store_true', help="Shorter signals and fewer repeats, for a smoke run")
+    parser.add_argument('--only', help="Run only cases whose name contains this text")
+    parser.add_argument('--data-dir', help="Keep generated WAV files here instead of a temporary directory")
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context('spawn')  # A fresh process per case, so peak RSS is per case
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.data_dir or tmp
+        os.makedirs(directory, exist_ok=True)
+        cases = [case for case in plan_cases(args.quick, directory) if not args.only or args.only in case[0]]
+        for count, (name, func, case_args) in enumerate(cases, 1):
+            queue = context.Queue()
+            process = context.Process(target=run_case, args=(queue, func, case_args))
+            process.start()
+            result = queue.get()
+            process.join()
+            results[name] = result
+            print(f"[{count}/{len(cases)}] {name}: {format_result(result)}")
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'quick': args.quick, 'results': results}, f, indent=2)
+    print(f"Saved {len(results)} results to {args.output}")
+    return 1 if any('error' in result or result.get('within_budget') is False for result in results.values()) else 0
+
+
+def format_result(result):
+    if 'error' in result:
+        return f"error: {result['error']}"
+    metric, _ = KEY_METRICS[result['kind']]
+    over = f" (over the {result['budget_s']:g} s budget)" if result.get('within_budget') is False else ""
+    if result['kind'] == 'stream':
+        over = (f", {result['frames_per_s']:.0f} frames/s, fast clients got {result['fast_delivery']:.1%}, "
+                f"{result['dropped']} dropped for being slow{over}")
+    return f"{metric}={result[metric]:.4g}{over}, peak RSS {result['peak_rss_mb']:.0f} MB"
+
+
+def run_compare(argv):
+    parser = argparse.ArgumentParser(prog='benchmark.py compare', description="Compare two benchmark result files.")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help="Percent change reported as a regression (default: 10)")
+    args = parser.parse_args(argv)
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    with open(args.candidate) as f:
+        candidate = json.load(f)['results']
+
+    regressions = 0
+    for name in sorted(set(baseline) & set(candidate)):
+        old, new = baseline[name], candidate[name]
+        if 'error' in old or 'error' in new:
+            continue
+        metric, higher_is_better = KEY_METRICS[new['kind']]
+        change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+        worse = -change if higher_is_better else change
+        flag = ''
+        if worse > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif worse < -args.threshold:
+            flag = '  improved'
+        print(f"{name}: {metric} {old[metric]:.4g} -> {new[metric]:.4g} ({change:+.1f}%), "
+              f"peak RSS {old['peak_rss_mb']:.0f} -> {new['peak_rss_mb']:.0f} MB{flag}")
+    for name in sorted(set(baseline) ^ set(candidate)):
+        print(f"{name}: only in {'baseline' if name in baseline else 'candidate'}")
+    print(f"{regressions} regressions beyond {args.threshold:g}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'compare':
+        sys.exit(run_compare(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'imports':
+        sys.exit(run_imports(sys.argv[2:]))
+    sys.exit(run_benchmarks(sys.argv[1:]))
@@ -0,0 +1,15 @@
+"""DiSi's analysis core: the spectral engine, WAV reading and the analysis cache.
+
+    from disi import AnalysisConfig, MappedAudio, WavReader, compute_peak_tracks
+
+Nothing here needs Qt, pyqtgraph or sounddevice, and scipy is only imported once the
+first analysis plan is built. The window lives in disi.gui, the real-time pipeline in
+disi.realtime, the batch command line in disi.batch and the spectrum streaming server in
+disi.stream; import those explicitly.
+"""
+from .engine import (AnalysisConfig, AnalysisPlan, DEFAULT_CONFIG, CHUNK_SIZE, WINDOW_TYPES, PEAK_INTERPOLATIONS,
+                     SILENCE_DB, BAND_SCALES, SpectrogramImage, ActivityIndex, Filterbank, BandTracks, frame_power,
+                     frame_spectra_db, frame_peaks, power_peaks, channel_mixes, iter_peak_tracks, compute_peak_tracks,
+                     frame_levels, activity_index)
+from .wav import WavReader, MappedAudio
+from .cache import AnalysisCache, analysis_params, file_fingerprint
@@ -0,0 +1,117 @@
+"""Plot markers kept in numpy arrays, with CSV import and export."""
+import os
+import csv
+import tempfile
+import numpy as np
+
+MARKER_COLUMNS = ('time_s', 'freq_hz', 'power_db', 'label')
+MARKER_SUFFIX = '.markers.csv'  # Markers of <file> are kept next to it in <file>.markers.csv
+
+
+def marker_path(audio_file):
+    """The CSV file holding the markers of an audio file."""
+    return audio_file + MARKER_SUFFIX
+
+
+def visible_markers(xs, x0, x1, max_labels):
+    """Indices of the markers with x0 <= x <= x1, and of at most max_labels of them, evenly spread, to label."""
+    visible = np.flatnonzero((xs >= x0) & (xs <= x1))
+    labelled = visible
+    if len(visible) > max_labels:
+        labelled = visible[np.linspace(0, len(visible) - 1, max_labels).astype(int)]
+    return visible, labelled
+
+
+class AnnotationStore:
+    """Markers (time, frequency, power and a label) in growable parallel arrays.
+
+    times, freqs, powers and labels are views of the filled part and are replaced on
+    every change, so readers never see a half-written marker. Appending doubles the
+    capacity when full, so add_many() of thousands of markers is a few array copies;
+    remove() compacts with one boolean mask. version changes whenever the markers do.
+    """
+
+    def __init__(self, capacity=64):
+        self._times = np.empty(capacity)
+        self._freqs = np.empty(capacity)
+        self._powers = np.empty(capacity)
+        self._labels = np.empty(capacity, dtype=object)
+        self.count = 0
+        self.version = 0
+        self._publish()
+
+    def __len__(self):
+        return self.count
+
+    def _publish(self):
+        n = self.count
+        self.times, self.freqs, self.powers, self.labels = (
+            self._times[:n], self._freqs[:n], self._powers[:n], self._labels[:n])
+        self.version += 1
+
+    def add(self, time_s, freq_hz, power_db, label=''):
+        self.add_many([time_s], [freq_hz], [power_db], [label])
+
+    def add_many(self, times, freqs, powers, labels=None):
+        """Append markers given as equal-length sequences; labels default to empty strings."""
+        times = np.asarray(times, dtype=float)
+        n = len(times)
+        if n == 0:
+            return
+        needed = self.count + n
+        if needed > len(self._times):
+            capacity = max(needed, 2 * len(self._times))
+            for name in ('_times', '_freqs', '_powers', '_labels'):
+                old = getattr(self, name)
+                grown = np.empty(capacity, dtype=old.dtype)
+                grown[:self.count] = old[:self.count]
+                setattr(self, name, grown)
+        self._times[self.count:needed] = times
+        self._freqs[self.count:needed] = freqs
+        self._powers[self.count:needed] = powers
+        self._labels[self.count:needed] = '' if labels is None else [str(label) for label in labels]
+        self.count = needed
+        self._publish()
+
+    def remove(self, which):
+        """Remove the markers selected by a boolean mask or an array of indices."""
+        keep = np.ones(self.count, dtype=bool)
+        keep[which] = False
+        n = int(keep.sum())
+        if n == self.count:
+            return
+        for name in ('_times', '_freqs', '_powers', '_labels'):
+            array = getattr(self, name)
+            array[:n] = array[:self.count][keep]
+        self._labels[n:self.count] = None
+        self.count = n
+        self._publish()
+
+    def clear(self):
+        if self.count:
+            self._labels[:self.count] = None
+            self.count = 0
+            self._publish()
+
+    def save_csv(self, path):
+        """Write the markers to path as CSV (MARKER_COLUMNS), replacing the file atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(MARKER_COLUMNS)
+                writer.writerows(zip(self.times.tolist(), self.freqs.tolist(), self.powers.tolist(), self.labels))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load_csv(self, path):
+        """Append the markers of a CSV file written by save_csv(); return how many were read."""
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        if rows and not set(MARKER_COLUMNS[:3]) <= set(rows[0]):
+            raise ValueError(f"{path} needs the columns {', '.join(MARKER_COLUMNS)}")
+        self.add_many([float(row['time_s']) for row in rows], [float(row['freq_hz']) for row in rows],
+                      [float(row['power_db']) for row in rows], [row.get('label') or '' for row in rows])
+        return len(rows)
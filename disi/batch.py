@@ -0,0 +1,230 @@
+"""Headless batch analysis of WAV files into peak-track tables."""
+import os
+import json
+import time
+import tempfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from .engine import (AnalysisConfig, DEFAULT_CONFIG, CHUNK_SIZE, WINDOW_TYPES, PEAK_INTERPOLATIONS, SILENCE_DB,
+                     BAND_SCALES, BandTracks, channel_mixes, compute_peak_tracks, activity_index)
+from .wav import WavReader, MappedAudio
+from .cache import analysis_params, file_fingerprint
+
+# Headless batch analysis: python main.py analyze <paths...>
+#
+# Files are spread over a ProcessPoolExecutor. Each worker memory-maps its file and runs
+# the same block-wise peak-track engine as the GUI, so memory per worker stays bounded.
+# A file's outputs are written atomically and followed by a <name>.done.json record;
+# reruns skip files whose record matches the current file fingerprint (resume). With
+# --bands, the band energies go to a second table, <name>.bands.<format>.
+AUDIO_EXTENSIONS = ('.wav', '.w64')
+TRACK_COLUMNS = ('time_s', 'max_freq_hz', 'max_power_db')
+BAND_PREFIX = 'band_db'
+
+
+def track_columns(views, peaks=1):
+    """Column names for a track table; mono files keep the plain TRACK_COLUMNS names.
+
+    With several peaks per frame each view gets one column per peak, numbered from 1
+    (strongest first): max_freq_hz_ch1_1, max_freq_hz_ch1_2, ... or max_freq_hz_1, ... for mono.
+    """
+    if views == ['ch1'] and peaks == 1:
+        return list(TRACK_COLUMNS)
+    suffixes = [] if views == ['ch1'] else list(views)
+    if peaks > 1:
+        suffixes = [f"{view}_{k}" for view in suffixes for k in range(1, peaks + 1)] or [str(k) for k in range(1, peaks + 1)]
+    return ([TRACK_COLUMNS[0]] + [f"{TRACK_COLUMNS[1]}_{suffix}" for suffix in suffixes]
+            + [f"{TRACK_COLUMNS[2]}_{suffix}" for suffix in suffixes])
+
+
+def band_columns(views, names):
+    """Column names for a band table: time_s, then band_db_<band> (with _<view> for multichannel files) per view."""
+    suffixes = [''] if views == ['ch1'] else [f"_{view}" for view in views]
+    return [TRACK_COLUMNS[0]] + [f"{BAND_PREFIX}_{name}{suffix}" for suffix in suffixes for name in names]
+
+
+def find_audio_files(paths):
+    """Expand files and directories into (source path, output name) pairs."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(AUDIO_EXTENSIONS):
+                        source = os.path.join(root, name)
+                        found.append((source, os.path.splitext(os.path.relpath(source, path))[0]))
+        else:
+            found.append((path, os.path.splitext(os.path.basename(path))[0]))
+    return found
+
+
+def write_tracks(output_base, fmt, timestamps, max_freqs, max_powers, views, peaks=1):
+    """Atomically write the peak tracks as CSV, NPY or Parquet.
+
+    max_freqs and max_powers are frames x views [x peaks]. NPY files hold a
+    (1 + 2 * views * peaks) x n array laid out like track_columns(); CSV and Parquet use
+    those column names. Missing peaks and silent frames are NaN.
+    """
+    n = len(timestamps)
+    table = np.vstack([timestamps, max_freqs.reshape(n, -1).T, max_powers.reshape(n, -1).T])
+    return write_table(f"{output_base}.{fmt}", fmt, track_columns(views, peaks), table)
+
+
+def write_bands(output_base, fmt, timestamps, bands, views):
+    """Atomically write BandTracks as <output_base>.bands.<fmt>, laid out like band_columns()."""
+    n = len(timestamps)
+    table = np.vstack([timestamps, bands.db.reshape(n, -1).T])
+    return write_table(f"{output_base}.bands.{fmt}", fmt, band_columns(views, bands.filterbank.names), table)
+
+
+def write_table(output_path, fmt, columns, table):
+    """Atomically write a columns x rows table as CSV, NPY or Parquet to output_path."""
+    directory = os.path.dirname(output_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        if fmt == 'csv':
+            np.savetxt(tmp_path, table.T, delimiter=',', header=','.join(columns), comments='', fmt='%.6f')
+        elif fmt == 'npy':
+            with open(tmp_path, 'wb') as f:
+                np.save(f, table)
+        elif fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            pq.write_table(pa.table(dict(zip(columns, table))), tmp_path)
+        else:
+            raise ValueError(f"Unknown output format {fmt}")
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return output_path
+
+
+def analyze_file(source, output_base, fmt, config=DEFAULT_CONFIG):
+    """Analyse one file and write its tracks; runs inside a worker process."""
+    started = time.perf_counter()
+    reader = WavReader(source)
+    data = MappedAudio(reader)
+    data.compute_gain()
+    views, _, mix = channel_mixes(reader.channels)
+    # The level pass only pays for itself when it lets silent frames be skipped
+    activity = activity_index(data, reader.sample_rate, config) if config.silence_db is not None else None
+    active = None if activity is None else activity.active
+    bands = None
+    if config.filterbank is not None:
+        bands = BandTracks(config.filterbank, config.frame_count(len(data)), len(views))
+    timestamps, max_freqs, max_powers = compute_peak_tracks(data, reader.sample_rate, config, mix=mix, active=active,
+                                                            bands=bands)
+    output_path = write_tracks(output_base, fmt, timestamps, max_freqs, max_powers, views, config.peaks)
+    duration = len(data) / reader.sample_rate
+    seconds = time.perf_counter() - started
+    record = {'source': os.path.abspath(source), 'fingerprint': file_fingerprint(source), 'output': output_path,
+              'params': analysis_params(config), 'channels': reader.channels, 'columns': track_columns(views, config.peaks),
+              'frames': len(timestamps), 'active_fraction': None if activity is None else activity.active_fraction,
+              'onsets': None if activity is None else len(activity.onsets), 'audio_seconds': duration,
+              'wall_seconds': seconds, 'realtime_factor': duration / seconds if seconds else None}
+    if bands is not None:
+        record['bands_output'] = write_bands(output_base, fmt, timestamps, bands, views)
+        record['band_columns'] = band_columns(views, bands.filterbank.names)
+    write_record(output_base + '.done.json', record)
+    return record
+
+
+def write_record(path, record):
+    """Atomically write a completion record as JSON, so an interrupted run never leaves half of one."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(record, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def is_done(source, output_base, fmt, config=DEFAULT_CONFIG):
+    """Return the completion record of an earlier run if it still matches the source file, format and config."""
+    try:
+        with open(output_base + '.done.json') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if record.get('params') != analysis_params(config) or record.get('fingerprint') != file_fingerprint(source):
+        return None
+    if record.get('output') != f"{output_base}.{fmt}" or not os.path.exists(record['output']):
+        return None
+    return record
+
+
+def run_analyze(argv):
+    """Entry point for the headless batch analyser."""
+    parser = argparse.ArgumentParser(prog='main.py analyze', description="Compute peak-frequency and peak-power tracks for WAV files without a GUI.")
+    parser.add_argument('paths', nargs='+', help="WAV files or directories to search recursively")
+    parser.add_argument('-o', '--output-dir', default='disi-analysis', help="Directory for track files and the summary (default: disi-analysis)")
+    parser.add_argument('-f', '--format', choices=('csv', 'npy', 'parquet'), default='csv', help="Track file format (default: csv)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="Reanalyse files that already have up-to-date results")
+    parser.add_argument('--fft-size', type=int, default=CHUNK_SIZE, help=f"FFT frame length in samples (default: {CHUNK_SIZE})")
+    parser.add_argument('--hop', type=int, help="Samples between frame starts (default: the FFT size, no overlap)")
+    parser.add_argument('--window', choices=WINDOW_TYPES, default='hann', help="FFT window (default: hann)")
+    parser.add_argument('--zero-pad', type=int, default=1, help="Zero-padding factor for the FFT length (default: 1)")
+    parser.add_argument('--max-freq', type=float, help="Highest frequency considered for peaks in Hz (default: Nyquist)")
+    parser.add_argument('--interpolation', choices=PEAK_INTERPOLATIONS, default='none', help="Sub-bin peak refinement (default: none, the welch bin)")
+    parser.add_argument('--peaks', type=int, default=1, help="Peaks tracked per frame, strongest first (default: 1)")
+    parser.add_argument('--silence-db', type=float, default=SILENCE_DB, help=f"Frames quieter than this many dB below the file's peak are silent: not analysed, NaN in the tracks (default: {SILENCE_DB:g})")
+    parser.add_argument('--keep-silence', action='store_true', help="Analyse every frame, including silent ones")
+    parser.add_argument('--bands', help=f"Also write band energies to <name>.bands.<format>: {', '.join(BAND_SCALES[:2])}, "
+                                        "mel[:count[:high_hz]], linear[:count[:high_hz]] or name=low-high,... in Hz")
+    args = parser.parse_args(argv)
+    try:
+        config = AnalysisConfig(args.fft_size, args.hop, args.window, args.zero_pad, args.max_freq,
+                                args.interpolation, args.peaks, None if args.keep_silence else args.silence_db,
+                                args.bands)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("Parquet output requires pyarrow (pip install pyarrow)")
+
+    files = find_audio_files(args.paths)
+    started = time.perf_counter()
+    results = []
+    pending = {}
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for source, name in files:
+            output_base = os.path.join(args.output_dir, name)
+            record = None if args.force else is_done(source, output_base, args.format, config)
+            if record is not None:
+                results.append(dict(record, status='skipped'))
+                continue
+            pending[pool.submit(analyze_file, source, output_base, args.format, config)] = source
+        for count, future in enumerate(as_completed(pending), 1):
+            source = pending[future]
+            try:
+                record = dict(future.result(), status='ok')
+                print(f"[{count}/{len(pending)}] {source}: {record['audio_seconds']:.1f} s of audio in "
+                      f"{record['wall_seconds']:.2f} s")
+            except Exception as e:
+                record = {'source': os.path.abspath(source), 'status': 'error', 'error': str(e)}
+                print(f"[{count}/{len(pending)}] {source}: error: {e}")
+            results.append(record)
+
+    wall_seconds = time.perf_counter() - started
+    analysed = [r for r in results if r['status'] == 'ok']
+    audio_seconds = sum(r['audio_seconds'] for r in analysed)
+    summary = {'files': len(files), 'analysed': len(analysed), 'skipped': sum(r['status'] == 'skipped' for r in results),
+               'errors': sum(r['status'] == 'error' for r in results), 'jobs': args.jobs,
+               'audio_seconds': audio_seconds, 'wall_seconds': wall_seconds,
+               'throughput': audio_seconds / wall_seconds if wall_seconds else None, 'results': results}
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"Analysed {summary['analysed']} files ({summary['skipped']} skipped, {summary['errors']} errors), "
+          f"{audio_seconds:.1f} s of audio in {wall_seconds:.2f} s")
+    return 1 if summary['errors'] else 0
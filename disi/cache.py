@@ -0,0 +1,148 @@
+"""On-disk cache of peak tracks, spectrograms and band energies, keyed by file fingerprint and analysis settings."""
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+
+from .engine import DEFAULT_CONFIG
+
+# Persistent analysis cache.
+#
+# Peak tracks are stored per file as <key>.npy (a (1 + 2 * views) x n array: timestamps,
+# then max_freqs and max_powers for each view, loaded with mmap_mode='r') plus <key>.json
+# (normalization gain and source info), with <key>.spectrogram.npy and, when the settings
+# have bands, <key>.bands.npy (BandTracks.db) beside them, and <key>.levels.npy and
+# <key>.onsets.npy (the frame levels and onsets of the ActivityIndex) when stored with one. The key hashes the file size,
+# mtime, a sampled content hash and the analysis parameters. Files are written to a temporary name and renamed into place,
+# and the least recently used entries are evicted once the directory exceeds max_bytes.
+ANALYSIS_CACHE_DIR = os.environ.get('DISI_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'disi'))
+ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get('DISI_CACHE_MAX_MB', '1024')) << 20
+HASH_SAMPLE_BYTES = 1 << 16  # Bytes hashed at each of HASH_SAMPLE_COUNT evenly spaced offsets
+HASH_SAMPLE_COUNT = 16
+
+
+def analysis_params(config=DEFAULT_CONFIG):
+    """Parameters that change the peak tracks; part of every analysis cache key."""
+    return dict(config.params(), views='channels+mid/side', silence='below loudest frame')
+
+
+def file_fingerprint(file_path):
+    """Return a hex digest of the file's size, mtime and a sampled hash of its content."""
+    stat = os.stat(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(file_path, 'rb') as f:
+        step = max(stat.st_size // HASH_SAMPLE_COUNT, 1)
+        for offset in range(0, stat.st_size, step):
+            f.seek(offset)
+            digest.update(f.read(HASH_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """On-disk cache of peak tracks keyed by file fingerprint and analysis parameters."""
+
+    def __init__(self, directory=ANALYSIS_CACHE_DIR, max_bytes=ANALYSIS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, file_path, params):
+        params_text = json.dumps(params, sort_keys=True)
+        return hashlib.blake2b(f"{file_fingerprint(file_path)}:{params_text}".encode(), digest_size=16).hexdigest()
+
+    def load(self, key):
+        """Return (timestamps, max_freqs, max_powers, gain) memory-mapped from disk, or None on a miss.
+
+        max_freqs and max_powers are frames x views, or frames x views x peaks.
+        """
+        tracks_path = os.path.join(self.directory, key + '.npy')
+        meta_path = os.path.join(self.directory, key + '.json')
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            tracks = np.load(tracks_path, mmap_mode='r')
+            gain = meta['gain']
+            shape = tuple(meta.get('shape', [(len(tracks) - 1) // 2]))
+            width = (len(tracks) - 1) // 2
+            n = tracks.shape[1]
+            max_freqs = tracks[1:1 + width].T.reshape((n,) + shape)
+            max_powers = tracks[1 + width:].T.reshape((n,) + shape)
+            os.utime(tracks_path)  # Mark as recently used for eviction
+            os.utime(meta_path)
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            return None  # Missing, partial or from an older version: a miss
+        return tracks[0], max_freqs, max_powers, gain
+
+    def load_spectrogram(self, key):
+        """Return the SpectrogramImage power array (views x columns x rows) of an entry, or None."""
+        try:
+            return np.load(os.path.join(self.directory, key + '.spectrogram.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+    def load_bands(self, key):
+        """Return the BandTracks dB array (frames x views x bands) of an entry, or None."""
+        try:
+            return np.load(os.path.join(self.directory, key + '.bands.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+    def load_activity(self, key):
+        """Return the (frame levels, onset frames) of an entry's ActivityIndex, or None."""
+        try:
+            return (np.load(os.path.join(self.directory, key + '.levels.npy')),
+                    np.load(os.path.join(self.directory, key + '.onsets.npy')))
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, timestamps, max_freqs, max_powers, gain, file_path=None, spectrogram=None, bands=None,
+              activity=None):
+        """Atomically write an entry, then evict old entries beyond max_bytes."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            n = len(timestamps)
+            tracks = np.vstack([timestamps, max_freqs.reshape(n, -1).T, max_powers.reshape(n, -1).T])
+            if spectrogram is not None:
+                self._write_atomic(key + '.spectrogram.npy', lambda f: np.save(f, spectrogram.power))
+            if bands is not None:
+                self._write_atomic(key + '.bands.npy', lambda f: np.save(f, bands.db))
+            if activity is not None:
+                self._write_atomic(key + '.levels.npy', lambda f: np.save(f, activity.levels))
+                self._write_atomic(key + '.onsets.npy', lambda f: np.save(f, activity.onsets))
+            self._write_atomic(key + '.npy', lambda f: np.save(f, tracks))
+            meta = {'gain': float(gain), 'source': file_path, 'frames': n, 'shape': list(max_freqs.shape[1:])}
+            self._write_atomic(key + '.json', lambda f: f.write(json.dumps(meta).encode()))
+            self.evict()
+        except OSError as e:
+            print(f"Could not write analysis cache: {e}")
+
+    def _write_atomic(self, name, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in max_bytes."""
+        entries = {}
+        for name in os.listdir(self.directory):
+            key, ext = name.split('.', 1)[0], os.path.splitext(name)[1]
+            if ext in ('.npy', '.json'):
+                stat = os.stat(os.path.join(self.directory, name))
+                size, mtime, names = entries.get(key, (0, 0, []))
+                entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime), names + [name])
+        total = sum(size for size, _, _ in entries.values())
+        for key, (size, _, names) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            for name in names:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+            total -= size
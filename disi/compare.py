@@ -0,0 +1,101 @@
+"""Peak tracks of several files analysed in worker processes, for comparing takes.
+
+Each worker analyses one file and returns its tracks through a
+multiprocessing.shared_memory block; only a small header (block name, shapes, sample
+rate) is pickled back. The receiving process copies the tracks out of the block and
+unlinks it at once, so no block outlives its result even if the comparison is closed.
+"""
+import os
+from multiprocessing import shared_memory
+import numpy as np
+
+from .engine import DEFAULT_CONFIG, channel_mixes, compute_peak_tracks
+from .wav import WavReader, MappedAudio
+from .cache import AnalysisCache, analysis_params
+
+COMPARE_JOBS = int(os.environ.get('DISI_COMPARE_JOBS', '0')) or os.cpu_count()  # Worker processes for comparisons
+
+
+def analyze_to_shared_memory(file_path, config=DEFAULT_CONFIG, cache_dir=None):
+    """Compute the peak tracks of a file into a new shared memory block; runs inside a worker process.
+
+    Tracks found in the analysis cache under cache_dir are used as they are. Returns the
+    header that receive_tracks() needs; the block is left for the receiver to unlink.
+    """
+    reader = WavReader(file_path)
+    views, _, mix = channel_mixes(reader.channels)
+    cache = AnalysisCache(cache_dir) if cache_dir else None
+    cached = cache.load(cache.key(file_path, analysis_params(config))) if cache else None
+    if cached is not None:
+        timestamps, max_freqs, max_powers = cached[:3]
+    else:
+        data = MappedAudio(reader)
+        data.compute_gain()
+        timestamps, max_freqs, max_powers = compute_peak_tracks(data, reader.sample_rate, config, mix=mix)
+    n = len(timestamps)
+    shape = (n, len(views), config.peaks)
+    size = n + 2 * int(np.prod(shape))  # Timestamps, then freqs and powers
+    block = shared_memory.SharedMemory(create=True, size=max(8 * size, 1))
+    tracks = np.ndarray(size, dtype=np.float64, buffer=block.buf)
+    try:
+        tracks[:n] = timestamps
+        tracks[n:].reshape((2,) + shape)[:] = (np.reshape(max_freqs, shape), np.reshape(max_powers, shape))
+    except BaseException:
+        tracks = None  # The block cannot close while a view of it exists
+        block.close()
+        block.unlink()
+        raise
+    tracks = None
+    block.close()
+    return {'shm': block.name, 'shape': shape, 'views': views, 'sample_rate': reader.sample_rate,
+            'duration': reader.n_frames / reader.sample_rate}
+
+
+def release_shared(header):
+    """Unlink the shared memory block of a result that will not be received."""
+    try:
+        block = shared_memory.SharedMemory(name=header['shm'])
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+
+def discard_result(future):
+    """Future callback that unlinks the shared memory block of a result nobody will receive."""
+    if not future.cancelled() and future.exception() is None:
+        release_shared(future.result())
+
+
+def receive_tracks(file_path, header):
+    """Copy a worker's tracks out of its shared memory block, unlink the block and return ComparisonTracks."""
+    block = shared_memory.SharedMemory(name=header['shm'])
+    try:
+        shape = tuple(header['shape'])
+        n = shape[0]
+        tracks = np.ndarray(n + 2 * int(np.prod(shape)), dtype=np.float64, buffer=block.buf).copy()
+    finally:
+        block.close()
+        block.unlink()
+    freqs, powers = tracks[n:].reshape((2,) + shape)
+    return ComparisonTracks(file_path, header['views'], tracks[:n], freqs, powers, header['sample_rate'],
+                            header['duration'])
+
+
+class ComparisonTracks:
+    """The peak tracks of one compared file: timestamps and frames x views x peaks freqs and powers."""
+
+    def __init__(self, file_path, views, timestamps, freqs, powers, sample_rate, duration):
+        self.file_path = file_path
+        self.name = os.path.basename(file_path)
+        self.views = views
+        self.timestamps = timestamps
+        self.freqs = freqs
+        self.powers = powers
+        self.sample_rate = sample_rate
+        self.duration = duration
+
+    def view(self, name):
+        """(timestamps, freqs, powers) of the strongest peak in the named view, or in the first view without one."""
+        v = self.views.index(name) if name in self.views else 0
+        return self.timestamps, self.freqs[:, v, 0], self.powers[:, v, 0]
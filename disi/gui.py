@@ -0,0 +1,1884 @@
+"""The DiSi analyser window. Importing this module loads Qt and pyqtgraph."""
+import os
+import json
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QPushButton, QSlider, QHBoxLayout, QLabel, QLineEdit, QFileDialog, QAction, QProgressBar, QActionGroup, QDialog, QDialogButtonBox, QFormLayout, QSpinBox, QDoubleSpinBox, QComboBox, QCheckBox, QInputDialog
+from PyQt5.QtCore import QTimer, Qt, QThread, pyqtSignal, QRectF
+from PyQt5.QtGui import QIcon, QPixmap, QColor
+import pyqtgraph as pg
+
+from .engine import (AnalysisConfig, DEFAULT_CONFIG, WINDOW_TYPES, PEAK_INTERPOLATIONS, SPECTROGRAM_FLOOR_DB,
+                     SpectrogramImage, BandTracks, channel_mixes, frame_spectra_db, iter_peak_tracks, activity_index)
+from .wav import WavReader, MappedAudio
+from .plotting import nearest_index, MinMaxPyramid
+from .cache import ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_MAX_BYTES, AnalysisCache, analysis_params
+from .telemetry import TELEMETRY_ON_START, TELEMETRY_FILE, METRICS_PORT, LatencyHistogram, Telemetry, MetricsServer
+from .annotations import AnnotationStore, marker_path, visible_markers
+from .compare import COMPARE_JOBS, analyze_to_shared_memory, receive_tracks, discard_result
+from .realtime import (LIVE_RETENTION_S, LIVE_LATENCY_BUDGET_MS, SPECTROGRAM_LIVE_COLUMNS, LOOP_CROSSFADE_MS, SampleRing,
+                       LatestMailbox, SpectrogramRing, TrackRing, SpectrumCache, SpectrumAnalyzer, spectrum_key,
+                       FileSource, InputSource, FakeDeviceSource, LoopRegion, precompute_loop_spectra)
+from .stream import STREAM_PORT, StreamClient
+
+BAND_PEN_COLOR = (212, 160, 23, 150)  # Band energies over the Max Power plot, translucent so the track stays visible
+COMPARE_COLORS = ('#ff7f0e', '#9467bd', '#17becf', '#e377c2', '#8c564b', '#bcbd22', '#7f7f7f')  # Apart from the blue/green tracks and red markers
+
+
+class AnalysisWorker(QThread):
+    """Read and analyse an audio file off the GUI thread, streaming peak tracks back in blocks.
+
+    Every signal carries the job id so the window can ignore results from a job it has
+    already cancelled; cancellation uses QThread.requestInterruption and is checked
+    between blocks. All channel views (see channel_mixes) are analysed in one pass and
+    results are batched into at most one block_ready signal per EMIT_INTERVAL_S. Given
+    already loaded data (a MappedAudio with its gain set), only the tracks are recomputed,
+    e.g. after the analysis config changes, and audio_loaded is not emitted. The
+    whole-file SpectrogramImage is sent through spectrogram_ready before the first block
+    and fills in as blocks are analysed, and so are the BandTracks, through bands_ready,
+    when the config has bands. The ActivityIndex of the file is sent through
+    activity_ready; with config.silence_db set, only its active regions are analysed.
+    """
+    EMIT_INTERVAL_S = 0.1
+
+    audio_loaded = pyqtSignal(int, int, object)  # job_id, sample_rate, data
+    spectrogram_ready = pyqtSignal(int, object)  # job_id, SpectrogramImage
+    bands_ready = pyqtSignal(int, object)  # job_id, BandTracks
+    activity_ready = pyqtSignal(int, object)  # job_id, ActivityIndex
+    block_ready = pyqtSignal(int, object, object, object)  # job_id, timestamps, max_freqs, max_powers
+    progress = pyqtSignal(int, int)  # job_id, percent
+    failed = pyqtSignal(int, str)  # job_id, message
+    done = pyqtSignal(int)  # job_id
+
+    def __init__(self, job_id, file_path, cache=None, config=DEFAULT_CONFIG, data=None, parent=None):
+        super().__init__(parent)
+        self.job_id = job_id
+        self.file_path = file_path
+        self.cache = cache
+        self.config = config
+        self.data = data
+
+    def run(self):
+        data = self.data
+        try:
+            if data is None:
+                data = MappedAudio(WavReader(self.file_path))
+            reader = data.reader
+            cache_key = self.cache.key(self.file_path, analysis_params(self.config)) if self.cache else None
+            cached = self.cache.load(cache_key) if self.cache else None
+            cached_spectrogram = self.cache.load_spectrogram(cache_key) if cached is not None else None
+            cached_bands = self.cache.load_bands(cache_key) if cached is not None and self.config.bands else None
+            cached_activity = self.cache.load_activity(cache_key) if cached is not None else None
+            if cached_spectrogram is None or (self.config.bands and cached_bands is None) or cached_activity is None:
+                cached = None  # Entries written before spectrograms or activity were cached are recomputed
+            if self.data is None:
+                if cached is None:
+                    data.compute_gain()  # Normalize
+                else:
+                    data.gain = np.float32(cached[3])
+        except Exception as e:
+            self.failed.emit(self.job_id, str(e))
+            return
+        if self.isInterruptionRequested():
+            return
+        sample_rate = reader.sample_rate
+        n_bins = self.config.plan(sample_rate).n_bins  # Before audio_loaded, so the GUI finds the plan ready
+        if self.data is None:
+            self.audio_loaded.emit(self.job_id, sample_rate, data)
+
+        try:
+            self.analyse(data, sample_rate, n_bins, cached, cached_spectrogram, cached_bands, cached_activity, cache_key)
+        except Exception as e:
+            self.failed.emit(self.job_id, str(e))
+
+    def analyse(self, data, sample_rate, n_bins, cached, cached_spectrogram, cached_bands, cached_activity, cache_key):
+        """Send the tracks, spectrogram, bands and activity of loaded data, from the cache entry when there is one."""
+        n_frames = self.config.frame_count(len(data))
+        _, _, mix = channel_mixes(data.reader.channels)
+        filterbank = self.config.filterbank
+        if cached is not None:
+            spectrogram = SpectrogramImage(n_frames, n_bins, mix.shape[1], power=cached_spectrogram)
+            self.spectrogram_ready.emit(self.job_id, spectrogram)
+            if filterbank is not None:
+                self.bands_ready.emit(self.job_id, BandTracks(filterbank, n_frames, mix.shape[1], db=cached_bands))
+            self.block_ready.emit(self.job_id, cached[0], cached[1], cached[2])
+            self.progress.emit(self.job_id, 100)
+            levels, onsets = cached_activity
+            self.activity_ready.emit(self.job_id, activity_index(data, sample_rate, self.config, levels, onsets))
+            self.done.emit(self.job_id)
+            return
+
+        activity = activity_index(data, sample_rate, self.config)
+        if self.isInterruptionRequested():
+            return
+        self.activity_ready.emit(self.job_id, activity)
+        active = activity.active if self.config.silence_db is not None else None
+        total = max(len(data), 1)
+        spectrogram = SpectrogramImage(n_frames, n_bins, mix.shape[1])
+        self.spectrogram_ready.emit(self.job_id, spectrogram)
+        bands = None if filterbank is None else BandTracks(filterbank, n_frames, mix.shape[1])
+        if bands is not None:
+            self.bands_ready.emit(self.job_id, bands)
+        blocks = []
+        emitted = 0
+        last_emit = time.monotonic()
+        for block in iter_peak_tracks(data, sample_rate, self.config, mix=mix, spectrogram=spectrogram, active=active,
+                                      bands=bands):
+            if self.isInterruptionRequested():
+                return
+            blocks.append(block)
+            if time.monotonic() - last_emit >= self.EMIT_INTERVAL_S:
+                self.emit_blocks(blocks[emitted:], sample_rate, total)
+                emitted = len(blocks)
+                last_emit = time.monotonic()
+        if emitted < len(blocks):
+            self.emit_blocks(blocks[emitted:], sample_rate, total)
+        if self.cache and blocks:
+            tracks = (np.concatenate(parts) for parts in zip(*blocks))
+            self.cache.store(cache_key, *tracks, data.gain, file_path=self.file_path, spectrogram=spectrogram,
+                             bands=bands, activity=activity)
+        self.done.emit(self.job_id)
+
+    def emit_blocks(self, blocks, sample_rate, total):
+        timestamps, max_freqs, max_powers = (np.concatenate(parts) for parts in zip(*blocks))
+        self.block_ready.emit(self.job_id, timestamps, max_freqs, max_powers)
+        analysed = int(round(timestamps[-1] * sample_rate)) + self.config.fft_size
+        self.progress.emit(self.job_id, min(100, analysed * 100 // total))
+
+
+class ComparisonWorker(QThread):
+    """Analyse files for comparison in a process pool and receive their tracks as they finish.
+
+    Every file is its own pool task, so adding files never restarts the analysis of
+    others. Results arrive through shared memory and are copied out on this thread
+    (see disi.compare). Signals carry the window's comparison generation so results
+    computed with old analysis settings are ignored. After requestInterruption the
+    thread stops waiting; queued tasks are cancelled and the shared memory of those
+    already running is unlinked when they finish.
+    """
+    POLL_S = 0.1
+
+    tracks_ready = pyqtSignal(int, str, object)  # generation, file_path, ComparisonTracks
+    failed = pyqtSignal(int, str, str)  # generation, file_path, message
+
+    def __init__(self, pool, file_paths, generation, cache_dir=None, config=DEFAULT_CONFIG, parent=None):
+        super().__init__(parent)
+        self.pool = pool
+        self.file_paths = file_paths
+        self.generation = generation
+        self.cache_dir = cache_dir
+        self.config = config
+
+    def run(self):
+        futures = {self.pool.submit(analyze_to_shared_memory, path, self.config, self.cache_dir): path
+                   for path in self.file_paths}
+        waiting = set(futures)
+        while waiting and not self.isInterruptionRequested():
+            done, waiting = wait(waiting, timeout=self.POLL_S, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = futures[future]
+                try:
+                    tracks = receive_tracks(path, future.result())
+                except Exception as e:
+                    self.failed.emit(self.generation, path, str(e))
+                else:
+                    self.tracks_ready.emit(self.generation, path, tracks)
+        for future in waiting:
+            if not future.cancel():
+                future.add_done_callback(discard_result)
+
+
+class AnalysisSettingsDialog(QDialog):
+    """Dialog for editing the AnalysisConfig: FFT size, hop, window, zero padding, ceiling, peaks, silence and bands."""
+    BAND_PRESETS = ('Off', 'octave', 'third-octave', 'mel', 'linear:8', 'hum=45-65,speech=300-3400,ultrasonic=20000-')
+
+    def __init__(self, config, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Analysis Settings")
+        layout = QFormLayout(self)
+
+        self.fft_size_input = QComboBox()
+        for size in (256, 512, 1024, 2048, 4096, 8192, 16384):
+            self.fft_size_input.addItem(str(size), size)
+        if self.fft_size_input.findData(config.fft_size) < 0:
+            self.fft_size_input.addItem(str(config.fft_size), config.fft_size)
+        self.fft_size_input.setCurrentIndex(self.fft_size_input.findData(config.fft_size))
+        self.hop_input = QSpinBox()
+        self.hop_input.setRange(1, config.fft_size)
+        self.hop_input.setValue(config.hop)
+        self.fft_size_input.currentIndexChanged.connect(
+            lambda: self.hop_input.setMaximum(self.fft_size_input.currentData()))
+        self.window_input = QComboBox()
+        self.window_input.addItems(WINDOW_TYPES)
+        self.window_input.setCurrentText(config.window)
+        self.zero_pad_input = QSpinBox()
+        self.zero_pad_input.setRange(1, 16)
+        self.zero_pad_input.setValue(config.zero_pad)
+        self.max_freq_input = QDoubleSpinBox()
+        self.max_freq_input.setRange(0, 384000)
+        self.max_freq_input.setDecimals(0)
+        self.max_freq_input.setSuffix(" Hz")
+        self.max_freq_input.setSpecialValueText("Nyquist")  # Shown for 0
+        self.max_freq_input.setValue(config.max_freq_hz or 0)
+        self.interpolation_input = QComboBox()
+        self.interpolation_input.addItems(PEAK_INTERPOLATIONS)
+        self.interpolation_input.setCurrentText(config.interpolation)
+        self.peaks_input = QSpinBox()
+        self.peaks_input.setRange(1, 16)
+        self.peaks_input.setValue(config.peaks)
+        self.silence_input = QDoubleSpinBox()
+        self.silence_input.setRange(-120, 0)
+        self.silence_input.setDecimals(0)
+        self.silence_input.setSuffix(" dB")
+        self.silence_input.setSpecialValueText("Off")  # Shown for -120, which analyses every frame
+        self.silence_input.setValue(-120 if config.silence_db is None else config.silence_db)
+        self.bands_input = QComboBox()
+        self.bands_input.setEditable(True)  # Presets, or any band spec (see Filterbank)
+        self.bands_input.addItems(self.BAND_PRESETS)
+        self.bands_input.setCurrentText(config.bands or 'Off')
+        self.error_label = QLabel("")
+        self.error_label.setStyleSheet("color: red")
+
+        layout.addRow("FFT size:", self.fft_size_input)
+        layout.addRow("Hop (samples):", self.hop_input)
+        layout.addRow("Window:", self.window_input)
+        layout.addRow("Zero padding:", self.zero_pad_input)
+        layout.addRow("Max frequency:", self.max_freq_input)
+        layout.addRow("Peak interpolation:", self.interpolation_input)
+        layout.addRow("Peaks per frame:", self.peaks_input)
+        layout.addRow("Skip silence below:", self.silence_input)
+        layout.addRow("Band energies:", self.bands_input)
+        layout.addRow(self.error_label)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+
+    def accept(self):
+        try:
+            self.config()
+        except ValueError as e:
+            self.error_label.setText(str(e))
+            return
+        super().accept()
+
+    def config(self):
+        """Return the AnalysisConfig described by the dialog's fields; raises ValueError for a bad band spec."""
+        bands = self.bands_input.currentText().strip()
+        return AnalysisConfig(fft_size=self.fft_size_input.currentData(), hop=self.hop_input.value(),
+                              window=self.window_input.currentText(), zero_pad=self.zero_pad_input.value(),
+                              max_freq_hz=self.max_freq_input.value() or None,
+                              interpolation=self.interpolation_input.currentText(), peaks=self.peaks_input.value(),
+                              silence_db=None if self.silence_input.value() <= -120 else self.silence_input.value(),
+                              bands=None if bands.lower() in ('', 'off') else bands)
+
+
+def draw_visible(widget, plot, pyramid):
+    """Draw the pyramid level that matches the visible span and width of a plot widget."""
+    view_box = widget.getViewBox()
+    x0, x1 = view_box.viewRange()[0]
+    plot.setData(*pyramid.visible(x0, x1, max(int(view_box.width()), 1)))
+
+
+def draw_series(widget, plot, pyramid):
+    """Draw all series of a frames x series pyramid as one curve, broken between series and at NaNs."""
+    view_box = widget.getViewBox()
+    x0, x1 = view_box.viewRange()[0]
+    x, y = pyramid.visible(x0, x1, max(int(view_box.width()), 1))
+    values = y.T.ravel()
+    finite = np.isfinite(values)
+    connect = finite.copy()
+    connect[:-1] &= finite[1:]
+    if len(x):
+        connect[len(x) - 1::len(x)] = False
+    plot.setData(np.tile(x, y.shape[1]), np.where(finite, values, 0.0), connect=connect)
+
+
+class ComparisonOverlay:
+    """A compared file's strongest-peak tracks drawn over the Max Freq and Max Power plots in its own colour."""
+
+    def __init__(self, tracks, color, freq_widget, power_widget):
+        self.tracks = tracks
+        self.color = color
+        self.enabled = True  # The user's toggle; overlays are also hidden during live capture
+        self.freq_widget = freq_widget
+        self.power_widget = power_widget
+        self.freq_plot = freq_widget.plot([], [], pen=color)
+        self.power_plot = power_widget.plot([], [], pen=color)
+        self.view_name = None
+        self.freq_pyramid = self.power_pyramid = None
+
+    def set_view(self, name):
+        """Show the tracks of the named channel view, or of the file's first view if it has no such view."""
+        if name == self.view_name:
+            return
+        self.view_name = name
+        timestamps, freqs, powers = self.tracks.view(name)
+        self.freq_pyramid = MinMaxPyramid(timestamps, freqs)
+        self.power_pyramid = MinMaxPyramid(timestamps, powers)
+        self.redraw()
+
+    def set_visible(self, visible):
+        self.freq_plot.setVisible(visible)
+        self.power_plot.setVisible(visible)
+
+    def redraw(self):
+        if self.freq_pyramid is None or not self.freq_plot.isVisible():
+            return
+        draw_visible(self.freq_widget, self.freq_plot, self.freq_pyramid)
+        draw_visible(self.power_widget, self.power_plot, self.power_pyramid)
+
+    def remove(self):
+        self.freq_widget.removeItem(self.freq_plot)
+        self.power_widget.removeItem(self.power_plot)
+
+
+class MarkerLayer:
+    """The markers of one plot, drawn with two items however many there are.
+
+    The marker points are one ScatterPlotItem and the vertical lines one PlotCurveItem
+    of connected pairs, holding only the markers inside the visible x range and redrawn
+    when the view changes. At most MAX_LABELS text labels are shown, evenly spread over
+    the visible markers. The items are added with ignoreBounds so markers never change
+    the auto range.
+    """
+    MAX_LABELS = 64
+
+    def __init__(self, plot_widget, unit, color='r'):
+        self.plot_widget = plot_widget
+        self.view_box = plot_widget.getViewBox()
+        self.unit = unit
+        self.color = color
+        self.lines = pg.PlotCurveItem(pen=color, connect='pairs')
+        self.points = pg.ScatterPlotItem(size=6, pen=None, brush=color)
+        plot_widget.addItem(self.lines, ignoreBounds=True)
+        plot_widget.addItem(self.points, ignoreBounds=True)
+        self.labels = []  # TextItem pool, reused across redraws
+        self.xs = self.ys = self.values = np.empty(0)
+        self.names = np.empty(0, dtype=object)
+        self.view_box.sigRangeChanged.connect(self.redraw)
+
+    def set_markers(self, xs, ys, values, names):
+        """Show markers at (xs, ys) labelled '<name> <value> <unit>'."""
+        self.xs, self.ys, self.values, self.names = xs, ys, values, names
+        self.points.setData(xs, ys)
+        self.redraw()
+
+    def redraw(self):
+        (x0, x1), (y0, y1) = self.view_box.viewRange()
+        visible, labelled = visible_markers(self.xs, x0, x1, self.MAX_LABELS)
+        xs = self.xs[visible]
+        self.lines.setData(np.repeat(xs, 2), np.tile([y0, y1], len(xs)))
+        while len(self.labels) < len(labelled):
+            label = pg.TextItem(anchor=(0, 1), color=self.color)
+            self.plot_widget.addItem(label, ignoreBounds=True)
+            self.labels.append(label)
+        for label, i in zip(self.labels, labelled):
+            text = f"{self.names[i]} {self.values[i]:.2f} {self.unit}".lstrip()
+            if label.toPlainText() != text:
+                label.setText(text)
+            label.setPos(self.xs[i], self.ys[i])
+            label.show()
+        for label in self.labels[len(labelled):]:
+            label.hide()
+
+
+class RealTimeFFT(QMainWindow):
+    def __init__(self, audio_file='test.wav', cache_dir=ANALYSIS_CACHE_DIR, cache_max_bytes=ANALYSIS_CACHE_MAX_BYTES,
+                 config=DEFAULT_CONFIG):
+        super().__init__()
+        self.analysis_config = config
+        self.analysis_cache = AnalysisCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.setWindowTitle("DiSi")
+        self.resize(800, 1150)  # Room for the spectrogram below the three graphs
+
+        # Update interval in milliseconds (tweakable)
+        self.update_interval_ms = 30
+
+        # Create menu bar
+        self.menu_bar = self.menuBar()
+        self.setup_menus()
+
+        # Central widget and layout
+        self.central_widget = QWidget()
+        self.setCentralWidget(self.central_widget)
+        self.layout = QVBoxLayout(self.central_widget)
+
+        # FFT plot and its hover label
+        self.fft_container = QVBoxLayout()
+        self.fft_plot_widget = pg.PlotWidget()
+        self.fft_plot_widget.setLabel('bottom', 'Frequency (Hz)')
+        self.fft_plot_widget.setLabel('left', 'Magnitude (dB)')
+        self.fft_plot_widget.showGrid(x=True, y=True)
+        self.fft_plot_widget.setYRange(-100, 0)
+        self.fft_plot_widget.setXRange(0, self.analysis_config.max_freq(44100))
+        self.fft_plot = self.fft_plot_widget.plot([], [], pen='y')
+        self.fft_hover_label = QLabel("Freq: N/A, Mag: N/A dB")
+        self.fft_title = QLabel("FFT Plot (Real-time frequency spectrum)")
+        self.fft_title.setAlignment(Qt.AlignCenter)
+        self.fft_container.addWidget(self.fft_title)
+        self.fft_container.addWidget(self.fft_plot_widget)
+        self.fft_container.addWidget(self.fft_hover_label)
+        self.layout.addLayout(self.fft_container)
+
+        # Max power plot (third graph) and its hover label
+        self.max_power_container = QVBoxLayout()
+        self.max_power_plot_widget = pg.PlotWidget()
+        self.max_power_plot_widget.setLabel('bottom', 'Time (s)')
+        self.max_power_plot_widget.setLabel('left', 'Power (dB)')
+        self.max_power_plot_widget.showGrid(x=True, y=True)
+        self.max_power_plot_widget.setYRange(-100, 0)
+        self.max_power_plot = self.max_power_plot_widget.plot([], [], pen='b')
+        self.band_plot = pg.PlotCurveItem(pen=pg.mkPen(BAND_PEN_COLOR))
+        self.max_power_plot_widget.addItem(self.band_plot)
+        self.max_power_hover_label = QLabel("Time: N/A, Power: N/A dB")
+        self.max_power_title = QLabel("Max Power Plot (Power of the dominant frequency at a given time)")
+        self.max_power_title.setAlignment(Qt.AlignCenter)
+        self.max_power_container.addWidget(self.max_power_title)
+        self.max_power_container.addWidget(self.max_power_plot_widget)
+        self.max_power_container.addWidget(self.max_power_hover_label)
+        self.layout.addLayout(self.max_power_container)
+
+        # Max frequency plot and its hover label
+        self.max_freq_container = QVBoxLayout()
+        self.max_freq_plot_widget = pg.PlotWidget()
+        self.max_freq_plot_widget.setLabel('bottom', 'Time (s)')
+        self.max_freq_plot_widget.setLabel('left', 'Max Freq (Hz)')
+        self.max_freq_plot_widget.showGrid(x=True, y=True)
+        self.max_freq_plot_widget.setYRange(0, self.analysis_config.max_freq(44100))
+        self.max_freq_plot = self.max_freq_plot_widget.plot([], [], pen='g')
+        self.max_freq_hover_label = QLabel("Time: N/A, Freq: N/A Hz")
+        self.max_freq_title = QLabel("Max Frequency Plot (Dominant frequency)")
+        self.max_freq_title.setAlignment(Qt.AlignCenter)
+        self.max_freq_container.addWidget(self.max_freq_title)
+        self.max_freq_container.addWidget(self.max_freq_plot_widget)
+        self.max_freq_container.addWidget(self.max_freq_hover_label)
+        self.layout.addLayout(self.max_freq_container)
+
+        # Spectrogram: the whole file from the batch analysis, or a scrolling view during playback
+        self.spectrogram_container = QVBoxLayout()
+        self.spectrogram_plot_widget = pg.PlotWidget()
+        self.spectrogram_plot_widget.setLabel('bottom', 'Time (s)')
+        self.spectrogram_plot_widget.setLabel('left', 'Frequency (Hz)')
+        self.spectrogram_item = pg.ImageItem()
+        self.spectrogram_item.setLookupTable(pg.colormap.get('viridis').getLookupTable(nPts=256))
+        self.spectrogram_plot_widget.addItem(self.spectrogram_item)
+        self.spectrogram_title = QLabel("Spectrogram (Magnitude over time and frequency)")
+        self.spectrogram_title.setAlignment(Qt.AlignCenter)
+        self.spectrogram_container.addWidget(self.spectrogram_title)
+        self.spectrogram_container.addWidget(self.spectrogram_plot_widget)
+        self.layout.addLayout(self.spectrogram_container)
+        self.spectrogram_image = None  # SpectrogramImage of the loaded file
+        self.activity = None  # ActivityIndex of the loaded file, for jumping between events
+        self.spectrogram_ring = None  # SpectrogramRing while playing
+        self.spectrogram_drawn = -1  # Ring column count last drawn
+
+        # Control layout (will toggle between normal and advanced mode)
+        self.controls_layout = QHBoxLayout()
+
+        # Normal mode controls (slider)
+        self.normal_controls_widget = QWidget()
+        self.normal_controls = QHBoxLayout(self.normal_controls_widget)
+        self.play_pause_button = QPushButton("Play")
+        self.play_pause_button.clicked.connect(self.toggle_play_pause)
+        self.slider = QSlider(Qt.Horizontal)
+        self.time_label = QLabel("0:00.00")
+        self.normal_controls.addWidget(self.play_pause_button)
+        self.normal_controls.addWidget(self.slider)
+        self.normal_controls.addWidget(self.time_label)
+
+        # Advanced mode controls (time range inputs)
+        self.advanced_controls_widget = QWidget()
+        self.advanced_controls = QHBoxLayout(self.advanced_controls_widget)
+        self.advanced_play_pause_button = QPushButton("Play")
+        self.advanced_play_pause_button.clicked.connect(self.toggle_play_pause_advanced)
+        self.start_time_input = QLineEdit("0.00")
+        self.start_time_input.setPlaceholderText("Start Time (s)")
+        self.start_time_input.setFixedWidth(100)
+        self.end_time_input = QLineEdit("0.00")
+        self.end_time_input.setPlaceholderText("End Time (s)")
+        self.end_time_input.setFixedWidth(100)
+        self.set_range_button = QPushButton("Set Range")
+        self.set_range_button.clicked.connect(self.set_playback_range)
+        self.loop_checkbox = QCheckBox("Loop")
+        self.loop_checkbox.toggled.connect(self.update_loop)
+        self.crossfade_input = QSpinBox()
+        self.crossfade_input.setRange(0, 100)
+        self.crossfade_input.setSuffix(" ms")
+        self.crossfade_input.setValue(LOOP_CROSSFADE_MS)
+        self.crossfade_input.setToolTip("Crossfade where the loop wraps around")
+        self.crossfade_input.valueChanged.connect(self.update_loop)
+        self.loop_precompute_stop = threading.Event()
+        self.advanced_time_label = QLabel("0:00.00")
+        self.advanced_controls.addWidget(self.advanced_play_pause_button)
+        self.advanced_controls.addWidget(QLabel("Start:"))
+        self.advanced_controls.addWidget(self.start_time_input)
+        self.advanced_controls.addWidget(QLabel("End:"))
+        self.advanced_controls.addWidget(self.end_time_input)
+        self.advanced_controls.addWidget(self.set_range_button)
+        self.advanced_controls.addWidget(self.loop_checkbox)
+        self.advanced_controls.addWidget(QLabel("Crossfade:"))
+        self.advanced_controls.addWidget(self.crossfade_input)
+        self.advanced_controls.addWidget(self.advanced_time_label)
+
+        # Initially show normal controls
+        self.controls_layout.addWidget(self.normal_controls_widget)
+        self.layout.addLayout(self.controls_layout)
+        self.advanced_mode = False
+
+        # Connect slider for normal mode; scrubbing is coalesced to one update per display refresh
+        self.pending_scrub = None
+        self.slider.valueChanged.connect(self.queue_scrub)
+        self.slider.sliderReleased.connect(self.seek_audio)
+
+        # Background loading progress, shown in the status bar while a file is analysed
+        self.load_progress_label = QLabel("")
+        self.load_progress_bar = QProgressBar()
+        self.load_progress_bar.setRange(0, 100)
+        self.load_progress_bar.setFixedWidth(200)
+        self.load_cancel_button = QPushButton("Cancel")
+        self.load_cancel_button.clicked.connect(self.cancel_analysis)
+        self.statusBar().addPermanentWidget(self.load_progress_label)
+        self.statusBar().addPermanentWidget(self.load_progress_bar)
+        self.statusBar().addPermanentWidget(self.load_cancel_button)
+        self.set_loading_visible(False)
+
+        # Background analysis worker; stale jobs are recognised by their job id
+        self.analysis_worker = None
+        self.analysis_job_id = 0
+        self.retired_workers = []
+
+        # Initialize variables
+        self.audio_file = audio_file
+        self.data = np.zeros((0, 1), dtype=np.float32)
+        self.sample_rate = 44100
+        self.total_duration = 0
+        self.mailbox = LatestMailbox()
+        self.spectrum_cache = SpectrumCache()
+        self.source = None  # The running AudioSource: file playback or live capture
+        self.analyzer = None
+        self.output_channels = 1
+        self.telemetry = Telemetry(enabled=TELEMETRY_ON_START or bool(TELEMETRY_FILE) or bool(METRICS_PORT))
+        self.telemetry_file = open(TELEMETRY_FILE, 'a') if TELEMETRY_FILE else None
+        self.metrics_server = None
+        if METRICS_PORT:
+            try:
+                self.metrics_server = MetricsServer(self.telemetry, METRICS_PORT)
+            except OSError as e:
+                print(f"Could not start metrics endpoint on port {METRICS_PORT}: {e}")
+        self.telemetry_label = QLabel("")
+        self.statusBar().addWidget(self.telemetry_label)
+        self.live_label = QLabel("")
+        self.statusBar().addWidget(self.live_label)
+        self.live = False  # Watching a live source instead of the loaded file
+        self.track_ring = None  # TrackRing of the live peak tracks
+        self.tracks_drawn = -1  # TrackRing version last drawn
+        self.live_latency = LatencyHistogram()  # Capture-to-display latency of the live session
+        self.live_over_budget = 0  # Spectra shown later than LIVE_LATENCY_BUDGET_MS after capture
+        self.live_skipped_before = 0  # late_frames_skipped counter when the session started
+        self.live_label_time = 0.0
+        self.telemetry_label.setVisible(TELEMETRY_ON_START)
+        self.overlay_action.setChecked(TELEMETRY_ON_START)
+        self.telemetry_frames = 0
+        self.telemetry_time = time.monotonic()
+        self.telemetry_timer = QTimer()
+        self.telemetry_timer.setInterval(1000)
+        self.telemetry_timer.timeout.connect(self.update_telemetry)
+        if self.telemetry.enabled:
+            self.telemetry_timer.start()
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update_plot)
+
+        # Initialize playback-related variables
+        self.start_idx = 0  # Follows the FileSource position while playing; seek with request_seek()
+        self.is_playing = False
+        self.playback_start_idx = 0
+        self.playback_end_idx = 0  # Will be set after loading audio
+
+        # Level-of-detail pyramids for the time plots, rebuilt as analysis results arrive
+        self.freq_pyramid = None
+        self.power_pyramid = None
+        self.extra_pyramids = []  # (freq, power) pyramids of the weaker peaks
+        self.band_tracks = None  # BandTracks of the loaded file, while the config has bands
+        self.band_db = None  # frames x bands energies drawn over the Max Power plot
+        self.band_pyramid = None
+        self.extra_freq_plots = []
+        self.extra_power_plots = []
+        for widget in (self.max_power_plot_widget, self.max_freq_plot_widget):
+            widget.getViewBox().sigXRangeChanged.connect(self.update_track_plots)
+            widget.getViewBox().sigResized.connect(self.update_track_plots)
+
+        # Other files overlaid on the time plots for comparison, analysed in a process pool
+        # created on first use; compare_generation changes with the analysis settings
+        self.compare_pool = None
+        self.comparisons = {}  # file_path -> ComparisonOverlay, in the order they arrived
+        self.compare_pending = set()
+        self.compare_workers = []
+        self.compare_generation = 0
+        self.compare_colors_used = 0
+        self.build_compare_menu()
+
+        # Peak tracks of every channel view, preallocated once the file length is known;
+        # timestamps, max_freqs and max_powers are views of the filled part of the displayed view
+        self.view_names, self.view_labels, self.mix_matrix = channel_mixes(1)
+        self.display_view = 0
+        self.reset_tracks(0)
+
+        # Store current FFT data for hover functionality
+        self.current_freqs = np.empty(0)
+        self.current_magnitude_db = np.empty(0)
+
+        # Markers placed by clicking the track plots, drawn on all three plots; the markers of
+        # a file are kept in marker_file next to it and reloaded with the file
+        self.annotations = AnnotationStore()
+        self.marker_file = None
+        self.fft_markers = MarkerLayer(self.fft_plot_widget, 'dB')
+        self.max_power_markers = MarkerLayer(self.max_power_plot_widget, 'dB')
+        self.max_freq_markers = MarkerLayer(self.max_freq_plot_widget, 'Hz')
+
+        # The file is loaded once the window has first painted, so it appears without waiting for the analysis
+        self.pending_file = self.audio_file
+
+        # Enable hover and click functionality
+        # Mouse moves are coalesced and handled at most once per display refresh
+        screen = QApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen and screen.refreshRate() > 0 else 60
+        self.pending_hover = {}
+        self.hover_timer = QTimer()
+        self.hover_timer.setSingleShot(True)
+        self.hover_timer.setInterval(int(1000 / refresh_rate))
+        self.hover_timer.timeout.connect(self.flush_hover)
+        self.scrub_timer = QTimer()
+        self.scrub_timer.setSingleShot(True)
+        self.scrub_timer.setInterval(int(1000 / refresh_rate))
+        self.scrub_timer.timeout.connect(self.flush_scrub)
+        self.fft_plot_widget.scene().sigMouseMoved.connect(lambda pos: self.queue_hover(self.on_fft_mouse_moved, pos))
+        self.max_power_plot_widget.scene().sigMouseMoved.connect(lambda pos: self.queue_hover(self.on_max_power_mouse_moved, pos))
+        self.max_power_plot_widget.scene().sigMouseClicked.connect(self.on_max_power_mouse_clicked)
+        self.max_freq_plot_widget.scene().sigMouseMoved.connect(lambda pos: self.queue_hover(self.on_max_freq_mouse_moved, pos))
+        self.max_freq_plot_widget.scene().sigMouseClicked.connect(self.on_max_freq_mouse_clicked)
+
+        # Enable key press detection
+        self.setFocusPolicy(Qt.StrongFocus)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.pending_file is not None:
+            file_path, self.pending_file = self.pending_file, None
+            QTimer.singleShot(0, lambda: self.load_audio_file(file_path))
+
+    def setup_menus(self):
+        """Set up the menu bar with File and Tools menus."""
+        file_menu = self.menu_bar.addMenu("File")
+        open_action = QAction("Open WAV File", self)
+        open_action.setShortcut("Ctrl+O")
+        open_action.triggered.connect(self.open_file_dialog)
+        file_menu.addAction(open_action)
+        cancel_action = QAction("Cancel Analysis", self)
+        cancel_action.setShortcut("Esc")
+        cancel_action.triggered.connect(self.cancel_analysis)
+        file_menu.addAction(cancel_action)
+        import_markers_action = QAction("Import Markers...", self)
+        import_markers_action.triggered.connect(self.import_markers_dialog)
+        file_menu.addAction(import_markers_action)
+        export_markers_action = QAction("Export Markers...", self)
+        export_markers_action.triggered.connect(self.export_markers_dialog)
+        file_menu.addAction(export_markers_action)
+
+        live_menu = self.menu_bar.addMenu("Live")
+        capture_action = QAction("Capture Input", self)
+        capture_action.setShortcut("Ctrl+L")
+        capture_action.triggered.connect(lambda: self.start_live(lambda: InputSource(telemetry=self.telemetry)))
+        live_menu.addAction(capture_action)
+        fake_action = QAction("Fake Device (Loaded File)", self)
+        fake_action.triggered.connect(lambda: self.start_live(lambda: FakeDeviceSource(self.data, self.sample_rate)))
+        live_menu.addAction(fake_action)
+        connect_action = QAction("Connect to Server...", self)
+        connect_action.triggered.connect(self.connect_to_server)
+        live_menu.addAction(connect_action)
+        stop_live_action = QAction("Stop Live", self)
+        stop_live_action.triggered.connect(self.stop_live)
+        live_menu.addAction(stop_live_action)
+
+        self.compare_menu = self.menu_bar.addMenu("Compare")  # Filled by build_compare_menu
+
+        tools_menu = self.menu_bar.addMenu("Tools")
+        self.advanced_action = QAction("Advanced Mode", self, checkable=True)
+        self.advanced_action.setShortcut("A")
+        self.advanced_action.triggered.connect(self.toggle_advanced_mode)
+        tools_menu.addAction(self.advanced_action)
+
+        self.channel_menu = tools_menu.addMenu("Display Channel")
+        self.channel_group = QActionGroup(self)
+
+        self.overlay_action = QAction("Performance Overlay", self, checkable=True)
+        self.overlay_action.setShortcut("P")
+        self.overlay_action.triggered.connect(self.toggle_performance_overlay)
+        tools_menu.addAction(self.overlay_action)
+
+        settings_action = QAction("Analysis Settings...", self)
+        settings_action.triggered.connect(self.open_analysis_settings)
+        tools_menu.addAction(settings_action)
+
+        next_event_action = QAction("Next Event", self)
+        next_event_action.setShortcut("N")
+        next_event_action.triggered.connect(lambda: self.jump_to_event(1))
+        tools_menu.addAction(next_event_action)
+        previous_event_action = QAction("Previous Event", self)
+        previous_event_action.setShortcut("Shift+N")
+        previous_event_action.triggered.connect(lambda: self.jump_to_event(-1))
+        tools_menu.addAction(previous_event_action)
+
+        reset_action = QAction("Reset Views", self)
+        reset_action.setShortcut("R")
+        reset_action.triggered.connect(self.reset_views)
+        tools_menu.addAction(reset_action)
+
+    def open_file_dialog(self):
+        """Open a file dialog to select a WAV file and reload the audio."""
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open WAV File", "", "WAV Files (*.wav *.w64)")
+        if file_path:
+            self.audio_file = file_path
+            self.load_audio_file(file_path)
+
+    def load_audio_file(self, file_path):
+        """Load the audio file and update the plots and controls."""
+        self.pending_file = None
+        self.stop_live(reload=False)
+        if self.is_playing:
+            if self.advanced_mode:
+                self.toggle_play_pause_advanced()
+            else:
+                self.toggle_play_pause()
+
+        self.reset_tracks(0)
+        self.save_markers()
+        self.annotations.clear()
+        self.marker_file = marker_path(file_path)
+        if os.path.exists(self.marker_file):
+            try:
+                self.annotations.load_csv(self.marker_file)
+            except (OSError, ValueError) as e:
+                print(f"Could not load markers from {self.marker_file}: {e}")
+        self.update_markers()
+        self.fft_plot.clear()
+        self.max_power_plot.clear()
+        self.max_freq_plot.clear()
+        self.freq_pyramid = None
+        self.power_pyramid = None
+
+        self.data = np.zeros((0, 1), dtype=np.float32)
+        self.spectrum_cache.clear()
+        self.spectrogram_image = None
+        self.activity = None
+        self.spectrogram_item.clear()
+        self.total_duration = 0
+        self.start_idx = 0
+        self.playback_start_idx = 0
+        self.playback_end_idx = 0
+        self.current_freqs = np.empty(0)
+        self.current_magnitude_db = np.empty(0)
+        self.start_analysis(file_path)
+
+    def toggle_performance_overlay(self):
+        """Show or hide the performance overlay; telemetry is collected while it is shown or exported."""
+        visible = self.overlay_action.isChecked()
+        self.telemetry_label.setVisible(visible)
+        exporting = self.telemetry_file is not None or self.metrics_server is not None
+        self.telemetry.enabled = visible or exporting
+        if self.telemetry.enabled and not self.telemetry_timer.isActive():
+            self.telemetry.reset()
+            self.telemetry_frames = 0
+            self.telemetry_time = time.monotonic()
+            self.telemetry_timer.start()
+            self.update_telemetry()
+        elif not self.telemetry.enabled:
+            self.telemetry_timer.stop()
+
+    def update_telemetry(self):
+        """Once a second: refresh the GUI gauges, the overlay text and the JSON-lines export."""
+        telemetry = self.telemetry
+        now = time.monotonic()
+        frames = telemetry.counters['frames_rendered']
+        telemetry.gauge('fps', (frames - self.telemetry_frames) / max(now - self.telemetry_time, 1e-9))
+        self.telemetry_frames, self.telemetry_time = frames, now
+        telemetry.gauge('dropped_frames', self.mailbox.dropped)
+        telemetry.gauge('spectrum_cache_hits', self.spectrum_cache.hits)
+        telemetry.gauge('spectrum_cache_misses', self.spectrum_cache.misses)
+        snapshot = telemetry.snapshot()
+        stages, counters, gauges = snapshot['stages'], snapshot['counters'], snapshot['gauges']
+        self.telemetry_label.setText(
+            f"callback p99 {stages['callback']['p99_us']:.0f} µs | analysis p99 {stages['analysis']['p99_us']:.0f} µs | "
+            f"render p99 {stages['render']['p99_us'] / 1000:.1f} ms | {gauges['fps']:.0f} fps | "
+            f"underruns {counters['underruns']} | overflows {counters['overflows']} | "
+            f"dropped {gauges['dropped_frames']} | backlog {gauges.get('analyzer_backlog', 0)}"
+            + (f" | capture-to-display p99 {stages['capture_to_display']['p99_us'] / 1000:.1f} ms" if self.live else ""))
+        if self.telemetry_file is not None:
+            self.telemetry_file.write(json.dumps(snapshot) + '\n')
+            self.telemetry_file.flush()
+
+    def open_analysis_settings(self):
+        """Let the user edit the analysis parameters and apply them."""
+        dialog = AnalysisSettingsDialog(self.analysis_config, self)
+        if dialog.exec_() == QDialog.Accepted:
+            self.set_analysis_config(dialog.config())
+
+    def set_analysis_config(self, config, reanalyse=True):
+        """Switch to new analysis parameters, recomputing the peak tracks of the loaded file.
+
+        With reanalyse False the loaded file is left alone, for callers about to go live:
+        stop_live() reloads it with the new parameters when it is shown again.
+        """
+        if config == self.analysis_config:
+            return
+        self.stop_live(reload=reanalyse)
+        if self.is_playing:
+            if self.advanced_mode:
+                self.toggle_play_pause_advanced()
+            else:
+                self.toggle_play_pause()
+        self.analysis_config = config
+        self.spectrum_cache.clear()
+        if self.comparisons or self.compare_pending:
+            # Compared files are reanalysed with the new settings; results still coming use the old ones
+            file_paths = [*self.comparisons, *self.compare_pending]
+            self.compare_generation += 1
+            for worker in self.compare_workers:
+                worker.requestInterruption()
+            self.clear_comparison()
+            self.add_comparison_files(file_paths)
+        self.spectrogram_image = None
+        self.spectrogram_item.clear()
+        self.reset_views()
+        if not reanalyse:
+            return
+        if len(self.data) == 0:
+            if self.analysis_worker is not None:
+                self.start_analysis(self.audio_file)  # Still loading: restart with the new parameters
+            return
+        self.reset_tracks(config.frame_count(len(self.data)))
+        self.start_analysis(self.audio_file, self.data)
+        self.update_time_label_and_fft(None)
+
+    def start_analysis(self, file_path, data=None):
+        """Cancel any running analysis and start analysing file_path in the background.
+
+        With data (the already loaded audio of file_path) only the peak tracks are recomputed.
+        """
+        self.cancel_analysis()
+        self.analysis_job_id += 1
+        worker = AnalysisWorker(self.analysis_job_id, file_path, self.analysis_cache, self.analysis_config, data)
+        worker.audio_loaded.connect(self.on_audio_loaded)
+        worker.spectrogram_ready.connect(self.on_spectrogram_ready)
+        worker.bands_ready.connect(self.on_bands_ready)
+        worker.activity_ready.connect(self.on_activity_ready)
+        worker.block_ready.connect(self.on_peak_block)
+        worker.progress.connect(self.on_analysis_progress)
+        worker.failed.connect(self.on_analysis_failed)
+        worker.done.connect(self.on_analysis_done)
+        worker.finished.connect(lambda: self.release_worker(worker))
+        self.analysis_worker = worker
+        self.load_progress_label.setText("Loading..." if data is None else "Analysing...")
+        self.load_progress_bar.setValue(0)
+        self.set_loading_visible(True)
+        worker.start()
+
+    def cancel_analysis(self):
+        """Ask the running analysis worker to stop; its late results are ignored."""
+        if self.analysis_worker is None:
+            return
+        self.analysis_worker.requestInterruption()
+        self.analysis_job_id += 1
+        self.retire_current_worker()
+
+    def retire_current_worker(self):
+        """Keep the current worker alive until its thread finishes, then forget it."""
+        if self.analysis_worker is not None and self.analysis_worker.isRunning():
+            self.retired_workers.append(self.analysis_worker)
+        self.analysis_worker = None
+        self.set_loading_visible(False)
+
+    def release_worker(self, worker):
+        """Drop the last reference to a worker once its thread has finished."""
+        if worker in self.retired_workers:
+            self.retired_workers.remove(worker)
+        if worker is self.analysis_worker:
+            self.analysis_worker = None
+        worker.deleteLater()
+
+    def set_loading_visible(self, visible):
+        """Show or hide the loading progress widgets in the status bar."""
+        self.load_progress_label.setVisible(visible)
+        self.load_progress_bar.setVisible(visible)
+        self.load_cancel_button.setVisible(visible)
+
+    def on_audio_loaded(self, job_id, sample_rate, data):
+        """Install the decoded audio and set up the controls while analysis continues."""
+        if job_id != self.analysis_job_id:
+            return
+        self.sample_rate = sample_rate
+        self.data = data
+
+        self.total_duration = len(self.data) / self.sample_rate
+        self.slider.setRange(0, int(self.total_duration * 100))  # Centiseconds
+        self.end_time_input.setText(f"{self.total_duration:.2f}")
+
+        self.reset_views()
+
+        self.start_idx = 0
+        self.playback_start_idx = 0
+        self.playback_end_idx = len(self.data)
+        self.view_names, self.view_labels, self.mix_matrix = channel_mixes(self.data.shape[1])
+        self.display_view = 0
+        self.build_channel_menu()
+        self.reset_tracks(self.analysis_config.frame_count(len(self.data)))
+        self.load_progress_label.setText("Analysing...")
+        self.update_time_label_and_fft(0)
+
+    def on_peak_block(self, job_id, timestamps, max_freqs, max_powers):
+        """Extend the peak plots with a block of results from the analysis worker."""
+        if job_id != self.analysis_job_id:
+            return
+        start, stop = self.track_len, self.track_len + len(timestamps)
+        shape = (stop - start, len(self.view_names), -1)  # frames x views x peaks
+        self.track_times[start:stop] = timestamps
+        self.track_freqs[:, start:stop] = max_freqs.reshape(shape).swapaxes(0, 1)
+        self.track_powers[:, start:stop] = max_powers.reshape(shape).swapaxes(0, 1)
+        self.track_len = stop
+        if self.freq_pyramid is None or start == 0:
+            self.show_view_tracks()
+        else:
+            self.extend_view_tracks()
+        self.show_static_spectrogram()
+
+    def on_spectrogram_ready(self, job_id, spectrogram):
+        """Take the whole-file spectrogram that the analysis worker is filling in."""
+        if job_id != self.analysis_job_id:
+            return
+        self.spectrogram_image = spectrogram
+        self.spectrogram_plot_widget.setXRange(0, self.total_duration, padding=0)
+        self.spectrogram_plot_widget.setYRange(0, self.analysis_config.max_freq(self.sample_rate), padding=0)
+        self.show_static_spectrogram()
+
+    def on_bands_ready(self, job_id, bands):
+        """Take the BandTracks that the analysis worker is filling in."""
+        if job_id != self.analysis_job_id:
+            return
+        self.band_tracks = bands
+        self.show_view_tracks()
+
+    def on_activity_ready(self, job_id, activity):
+        """Keep the file's active regions and onsets for Next/Previous Event."""
+        if job_id != self.analysis_job_id:
+            return
+        self.activity = activity
+        self.statusBar().showMessage(f"{len(activity.onsets)} events, "
+                                     f"{100 * (1 - activity.active_fraction):.0f}% silence", 5000)
+
+    def show_static_spectrogram(self):
+        """Draw the whole-file spectrogram of the displayed view, unless playback owns the panel."""
+        if self.spectrogram_image is None or self.spectrogram_ring is not None:
+            return
+        image = self.spectrogram_image
+        self.draw_spectrogram(image.image_db(self.display_view), 0, self.total_duration, image.bin_factor)
+
+    def update_live_spectrogram(self):
+        """Redraw the scrolling spectrogram in place if the analyzer has written new columns."""
+        ring = self.spectrogram_ring
+        if ring is None or ring.count == self.spectrogram_drawn:
+            return
+        self.spectrogram_drawn = ring.count
+        hop_s = self.analysis_config.hop / self.sample_rate
+        x0 = (ring.last_frame - ring.capacity + 1) * hop_s
+        self.draw_spectrogram(ring.view(), x0, ring.capacity * hop_s, ring.bin_factor)
+        self.spectrogram_plot_widget.setXRange(x0, x0 + ring.capacity * hop_s, padding=0)
+
+    def draw_spectrogram(self, image, x0, width, bin_factor):
+        """Show a columns x rows dB image covering [x0, x0 + width] seconds from 0 Hz up."""
+        bin_hz = self.sample_rate / self.analysis_config.plan(self.sample_rate).nfft
+        self.spectrogram_item.setImage(image, autoLevels=False, levels=(SPECTROGRAM_FLOOR_DB, 0))
+        self.spectrogram_item.setRect(QRectF(x0, 0, width, image.shape[1] * bin_factor * bin_hz))
+
+    def reset_tracks(self, n_frames):
+        """Preallocate empty peak tracks (views x frames x peaks) for n_frames frames of every channel view."""
+        peaks = self.analysis_config.peaks
+        self.track_times = np.empty(n_frames)
+        self.track_freqs = np.empty((len(self.view_names), n_frames, peaks))
+        self.track_powers = np.empty((len(self.view_names), n_frames, peaks))
+        self.track_len = 0
+        self.band_tracks = None
+        for widget, plots in ((self.max_freq_plot_widget, self.extra_freq_plots),
+                              (self.max_power_plot_widget, self.extra_power_plots)):
+            for plot in plots[peaks - 1:]:
+                widget.removeItem(plot)
+            del plots[peaks - 1:]
+            while len(plots) < peaks - 1:
+                plots.append(widget.plot([], [], pen=None, symbol='o', symbolSize=2, symbolPen=None,
+                                         symbolBrush=pg.intColor(len(plots), hues=8, alpha=160)))
+        self.show_view_tracks()
+
+    def show_view_tracks(self):
+        """Point the displayed tracks at the current channel view and redraw the time plots.
+
+        timestamps, max_freqs and max_powers are the strongest peak; weaker peaks (when
+        the config tracks several) are drawn as dots over the same plots, and band
+        energies (when it has bands) as curves over the Max Power plot.
+        """
+        bands = None if self.band_tracks is None else self.band_tracks.db[:self.track_len, self.display_view]
+        self.show_tracks(self.track_times[:self.track_len], self.track_freqs[self.display_view, :self.track_len],
+                         self.track_powers[self.display_view, :self.track_len], bands)
+        for overlay in self.comparisons.values():
+            overlay.set_view(self.view_names[self.display_view])
+
+    def extend_view_tracks(self):
+        """Extend the drawn tracks of the current view to track_len, merging only the new frames into the pyramids."""
+        n, view = self.track_len, self.display_view
+        freqs, powers = self.track_freqs[view, :n], self.track_powers[view, :n]
+        self.timestamps = self.track_times[:n]
+        self.max_freqs = freqs[:, 0]
+        self.max_powers = powers[:, 0]
+        self.freq_pyramid.extend(self.timestamps, self.max_freqs)
+        self.power_pyramid.extend(self.timestamps, self.max_powers)
+        for k, (freq_pyramid, power_pyramid) in enumerate(self.extra_pyramids, 1):
+            freq_pyramid.extend(self.timestamps, freqs[:, k])
+            power_pyramid.extend(self.timestamps, powers[:, k])
+        if self.band_pyramid is not None:
+            self.band_db = self.band_tracks.db[:n, view]
+            self.band_pyramid.extend(self.timestamps, self.band_db)
+        self.update_track_plots()
+
+    def show_tracks(self, timestamps, freqs, powers, bands=None):
+        """Draw peak tracks given as timestamps and frames x peaks freqs and powers, and frames x bands energies."""
+        self.timestamps = timestamps
+        self.max_freqs = freqs[:, 0]
+        self.max_powers = powers[:, 0]
+        self.band_db = bands if bands is not None and bands.shape[1] else None
+        if len(timestamps) == 0:
+            self.freq_pyramid = None
+            self.power_pyramid = None
+            self.band_pyramid = None
+            self.extra_pyramids = []
+            for plot in (self.max_freq_plot, self.max_power_plot, self.band_plot, *self.extra_freq_plots,
+                         *self.extra_power_plots):
+                plot.clear()
+            return
+        self.freq_pyramid = MinMaxPyramid(timestamps, self.max_freqs)
+        self.power_pyramid = MinMaxPyramid(timestamps, self.max_powers)
+        self.band_pyramid = None if self.band_db is None else MinMaxPyramid(timestamps, self.band_db)
+        if self.band_pyramid is None:
+            self.band_plot.clear()
+        self.extra_pyramids = [(MinMaxPyramid(timestamps, freqs[:, k]), MinMaxPyramid(timestamps, powers[:, k]))
+                               for k in range(1, freqs.shape[1])]
+        self.update_track_plots()
+
+    def build_channel_menu(self):
+        """Fill the Display Channel menu with the views of the loaded file."""
+        self.channel_menu.clear()
+        for action in self.channel_group.actions():
+            self.channel_group.removeAction(action)
+        for i, label in enumerate(self.view_labels):
+            action = QAction(label, self, checkable=True)
+            action.setChecked(i == self.display_view)
+            action.triggered.connect(lambda checked, i=i: self.select_display_view(i))
+            self.channel_group.addAction(action)
+            self.channel_menu.addAction(action)
+
+    def select_display_view(self, view):
+        """Show the peak tracks and spectrum of another channel or mid/side mix."""
+        self.display_view = view
+        if not self.live:
+            self.show_view_tracks()
+            self.show_static_spectrogram()
+        if self.analyzer is not None:
+            self.analyzer.view = self.analyzer_view()
+            self.precompute_loop()
+        elif not self.live and len(self.data) > 0:
+            self.update_time_label_and_fft(None)
+
+    def analyzer_view(self):
+        """(name, channel weights) of the displayed view, limited to the channels being played."""
+        return self.view_names[self.display_view], self.mix_matrix[:self.output_channels, self.display_view]
+
+    def update_track_plots(self):
+        """Redraw both time plots from the pyramid level that matches their visible span and width."""
+        for widget, plot, pyramid in ((self.max_freq_plot_widget, self.max_freq_plot, self.freq_pyramid),
+                                      (self.max_power_plot_widget, self.max_power_plot, self.power_pyramid)):
+            if pyramid is not None:
+                draw_visible(widget, plot, pyramid)
+        for (freq_pyramid, power_pyramid), freq_plot, power_plot in zip(
+                self.extra_pyramids, self.extra_freq_plots, self.extra_power_plots):
+            draw_visible(self.max_freq_plot_widget, freq_plot, freq_pyramid)
+            draw_visible(self.max_power_plot_widget, power_plot, power_pyramid)
+        if self.band_pyramid is not None:
+            draw_series(self.max_power_plot_widget, self.band_plot, self.band_pyramid)
+        for overlay in self.comparisons.values():
+            overlay.redraw()
+
+    def on_analysis_progress(self, job_id, percent):
+        if job_id == self.analysis_job_id:
+            self.load_progress_bar.setValue(percent)
+
+    def on_analysis_failed(self, job_id, message):
+        if job_id != self.analysis_job_id:
+            return
+        print(f"Error loading audio file: {message}")
+        self.retire_current_worker()
+
+    def build_compare_menu(self):
+        """Fill the Compare menu: adding files, a colour-coded toggle per compared file and removal."""
+        self.compare_menu.clear()
+        add_action = QAction("Add Files...", self)
+        add_action.setShortcut("Ctrl+Shift+O")
+        add_action.triggered.connect(self.add_comparison_dialog)
+        self.compare_menu.addAction(add_action)
+        clear_action = QAction("Clear Comparison", self)
+        clear_action.triggered.connect(self.clear_comparison)
+        clear_action.setEnabled(bool(self.comparisons or self.compare_pending))
+        self.compare_menu.addAction(clear_action)
+        if not (self.comparisons or self.compare_pending):
+            return
+        self.compare_menu.addSeparator()
+        for path, overlay in self.comparisons.items():
+            swatch = QPixmap(12, 12)
+            swatch.fill(QColor(overlay.color))
+            action = QAction(QIcon(swatch), overlay.tracks.name, self, checkable=True)
+            action.setChecked(overlay.enabled)
+            action.triggered.connect(lambda checked, path=path: self.toggle_comparison(path, checked))
+            self.compare_menu.addAction(action)
+        for path in sorted(self.compare_pending):
+            action = QAction(f"{os.path.basename(path)} (analysing)", self)
+            action.setEnabled(False)
+            self.compare_menu.addAction(action)
+        remove_menu = self.compare_menu.addMenu("Remove")
+        for path in [*self.comparisons, *sorted(self.compare_pending)]:
+            action = QAction(os.path.basename(path), self)
+            action.triggered.connect(lambda checked, path=path: self.remove_comparison(path))
+            remove_menu.addAction(action)
+
+    def add_comparison_dialog(self):
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Compare WAV Files", "", "WAV Files (*.wav *.w64)")
+        if file_paths:
+            self.add_comparison_files(file_paths)
+
+    def add_comparison_files(self, file_paths):
+        """Analyse files in parallel worker processes and overlay their tracks as they finish.
+
+        Files already compared or being analysed are skipped; the others are untouched.
+        """
+        file_paths = [os.path.abspath(path) for path in file_paths]
+        file_paths = [path for i, path in enumerate(file_paths) if path not in file_paths[:i]
+                      and path not in self.comparisons and path not in self.compare_pending]
+        if not file_paths:
+            return
+        if self.compare_pool is None:
+            # Spawned rather than forked, so workers start clean instead of copying the Qt process
+            self.compare_pool = ProcessPoolExecutor(max_workers=COMPARE_JOBS,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+        self.compare_pending.update(file_paths)
+        cache_dir = self.analysis_cache.directory if self.analysis_cache else None
+        worker = ComparisonWorker(self.compare_pool, file_paths, self.compare_generation, cache_dir,
+                                  self.analysis_config)
+        worker.tracks_ready.connect(self.on_comparison_ready)
+        worker.failed.connect(self.on_comparison_failed)
+        worker.finished.connect(lambda: self.release_comparison_worker(worker))
+        self.compare_workers.append(worker)
+        worker.start()
+        self.build_compare_menu()
+        self.statusBar().showMessage(f"Analysing {len(self.compare_pending)} files for comparison...")
+
+    def on_comparison_ready(self, generation, file_path, tracks):
+        if generation != self.compare_generation or file_path not in self.compare_pending:
+            return  # Removed, or analysed with old settings
+        self.compare_pending.discard(file_path)
+        color = COMPARE_COLORS[self.compare_colors_used % len(COMPARE_COLORS)]
+        self.compare_colors_used += 1
+        overlay = ComparisonOverlay(tracks, color, self.max_freq_plot_widget, self.max_power_plot_widget)
+        self.comparisons[file_path] = overlay
+        overlay.set_visible(not self.live)
+        overlay.set_view(self.view_names[self.display_view])
+        self.comparison_changed()
+
+    def on_comparison_failed(self, generation, file_path, message):
+        if generation != self.compare_generation or file_path not in self.compare_pending:
+            return
+        self.compare_pending.discard(file_path)
+        print(f"Could not analyse {file_path} for comparison: {message}")
+        self.comparison_changed()
+
+    def comparison_changed(self):
+        self.build_compare_menu()
+        if self.compare_pending:
+            self.statusBar().showMessage(f"Analysing {len(self.compare_pending)} files for comparison...")
+        else:
+            self.statusBar().showMessage(f"Comparing {len(self.comparisons)} files", 5000)
+
+    def toggle_comparison(self, file_path, enabled):
+        overlay = self.comparisons[file_path]
+        overlay.enabled = enabled
+        overlay.set_visible(enabled and not self.live)
+        overlay.redraw()
+
+    def remove_comparison(self, file_path):
+        """Stop comparing a file; the other compared files keep their tracks."""
+        self.compare_pending.discard(file_path)
+        overlay = self.comparisons.pop(file_path, None)
+        if overlay is not None:
+            overlay.remove()
+        self.comparison_changed()
+
+    def clear_comparison(self):
+        self.compare_pending.clear()
+        for overlay in self.comparisons.values():
+            overlay.remove()
+        self.comparisons.clear()
+        self.comparison_changed()
+
+    def release_comparison_worker(self, worker):
+        if worker in self.compare_workers:
+            self.compare_workers.remove(worker)
+        worker.deleteLater()
+
+    def on_analysis_done(self, job_id):
+        if job_id != self.analysis_job_id:
+            return
+        self.retire_current_worker()
+
+    def queue_hover(self, handler, pos):
+        """Remember the latest mouse position for handler and schedule a throttled update."""
+        self.pending_hover[handler] = pos
+        if not self.hover_timer.isActive():
+            self.hover_timer.start()
+
+    def flush_hover(self):
+        """Run each hover handler once with its most recent mouse position."""
+        pending, self.pending_hover = self.pending_hover, {}
+        for handler, pos in pending.items():
+            handler(pos)
+
+    def on_fft_mouse_moved(self, pos):
+        """Handle mouse movement over the FFT plot."""
+        if self.fft_plot_widget.sceneBoundingRect().contains(pos):
+            x = self.fft_plot_widget.getViewBox().mapSceneToView(pos).x()
+            if len(self.current_freqs) > 0 and len(self.current_magnitude_db) > 0:
+                idx = nearest_index(self.current_freqs, x)
+                closest_freq = self.current_freqs[idx]
+                closest_mag = self.current_magnitude_db[idx]
+                self.fft_hover_label.setText(f"Freq: {closest_freq:.2f} Hz, Mag: {closest_mag:.2f} dB")
+            else:
+                self.fft_hover_label.setText("Freq: N/A, Mag: N/A dB")
+
+    def on_max_power_mouse_moved(self, pos):
+        """Handle mouse movement over the Max Power plot."""
+        if self.max_power_plot_widget.sceneBoundingRect().contains(pos):
+            mouse_point = self.max_power_plot_widget.getViewBox().mapSceneToView(pos)
+            x, y = mouse_point.x(), mouse_point.y()
+            if len(self.timestamps) > 0:
+                idx = nearest_index(self.timestamps, x)
+                closest_time = self.timestamps[idx]
+                closest_power = self.max_powers[idx]
+                if np.isnan(closest_power):
+                    self.max_power_hover_label.setText(f"Time: {closest_time:.2f} s, Power: silent")
+                else:
+                    self.max_power_hover_label.setText(f"Time: {closest_time:.2f} s, Power: {closest_power:.2f} dB"
+                                                       f"{self.band_hover_text(idx, y)}")
+            else:
+                self.max_power_hover_label.setText("Time: N/A, Power: N/A dB")
+
+    def band_hover_text(self, idx, y):
+        """', <band>: <energy> dB' for the band whose energy at frame idx is closest to y, or '' without bands."""
+        if self.band_db is None or idx >= len(self.band_db) or not np.isfinite(self.band_db[idx]).any():
+            return ""
+        values = self.band_db[idx]
+        band = int(np.nanargmin(np.abs(values - y)))
+        return f", Band {self.analysis_config.filterbank.names[band]}: {values[band]:.1f} dB"
+
+    def on_max_freq_mouse_moved(self, pos):
+        """Handle mouse movement over the Max Freq plot."""
+        if self.max_freq_plot_widget.sceneBoundingRect().contains(pos):
+            x = self.max_freq_plot_widget.getViewBox().mapSceneToView(pos).x()
+            if len(self.timestamps) > 0:
+                idx = nearest_index(self.timestamps, x)
+                closest_time = self.timestamps[idx]
+                closest_freq = self.max_freqs[idx]
+                if np.isnan(closest_freq):
+                    self.max_freq_hover_label.setText(f"Time: {closest_time:.2f} s, Freq: silent")
+                else:
+                    self.max_freq_hover_label.setText(f"Time: {closest_time:.2f} s, Freq: {closest_freq:.2f} Hz")
+            else:
+                self.max_freq_hover_label.setText("Time: N/A, Freq: N/A Hz")
+
+    def on_max_power_mouse_clicked(self, event):
+        """Handle mouse click on the Max Power plot."""
+        if event.button() == Qt.LeftButton and not event.double():
+            pos = event.scenePos()
+            if self.max_power_plot_widget.sceneBoundingRect().contains(pos):
+                mouse_point = self.max_power_plot_widget.getViewBox().mapSceneToView(pos)
+                x = mouse_point.x()
+                if len(self.timestamps) > 0:
+                    idx = nearest_index(self.timestamps, x)
+                    selected_time = self.timestamps[idx]
+                    selected_power = self.max_powers[idx]
+                    selected_freq = self.max_freqs[idx]
+                    self.add_marker(selected_time, selected_freq, selected_power)
+
+    def on_max_freq_mouse_clicked(self, event):
+        """Handle mouse click on the Max Freq plot."""
+        if event.button() == Qt.LeftButton and not event.double():
+            pos = event.scenePos()
+            if self.max_freq_plot_widget.sceneBoundingRect().contains(pos):
+                mouse_point = self.max_freq_plot_widget.getViewBox().mapSceneToView(pos)
+                x = mouse_point.x()
+                if len(self.timestamps) > 0:
+                    idx = nearest_index(self.timestamps, x)
+                    selected_time = self.timestamps[idx]
+                    selected_freq = self.max_freqs[idx]
+                    selected_power = self.max_powers[idx]
+                    self.add_marker(selected_time, selected_freq, selected_power)
+
+    def add_marker(self, selected_time, selected_freq, selected_power):
+        """Mark a peak on all plots: at its time on the track plots and its frequency on the spectrum."""
+        if np.isnan(selected_freq):
+            return  # Silent frame, nothing to mark
+        self.annotations.add(selected_time, selected_freq, selected_power)
+        self.update_markers()
+
+    def update_markers(self):
+        """Redraw the markers of all plots from the annotation store."""
+        store = self.annotations
+        self.fft_markers.set_markers(store.freqs, store.powers, store.powers, store.labels)
+        self.max_power_markers.set_markers(store.times, store.powers, store.powers, store.labels)
+        self.max_freq_markers.set_markers(store.times, store.freqs, store.freqs, store.labels)
+
+    def save_markers(self):
+        """Keep the markers of the loaded file in its marker file, removing the file once they are all deleted."""
+        if self.marker_file is None:
+            return
+        try:
+            if len(self.annotations):
+                self.annotations.save_csv(self.marker_file)
+            elif os.path.exists(self.marker_file):
+                os.remove(self.marker_file)
+        except OSError as e:
+            print(f"Could not save markers to {self.marker_file}: {e}")
+
+    def import_markers_dialog(self):
+        """Add the markers of a CSV file to the current ones."""
+        file_path, _ = QFileDialog.getOpenFileName(self, "Import Markers", "", "CSV Files (*.csv)")
+        if file_path:
+            try:
+                count = self.annotations.load_csv(file_path)
+            except (OSError, ValueError) as e:
+                print(f"Could not import markers: {e}")
+                return
+            self.update_markers()
+            self.statusBar().showMessage(f"Imported {count} markers", 5000)
+
+    def export_markers_dialog(self):
+        """Write the current markers to a CSV file."""
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Markers", "markers.csv", "CSV Files (*.csv)")
+        if file_path:
+            try:
+                self.annotations.save_csv(file_path)
+            except OSError as e:
+                print(f"Could not export markers: {e}")
+                return
+            self.statusBar().showMessage(f"Exported {len(self.annotations)} markers", 5000)
+
+    def reset_views(self):
+        """Reset the views of all plots to their initial ranges."""
+        max_freq = self.analysis_config.max_freq(self.sample_rate)
+        self.fft_plot_widget.setXRange(0, max_freq)
+        self.fft_plot_widget.setYRange(-100, 0)
+        duration = max([self.total_duration] + [overlay.tracks.duration for overlay in self.comparisons.values()])
+        self.max_power_plot_widget.setXRange(0, duration)
+        self.max_power_plot_widget.setYRange(-100, 0)
+        self.max_freq_plot_widget.setXRange(0, duration)
+        self.max_freq_plot_widget.setYRange(0, max_freq)
+
+    def keyPressEvent(self, event):
+        """Handle key press events."""
+        if event.key() == Qt.Key_A:
+            self.toggle_advanced_mode()
+        elif event.key() == Qt.Key_Space:
+            if self.advanced_mode:
+                self.toggle_play_pause_advanced()
+            else:
+                self.toggle_play_pause()
+        elif event.key() == Qt.Key_R:
+            self.reset_views()
+        elif event.key() == Qt.Key_Delete:
+            self.annotations.clear()
+            self.update_markers()
+
+    def toggle_advanced_mode(self):
+        """Toggle between normal and advanced mode."""
+        self.advanced_mode = not self.advanced_mode
+        self.advanced_action.setChecked(self.advanced_mode)
+        while self.controls_layout.count():
+            item = self.controls_layout.takeAt(0)
+            if item.widget():
+                widget = item.widget()
+                self.controls_layout.removeWidget(widget)
+                widget.setParent(None)
+        if self.advanced_mode:
+            self.controls_layout.addWidget(self.advanced_controls_widget)
+            print("Switched to Advanced Mode")
+        else:
+            self.playback_start_idx = 0
+            self.playback_end_idx = len(self.data)
+            if self.is_playing:
+                self.update_loop()
+                self.request_seek(0)
+            self.update_time_label_and_fft(0)
+            self.controls_layout.addWidget(self.normal_controls_widget)
+            print("Switched to Normal Mode")
+
+    def set_playback_range(self):
+        """Set the playback range based on user input in Advanced Mode."""
+        try:
+            start_time = float(self.start_time_input.text())
+            end_time = float(self.end_time_input.text())
+            if start_time < 0 or end_time > self.total_duration or start_time >= end_time:
+                print("Invalid time range. Start must be >= 0, End must be <= duration, and Start < End.")
+                return
+            self.playback_start_idx = int(start_time * self.sample_rate)
+            self.playback_end_idx = int(end_time * self.sample_rate)
+            if self.is_playing and self.looping():
+                self.update_loop()  # The new range takes over at the next loop boundary
+            elif self.is_playing:
+                self.request_seek(self.playback_start_idx, self.playback_end_idx)
+            self.update_time_label_and_fft(int(start_time * 100))
+            print(f"Playback range set: {start_time:.2f}s to {end_time:.2f}s")
+        except ValueError:
+            print("Invalid input. Please enter valid numbers for start and end times.")
+
+    def looping(self):
+        """True when Advanced Mode playback should repeat the playback range."""
+        return self.advanced_mode and self.loop_checkbox.isChecked() and not self.live
+
+    def loop_region(self, channels):
+        """LoopRegion of the playback range with the crossfade set in the Advanced Mode controls."""
+        crossfade = int(self.crossfade_input.value() * self.sample_rate / 1000)
+        return LoopRegion(self.data, self.playback_start_idx, self.playback_end_idx, channels, crossfade)
+
+    def update_loop(self):
+        """Hand the running playback the current loop range, or stop it looping; it switches at the next wrap."""
+        if self.live or not isinstance(self.source, FileSource):
+            return
+        if self.looping():
+            self.source.set_loop(self.loop_region(self.source.channels))
+        else:
+            self.source.seek(end=self.playback_end_idx)
+            self.source.set_loop(None)
+        self.precompute_loop()
+
+    def precompute_loop(self):
+        """Analyse the loop range in the background so repeat passes take every spectrum from the cache."""
+        self.loop_precompute_stop.set()
+        if not isinstance(self.source, FileSource) or self.source.loop is None:
+            return
+        self.loop_precompute_stop = threading.Event()
+        threading.Thread(target=precompute_loop_spectra, daemon=True,
+                         args=(self.data, self.sample_rate, self.source.loop, self.analyzer_view(), self.spectrum_cache,
+                               self.analysis_config, self.loop_precompute_stop)).start()
+
+    def compute_fft_at_position(self, start_idx):
+        """Return the spectrum of the last track frame starting at or before start_idx, from the cache when possible."""
+        started = time.perf_counter() if self.telemetry.enabled else 0.0
+        config = self.analysis_config
+        frame_index = min(start_idx // config.hop, config.frame_count(len(self.data)) - 1)
+        start = frame_index * config.hop
+        chunk = self.data[start:start + config.fft_size]
+        if len(chunk) < 1:
+            return np.empty(0), np.empty(0)
+        key = spectrum_key(frame_index, self.sample_rate, self.view_names[self.display_view], config)
+        spectrum = self.spectrum_cache.get(key)
+        if spectrum is None:
+            mixed = np.asarray(chunk) @ self.mix_matrix[:, self.display_view]
+            freqs, magnitude_db = frame_spectra_db(mixed[None, :], self.sample_rate, config)
+            spectrum = (freqs, magnitude_db[0])
+            self.spectrum_cache.put(key, spectrum)
+        if self.telemetry.enabled:
+            self.telemetry.record('fft_at_position', time.perf_counter() - started)
+        return spectrum
+
+    def start_audio_stream(self, start_idx=None, end_idx=None):
+        """Start playing the loaded file, optionally within a specified range."""
+        if start_idx is not None:
+            self.start_idx = start_idx
+        try:
+            source = FileSource(self.data, self.sample_rate, self.start_idx, end_idx, telemetry=self.telemetry)
+        except OSError as e:
+            print(f"Audio output unavailable: {e}")
+            self.is_playing = False
+            self.play_pause_button.setText("Play")
+            self.advanced_play_pause_button.setText("Play")
+            return
+        if self.looping():
+            source.set_loop(self.loop_region(source.channels))
+        self.start_source(source, position_offset=self.start_idx, cache=self.spectrum_cache)
+        self.precompute_loop()
+
+    def start_source(self, source, position_offset=0, cache=None, tracks=None, latency_budget=None):
+        """Feed source through a new SampleRing into a SpectrumAnalyzer and the scrolling spectrogram."""
+        self.output_channels = source.channels
+        ring = SampleRing(max(self.analysis_config.fft_size * 8, source.sample_rate // 2), source.channels)
+        self.mailbox.clear()
+        n_bins = self.analysis_config.plan(source.sample_rate).n_bins
+        self.spectrogram_ring = SpectrogramRing(SPECTROGRAM_LIVE_COLUMNS, n_bins)
+        self.spectrogram_drawn = -1
+        self.analyzer = SpectrumAnalyzer(ring, source.sample_rate, self.mailbox, cache, self.analyzer_view(),
+                                         position_offset=position_offset, config=self.analysis_config,
+                                         spectrogram=self.spectrogram_ring, telemetry=self.telemetry,
+                                         tracks=tracks, latency_budget=latency_budget)
+        self.source = source
+        self.analyzer.start()
+        source.start(ring, self.analyzer)
+
+    def stop_audio_stream(self):
+        """Stop the audio source and its analyzer, then report underruns and dropped frames."""
+        underruns = 0
+        self.loop_precompute_stop.set()
+        if self.source is not None:
+            self.source.stop()
+            underruns = self.source.underruns
+            self.source = None
+        if self.analyzer is not None:
+            self.analyzer.stop()
+            self.analyzer = None
+        elif self.spectrogram_ring is None:
+            return  # Nothing was playing
+        self.spectrogram_ring = None
+        if self.spectrogram_image is not None:
+            self.spectrogram_plot_widget.setXRange(0, self.total_duration, padding=0)
+        self.show_static_spectrogram()
+        if self.live:
+            return  # stop_live() reports on the session
+        message = (f"Playback stopped: {underruns} underruns, {self.mailbox.dropped} dropped frames, "
+                   f"spectrum cache {self.spectrum_cache.hits} hits / {self.spectrum_cache.misses} misses")
+        print(message)
+        self.statusBar().showMessage(message, 5000)
+
+    def start_live(self, make_source):
+        """Watch the AudioSource returned by make_source instead of the loaded file.
+
+        The spectrum, the scrolling spectrogram and the peak tracks of the last
+        LIVE_RETENTION_S seconds update as samples arrive; frames that could not be shown
+        within LIVE_LATENCY_BUDGET_MS of capture are skipped.
+        """
+        if self.is_playing:
+            if self.advanced_mode:
+                self.toggle_play_pause_advanced()
+            else:
+                self.toggle_play_pause()
+        self.stop_live(reload=False)
+        try:
+            source = make_source()
+        except Exception as e:
+            print(f"Could not open live input: {e}")
+            return
+        self.cancel_analysis()
+        # Live markers are on the live timeline, so the file's markers are put away until it is shown again
+        self.save_markers()
+        self.marker_file = None
+        self.annotations.clear()
+        self.update_markers()
+        self.live = True
+        for overlay in self.comparisons.values():
+            overlay.set_visible(False)
+        self.sample_rate = source.sample_rate
+        self.view_names, self.view_labels, self.mix_matrix = channel_mixes(source.channels)
+        self.display_view = 0
+        self.build_channel_menu()
+        self.reset_tracks(0)
+        self.reset_views()
+        config = self.analysis_config
+        self.track_ring = TrackRing(max(1, int(LIVE_RETENTION_S * source.sample_rate / config.hop)), config.peaks,
+                                    0 if config.filterbank is None else len(config.filterbank))
+        self.tracks_drawn = -1
+        self.live_latency.reset()
+        self.live_over_budget = 0
+        self.live_skipped_before = self.telemetry.counters['late_frames_skipped']
+        if isinstance(source, StreamClient):
+            self.start_stream_client(source)
+        else:
+            # Live frames never repeat, so they get a one-entry cache instead of evicting the file's spectra
+            self.start_source(source, cache=SpectrumCache(max_bytes=0), tracks=self.track_ring,
+                              latency_budget=LIVE_LATENCY_BUDGET_MS / 1000)
+        self.live_label.setText(f"Live: {source.name}")
+        self.timer.start(self.update_interval_ms)
+
+    def start_stream_client(self, client):
+        """Show the spectra a StreamClient receives; the server has already analysed them."""
+        self.output_channels = client.channels
+        self.mailbox.clear()
+        self.spectrogram_ring = SpectrogramRing(SPECTROGRAM_LIVE_COLUMNS, len(client.freqs))
+        self.spectrogram_drawn = -1
+        self.analyzer = None
+        self.source = client
+        client.start(self.mailbox, self.spectrogram_ring, self.track_ring, self.analysis_config)
+
+    def connect_to_server(self):
+        """Watch the spectra of a headless server (main.py serve) as a thin client.
+
+        The window adopts the server's FFT settings so the spectrogram axes match; peak
+        count, interpolation and band energies stay local, as they are computed here.
+        """
+        address, ok = QInputDialog.getText(self, "Connect to Server", "Server (host:port):",
+                                           text=f"127.0.0.1:{STREAM_PORT}")
+        if not ok or not address.strip():
+            return
+        host, _, port = address.strip().rpartition(':')
+        try:
+            client = StreamClient(host or '127.0.0.1', int(port))
+        except (OSError, ValueError) as e:
+            message = f"Could not connect to {address}: {e}"
+            print(message)
+            self.statusBar().showMessage(message, 5000)
+            return
+        config = self.analysis_config
+        self.set_analysis_config(client.config.replace(peaks=config.peaks, interpolation=config.interpolation,
+                                                       bands=config.bands), reanalyse=False)
+        self.start_live(lambda: client)
+
+    def stop_live(self, reload=True):
+        """Stop live capture, report its latency and, with reload, show the loaded file again."""
+        if not self.live:
+            return
+        self.timer.stop()
+        source_name = self.source.name if self.source is not None else "source"
+        self.stop_audio_stream()
+        self.live = False
+        for overlay in self.comparisons.values():
+            overlay.set_visible(overlay.enabled)
+        self.track_ring = None
+        self.live_label.setText("")
+        latency = self.live_latency.summary()
+        skipped = self.telemetry.counters['late_frames_skipped'] - self.live_skipped_before
+        message = (f"Live {source_name} stopped: capture-to-display latency mean {latency['mean_us'] / 1000:.1f} ms, "
+                   f"max {latency['max_us'] / 1000:.1f} ms, {self.live_over_budget} spectra over the "
+                   f"{LIVE_LATENCY_BUDGET_MS:.0f} ms budget, {skipped} late frames skipped")
+        print(message)
+        self.statusBar().showMessage(message, 5000)
+        if reload:
+            self.load_audio_file(self.audio_file)
+
+    def update_live_plot(self):
+        """Show the newest live spectrum, spectrogram and retained peak tracks, and measure their latency."""
+        started = time.perf_counter()
+        self.update_live_spectrogram()
+        spectrum = self.mailbox.take()
+        if spectrum is not None:
+            freqs, magnitude_db, frame_end = spectrum
+            self.fft_plot.setData(freqs, magnitude_db)
+            self.current_freqs = freqs
+            self.current_magnitude_db = magnitude_db
+            captured = self.source.capture_time(frame_end)
+            if captured is not None:
+                latency = time.perf_counter() - captured
+                self.live_latency.record(latency)
+                if latency * 1000 > LIVE_LATENCY_BUDGET_MS:
+                    self.live_over_budget += 1
+                    self.telemetry.count('over_latency_budget')
+                if self.telemetry.enabled:
+                    self.telemetry.record('capture_to_display', latency)
+        ring = self.track_ring
+        if ring.version != self.tracks_drawn:
+            self.tracks_drawn = ring.version
+            timestamps, freqs, powers, bands = ring.window()
+            self.show_tracks(timestamps, freqs, powers, bands)
+            if len(timestamps) > 0:
+                for widget in (self.max_power_plot_widget, self.max_freq_plot_widget):
+                    widget.setXRange(timestamps[-1] - LIVE_RETENTION_S, timestamps[-1], padding=0)
+        if started - self.live_label_time >= 0.25:
+            self.live_label_time = started
+            latency = self.live_latency
+            self.live_label.setText(
+                f"Live: {self.source.name} | latency p50 {latency.percentile(50) / 1000:.1f} ms, "
+                f"max {latency.max * 1000:.1f} ms (budget {LIVE_LATENCY_BUDGET_MS:.0f} ms)")
+        if self.telemetry.enabled and spectrum is not None:
+            self.telemetry.record('render', time.perf_counter() - started)
+            self.telemetry.count('frames_rendered')
+        if self.source.finished:
+            self.stop_live()
+
+    def toggle_play_pause(self):
+        """Toggle between play and pause states in Normal Mode."""
+        if self.live or (not self.is_playing and len(self.data) == 0):
+            return  # Nothing loaded yet, or watching a live source
+        self.flush_scrub()
+        if not self.is_playing:
+            self.is_playing = True
+            self.play_pause_button.setText("Pause")
+            self.start_audio_stream()
+            self.timer.start(self.update_interval_ms)
+        else:
+            self.is_playing = False
+            self.play_pause_button.setText("Play")
+            self.timer.stop()
+            self.stop_audio_stream()
+
+    def toggle_play_pause_advanced(self):
+        """Toggle between play and pause states in Advanced Mode."""
+        if self.live or (not self.is_playing and len(self.data) == 0):
+            return  # Nothing loaded yet, or watching a live source
+        if not self.is_playing:
+            self.is_playing = True
+            self.advanced_play_pause_button.setText("Pause")
+            self.start_audio_stream(self.playback_start_idx, self.playback_end_idx)
+            self.timer.start(self.update_interval_ms)
+        else:
+            self.is_playing = False
+            self.advanced_play_pause_button.setText("Play")
+            self.timer.stop()
+            self.stop_audio_stream()
+
+    def seek_audio(self):
+        """Seek to the slider position in Normal Mode, immediately and without restarting the stream."""
+        self.scrub_timer.stop()
+        self.pending_scrub = None
+        if self.live:
+            return
+        value = self.slider.value()
+        self.update_time_label_and_fft(value)
+        if self.is_playing:
+            self.request_seek(int((value / 100) * self.sample_rate))
+
+    def jump_to_event(self, direction):
+        """Move the playback position to the next (direction > 0) or previous onset of the loaded file."""
+        if self.live or self.activity is None or len(self.data) == 0:
+            return
+        current_time = self.start_idx / self.sample_rate
+        if direction > 0:
+            target = self.activity.next_event(current_time)
+        else:
+            target = self.activity.previous_event(current_time)
+        if target is None:
+            self.statusBar().showMessage("No further events", 2000)
+            return
+        self.slider.blockSignals(True)
+        self.slider.setValue(int(round(target * 100)))
+        self.slider.blockSignals(False)
+        self.seek_audio()
+        number = int(np.searchsorted(self.activity.onset_times, target)) + 1
+        self.statusBar().showMessage(f"Event {number} of {len(self.activity.onsets)} at {target:.2f} s", 2000)
+
+    def request_seek(self, position, end=None):
+        """Ask the running audio callback to continue from position (and stop at end); the newest request wins."""
+        if self.source is not None:
+            self.source.seek(position, end)
+
+    def queue_scrub(self, value):
+        """Remember the newest slider value and schedule one update for the next display refresh."""
+        self.pending_scrub = value
+        if not self.scrub_timer.isActive():
+            self.scrub_timer.start()
+
+    def flush_scrub(self):
+        """Show the time and spectrum at the newest scrub position; seek if playing and not dragging."""
+        value, self.pending_scrub = self.pending_scrub, None
+        if value is None or self.live:
+            return
+        self.update_time_label_and_fft(value)
+        if self.is_playing and not self.advanced_mode and not self.slider.isSliderDown():
+            self.request_seek(int((value / 100) * self.sample_rate))
+
+    def update_time_label_and_fft(self, value=None):
+        """Update the time label and FFT plot for slider value (centiseconds), or for the current position.
+
+        While playing, the audio source owns the position, so only the display changes.
+        """
+        if value is None:
+            current_time = self.start_idx / self.sample_rate
+        else:
+            current_time = value / 100
+        self.update_time_label(current_time)
+
+        position = int(current_time * self.sample_rate)
+        if not self.is_playing:
+            self.start_idx = position
+        positive_freqs, magnitude_db = self.compute_fft_at_position(position)
+        self.fft_plot.setData(positive_freqs, magnitude_db)
+        self.current_freqs = positive_freqs
+        self.current_magnitude_db = magnitude_db
+
+    def update_time_label(self, current_time):
+        """Show current_time (in seconds) as MM:SS.CC in the active mode's time label."""
+        minutes = int(current_time // 60)
+        seconds = int(current_time % 60)
+        centiseconds = int((current_time * 100) % 100)
+        time_text = f"{minutes:02d}:{seconds:02d}.{centiseconds:02d}"
+        if self.advanced_mode:
+            self.advanced_time_label.setText(time_text)
+        else:
+            self.time_label.setText(time_text)
+
+    def update_plot(self):
+        """Update the plot during playback with the newest analysed spectrum, skipping stale ones."""
+        if self.live:
+            self.update_live_plot()
+            return
+        started = time.perf_counter() if self.telemetry.enabled else 0.0
+        if self.source is not None and self.source.finished:
+            self.is_playing = False
+        self.update_live_spectrogram()
+        spectrum = self.mailbox.take()
+        if spectrum is None and self.is_playing:
+            return
+        if spectrum is not None:
+            positive_freqs, magnitude_db = spectrum[:2]
+            self.fft_plot.setData(positive_freqs, magnitude_db)
+            self.current_freqs = positive_freqs
+            self.current_magnitude_db = magnitude_db
+        if self.source is not None:
+            self.start_idx = self.source.position
+        current_time = self.start_idx / self.sample_rate
+        if self.slider.isSliderDown():
+            pass  # The user is scrubbing; the slider and label show the scrub position
+        elif not self.advanced_mode:
+            # The spectrum is already drawn; don't let the slider recompute it
+            self.slider.blockSignals(True)
+            self.slider.setValue(int(current_time * 100))
+            self.slider.blockSignals(False)
+            self.update_time_label(current_time)
+        else:
+            self.update_time_label(current_time)
+        if self.telemetry.enabled and spectrum is not None:
+            self.telemetry.record('render', time.perf_counter() - started)
+            self.telemetry.count('frames_rendered')
+        if not self.is_playing:
+            self.timer.stop()
+            self.stop_audio_stream()
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.telemetry_timer.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
+        if self.telemetry_file is not None:
+            self.telemetry_file.close()
+            self.telemetry_file = None
+        self.cancel_analysis()
+        for worker in list(self.retired_workers):
+            worker.wait()
+        self.stop_audio_stream()
+        self.save_markers()
+        for worker in list(self.compare_workers):
+            worker.requestInterruption()
+            worker.wait()
+        if self.compare_pool is not None:
+            self.compare_pool.shutdown(wait=False, cancel_futures=True)
+            self.compare_pool = None
+        super().closeEvent(event)
+
+
+def run_gui(argv):
+    """Open the analyser window and run the Qt event loop; returns the exit code."""
+    app = QApplication(argv)
+    window = RealTimeFFT()
+    window.show()
+    return app.exec_()
@@ -0,0 +1,89 @@
+"""Level-of-detail helpers for drawing long peak tracks; numpy only, no Qt."""
+import numpy as np
+
+
+def nearest_index(sorted_values, x):
+    """Index of the element of an ascending array closest to x, by binary search."""
+    idx = int(np.searchsorted(sorted_values, x))
+    if idx == len(sorted_values) or (idx > 0 and x - sorted_values[idx - 1] < sorted_values[idx] - x):
+        idx -= 1
+    return idx
+
+
+class MinMaxPyramid:
+    """Min/max level-of-detail pyramid over a track (x sorted ascending) for plotting.
+
+    Level 0 is the raw track; each further level merges `factor` bins of the previous
+    one, keeping their minimum and maximum. A level is drawn as (min, max) pairs per bin,
+    so peaks survive decimation and the envelope looks the same at every zoom. y may also
+    be frames x series (e.g. band energies), all series sharing x and the levels.
+    """
+
+    def __init__(self, x, y, factor=4, min_bins=1024):
+        self.factor = factor
+        self.min_bins = min_bins
+        self.x = np.empty(0)
+        self.y = np.empty((0,) + np.shape(y)[1:])
+        self.levels = []  # (bin start x, bin min, bin max) for levels 1, 2, ...
+        self._buffers = []  # Growable arrays behind each level, doubled when full
+        self.extend(x, y)
+
+    def extend(self, x, y):
+        """Switch to a longer track whose first len(self.x) points are unchanged.
+
+        Only the bins covering new points are merged again, so a track growing block by
+        block costs time proportional to the new points rather than the whole track.
+        """
+        changed = len(self.x)  # First point of the current level that differs from before
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        bin_x, bin_min, bin_max = self.x, self.y, self.y
+        level = 0
+        while len(bin_x) > self.min_bins:
+            first = changed // self.factor if level < len(self.levels) else 0
+            starts = np.arange(first * self.factor, len(bin_x), self.factor)
+            offsets = starts - first * self.factor
+            n = first + len(starts)
+            if level == len(self._buffers):
+                self._buffers.append(tuple(np.empty((0,) + a.shape[1:], dtype=a.dtype) for a in (bin_x, bin_min, bin_max)))
+            buffers = self._buffers[level]
+            if n > len(buffers[0]):
+                buffers = tuple(grow(buffer, first, max(n, 2 * len(buffer))) for buffer in buffers)
+                self._buffers[level] = buffers
+            buffers[0][first:n] = bin_x[starts]
+            # fmin/fmax skip the NaNs of missing peaks
+            buffers[1][first:n] = np.fmin.reduceat(bin_min[first * self.factor:], offsets)
+            buffers[2][first:n] = np.fmax.reduceat(bin_max[first * self.factor:], offsets)
+            bin_x, bin_min, bin_max = (buffer[:n] for buffer in buffers)
+            if level < len(self.levels):
+                self.levels[level] = (bin_x, bin_min, bin_max)
+            else:
+                self.levels.append((bin_x, bin_min, bin_max))
+            changed = first
+            level += 1
+        del self.levels[level:]
+        del self._buffers[level:]
+
+    def visible(self, x0, x1, pixels):
+        """Return (x, y) to draw for the view [x0, x1], about two points per pixel at most."""
+        lo, hi = np.searchsorted(self.x, [x0, x1])
+        level = 0
+        count = hi - lo
+        while level < len(self.levels) and count > pixels:
+            level += 1
+            count //= self.factor
+        if level == 0:
+            lo, hi = max(lo - 1, 0), min(hi + 1, len(self.x))
+            return self.x[lo:hi], self.y[lo:hi]
+        bin_x, bin_min, bin_max = self.levels[level - 1]
+        lo, hi = np.searchsorted(bin_x, [x0, x1])
+        lo, hi = max(lo - 1, 0), min(hi + 1, len(bin_x))
+        pairs = np.stack([bin_min[lo:hi], bin_max[lo:hi]], axis=1)
+        return np.repeat(bin_x[lo:hi], 2), pairs.reshape((-1,) + pairs.shape[2:])
+
+
+def grow(array, keep, capacity):
+    """A new array of the given capacity (along the first axis) holding the first keep rows of array."""
+    grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:keep] = array[:keep]
+    return grown
@@ -0,0 +1,711 @@
+"""Real-time pipeline: audio sources, lock-free rings and the spectrum analyzer thread.
+
+sounddevice (and with it PortAudio) is imported only when a device stream is opened, so
+the pipeline runs on machines without audio hardware, e.g. with a FakeDeviceSource.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .engine import DEFAULT_CONFIG, SPECTROGRAM_FLOOR_DB, frame_spectra_db, power_peaks, pool_bins, spectrogram_bin_factor
+from .telemetry import Telemetry
+
+# Real-time playback and capture pipeline.
+#
+# An AudioSource (file playback, a live input device, or a file-backed fake device)
+# only copies samples into a SampleRing from its own thread and stamps each block with
+# the time it was captured. A SpectrumAnalyzer thread polls the ring, analyses the most
+# recent chunk and posts the result to a LatestMailbox, from which the GUI timer takes
+# only the newest spectrum; anything it never got to is counted as dropped. In live
+# mode the analyzer also appends peak tracks to a TrackRing holding the last
+# LIVE_RETENTION_S seconds, and never works on frames captured more than
+# DISI_LATENCY_BUDGET_MS ago, so capture-to-display latency stays bounded.
+LIVE_RETENTION_S = float(os.environ.get('DISI_LIVE_RETENTION_S', '60'))
+LIVE_LATENCY_BUDGET_MS = float(os.environ.get('DISI_LATENCY_BUDGET_MS', '100'))
+LIVE_BLOCK_FRAMES = 256  # Input and fake-device block size; small blocks keep capture latency low
+SPECTRUM_CACHE_BYTES = 64 << 20  # LRU limit for cached per-frame spectra
+SPECTROGRAM_LIVE_COLUMNS = 512  # Frames shown by the scrolling playback spectrogram
+LOOP_CROSSFADE_MS = 10  # Default crossfade where a playback loop wraps around
+LOOP_PRECOMPUTE_BATCH = 256  # Frames analysed at once when precomputing the spectra of a loop
+
+
+class SampleRing:
+    """Single-producer, single-consumer ring buffer of float32 frames x channels.
+
+    The writer fills the buffer first and only then publishes the new write_pos, a plain
+    int assignment, so neither side ever takes a lock. Readers detect a lapped read by
+    re-checking write_pos after copying.
+    """
+
+    def __init__(self, capacity, channels=1):
+        self.capacity = 1 << (max(capacity, 1) - 1).bit_length()
+        self.mask = self.capacity - 1
+        self.buffer = np.zeros((self.capacity, channels), dtype=np.float32)
+        self.write_pos = 0  # Total samples ever written
+
+    def write(self, samples):
+        """Append samples, overwriting the oldest ones once the buffer is full."""
+        pos = self.write_pos
+        n = len(samples)
+        if n > self.capacity:
+            pos += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+        start = pos & self.mask
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:n - first] = samples[first:]
+        self.write_pos = pos + n
+
+    def read_latest(self, out):
+        """Copy the newest len(out) samples into out; return their end position, or None if unavailable."""
+        end = self.write_pos
+        return end if self.read_at(end - len(out), out) else None
+
+    def read_at(self, pos, out):
+        """Copy samples [pos, pos + len(out)) into out; return False if they are not (or no longer) buffered."""
+        n = len(out)
+        if pos < 0 or pos + n > self.write_pos or self.write_pos - pos > self.capacity:
+            return False
+        start = pos & self.mask
+        first = min(n, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        out[first:] = self.buffer[:n - first]
+        return self.write_pos - pos <= self.capacity  # False if the writer lapped us while copying
+
+
+class LatestMailbox:
+    """Bounded single-slot mailbox: put() replaces any unread item, take() empties the slot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item = None
+        self.dropped = 0  # Items overwritten before anyone took them
+
+    def put(self, item):
+        with self._lock:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+
+    def take(self):
+        with self._lock:
+            item, self._item = self._item, None
+        return item
+
+    def clear(self):
+        with self._lock:
+            self._item = None
+        self.dropped = 0
+
+
+class SpectrogramRing:
+    """Scrolling spectrogram of the last capacity analysed frames, in dB, one column per frame.
+
+    Every column is written twice, at i and i + capacity, so the newest capacity columns,
+    oldest first, are always the contiguous slice view() and the image is never
+    reassembled or reallocated. Written by the analyzer thread, read by the GUI.
+    """
+
+    def __init__(self, capacity, n_bins):
+        self.capacity = capacity
+        self.bin_factor = spectrogram_bin_factor(n_bins)
+        self.buffer = np.full((2 * capacity, -(-n_bins // self.bin_factor)), SPECTROGRAM_FLOOR_DB, dtype=np.float32)
+        self.pos = 0
+        self.count = 0  # Columns written so far, to detect changes
+        self.last_frame = -1  # Frame index of the newest column
+
+    def write(self, frame_index, magnitude_db):
+        column = pool_bins(magnitude_db, self.bin_factor)
+        self.buffer[self.pos] = column
+        self.buffer[self.pos + self.capacity] = column
+        self.pos = (self.pos + 1) % self.capacity
+        self.last_frame = frame_index
+        self.count += 1
+
+    def view(self):
+        pos = self.pos
+        return self.buffer[pos:pos + self.capacity]
+
+    def clear(self):
+        self.buffer.fill(SPECTROGRAM_FLOOR_DB)
+        self.last_frame = -1
+        self.count += 1
+
+
+class TrackRing:
+    """Peak tracks (time, then frequency and power of each peak, and any band energies) of the last capacity live frames.
+
+    Stored twice like SpectrogramRing, so window() is always one contiguous slice, oldest
+    first, and memory stays fixed however long capture runs. Written by the analyzer
+    thread, read by the GUI; version changes whenever the contents do.
+    """
+
+    def __init__(self, capacity, peaks=1, bands=0):
+        self.capacity = capacity
+        self.times = np.zeros(2 * capacity)
+        self.freqs = np.full((2 * capacity, peaks), np.nan)
+        self.powers = np.full((2 * capacity, peaks), np.nan)
+        self.bands = np.full((2 * capacity, bands), np.nan)
+        self.pos = 0
+        self.filled = 0
+        self.version = 0
+
+    def append(self, timestamp, freqs, powers, bands=None):
+        for i in (self.pos, self.pos + self.capacity):
+            self.times[i] = timestamp
+            self.freqs[i] = freqs
+            self.powers[i] = powers
+            if bands is not None:
+                self.bands[i] = bands
+        self.pos = (self.pos + 1) % self.capacity
+        self.filled = min(self.filled + 1, self.capacity)
+        self.version += 1
+
+    def window(self):
+        """Return copies of (timestamps, freqs, powers, bands) of the retained frames.
+
+        freqs and powers are frames x peaks, bands frames x bands.
+        """
+        n = self.filled
+        start = self.pos + self.capacity - n
+        return (self.times[start:start + n].copy(), self.freqs[start:start + n].copy(),
+                self.powers[start:start + n].copy(), self.bands[start:start + n].copy())
+
+    def clear(self):
+        self.filled = 0
+        self.version += 1
+
+
+class SpectrumCache:
+    """Thread-safe LRU cache of (freqs, magnitude_db) spectra, bounded by total bytes.
+
+    Keys are (frame_index, analysis parameters) tuples; see spectrum_key(). hits and
+    misses count lookups so duplicate analysis work can be checked.
+    """
+
+    def __init__(self, max_bytes=SPECTRUM_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            spectrum = self._entries.get(key)
+            if spectrum is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return spectrum
+
+    def put(self, key, spectrum):
+        size = spectrum[0].nbytes + spectrum[1].nbytes
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[0].nbytes + old[1].nbytes
+            self._entries[key] = spectrum
+            self.nbytes += size
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted[0].nbytes + evicted[1].nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+def spectrum_key(frame_index, sample_rate, view, config=DEFAULT_CONFIG):
+    """Cache key for the spectrum of one view (see channel_mixes) of frame frame_index, starting at frame_index * hop."""
+    return (frame_index, view, sample_rate) + config.key()
+
+
+def loop_view(view_name, frame_index, loop, config=DEFAULT_CONFIG):
+    """The view part of the spectrum_key of a frame played in loop (a LoopRegion, or None).
+
+    Frames that reach the loop's crossfaded tail or run across its seam sound different
+    from the file's frames at the same index, so they get a key of their own.
+    """
+    if loop is None or frame_index * config.hop + config.fft_size <= loop.tail_start:
+        return view_name
+    return (view_name, loop.start, loop.end, len(loop.tail))
+
+
+class SpectrumAnalyzer(threading.Thread):
+    """Analyse the newest complete frame of a SampleRing whenever it advances and post it to a mailbox.
+
+    Frames start at multiples of config.hop in source positions (ring position +
+    position_offset), the same framing as the peak tracks, so spectra are shared through
+    the SpectrumCache. A seek inside the running stream starts a new segment (see seek());
+    frames reaching back before the segment start are only taken from the cache. When a
+    loop wraps, the frames that run across its seam are finished from the pass that
+    ended, and the spectrogram keeps its columns; it is cleared when the view changes. Each
+    frame is mixed down with view = (name, channel weights); the GUI may replace view at
+    any time and the next frame picks it up. With a SpectrogramRing (and a TrackRing)
+    every frame is also written to it, including frames skipped between polls while they
+    are still in the sample ring; the TrackRing also gets the frame's band energies when
+    the config has bands. With a latency_budget in seconds, frames older than the
+    budget are skipped rather than analysed late. Mailbox items are (freqs, magnitude_db,
+    ring position where the frame ends). Frame analysis times and the number of frames
+    pending at each wake-up go to telemetry when it is enabled.
+    """
+
+    def __init__(self, ring, sample_rate, mailbox, cache, view, position_offset=0, config=DEFAULT_CONFIG,
+                 spectrogram=None, telemetry=None, tracks=None, latency_budget=None):
+        super().__init__(daemon=True)
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.mailbox = mailbox
+        self.cache = cache
+        self.view = view
+        self.segment = (0, position_offset, None)  # (ring position where it starts, position_offset, LoopRegion)
+        self.config = config
+        self.spectrogram = spectrogram
+        self.telemetry = telemetry or Telemetry()
+        self.tracks = tracks
+        self.max_backlog = spectrogram.capacity if spectrogram is not None else 1
+        if latency_budget is not None:
+            self.max_backlog = max(1, min(self.max_backlog, int(latency_budget * sample_rate / config.hop)))
+        self.frame = np.zeros((config.fft_size, ring.buffer.shape[1]), dtype=np.float32)
+        self.poll_interval = config.hop / 2 / sample_rate
+        self.stop_event = threading.Event()
+
+    def run(self):
+        next_index = None
+        last_view = last_segment = None
+        filterbank = self.config.filterbank
+        while not self.stop_event.is_set():
+            segment = self.segment
+            frame_index = (self.ring.write_pos + segment[1] - self.config.fft_size) // self.config.hop
+            view_name, weights = self.view
+            spectrum = None
+            if view_name != last_view:
+                if self.spectrogram is not None:
+                    self.spectrogram.clear()
+                if self.tracks is not None:
+                    self.tracks.clear()
+                next_index, last_view, last_segment = frame_index, view_name, segment
+            elif segment is not last_segment:
+                loop = last_segment[2]
+                if loop is not None and segment[2] is loop and segment[0] + segment[1] == loop.start:
+                    # A wrap: the frames that ran across the seam hold the end of the pass and the new start
+                    seam_end = -(-loop.end // self.config.hop)
+                    if self.ring.write_pos < (seam_end - 1) * self.config.hop - last_segment[1] + self.config.fft_size:
+                        self.stop_event.wait(self.poll_interval)
+                        continue  # Until the ring holds all of them
+                    for index in range(max(next_index, seam_end - self.max_backlog, 0), seam_end):
+                        seam = self.analyse(index, view_name, weights, last_segment)
+                        if seam is not None:
+                            self.record(index, seam, filterbank)
+                next_index = -(-(segment[0] + segment[1]) // self.config.hop)
+                last_segment = segment
+            first = max(next_index, frame_index - self.max_backlog + 1, 0)
+            if first > max(next_index, 0):
+                self.telemetry.count('late_frames_skipped', first - max(next_index, 0))
+            timed = self.telemetry.enabled
+            if timed:
+                self.telemetry.gauge('analyzer_backlog', max(frame_index + 1 - first, 0))
+            for index in range(first, frame_index + 1):
+                started = time.perf_counter() if timed else 0.0
+                spectrum = self.analyse(index, view_name, weights, segment)
+                if timed:
+                    self.telemetry.record('analysis', time.perf_counter() - started)
+                if spectrum is not None:
+                    self.record(index, spectrum, filterbank)
+            if spectrum is not None:
+                frame_end = frame_index * self.config.hop - segment[1] + self.config.fft_size
+                self.mailbox.put(spectrum + (frame_end,))
+            next_index = max(next_index, frame_index + 1)
+            self.stop_event.wait(self.poll_interval)
+
+    def record(self, index, spectrum, filterbank):
+        """Write the spectrum of frame index to the spectrogram and its peaks (and bands) to the tracks."""
+        if self.spectrogram is not None:
+            self.spectrogram.write(index, spectrum[1])
+        if self.tracks is not None:
+            freqs, magnitude_db = spectrum
+            power = np.power(10.0, magnitude_db / 10)
+            peak_freqs, peak_db = power_peaks(freqs, power, self.config.interpolation, self.config.peaks)
+            bands = None if filterbank is None else filterbank.energy_db(freqs, power)
+            self.tracks.append(index * self.config.hop / self.sample_rate, peak_freqs, peak_db, bands)
+
+    def seek(self, ring_pos, source_pos, loop=None):
+        """Map ring position ring_pos, and everything written after it, to source position source_pos.
+
+        loop is the LoopRegion being played from there, if any. Called from the audio
+        callback; publishing the new segment is a single assignment.
+        """
+        self.segment = (ring_pos, source_pos - ring_pos, loop)
+
+    def analyse(self, frame_index, view_name, weights, segment):
+        """Return the (freqs, magnitude_db) spectrum of one frame, or None if it is not in the ring's segment."""
+        key = spectrum_key(frame_index, self.sample_rate, loop_view(view_name, frame_index, segment[2], self.config),
+                           self.config)
+        spectrum = self.cache.get(key)
+        if spectrum is None:
+            ring_pos = frame_index * self.config.hop - segment[1]
+            if ring_pos >= segment[0] and self.ring.read_at(ring_pos, self.frame):
+                mixed = (self.frame @ weights)[None, :]
+                freqs, magnitude_db = frame_spectra_db(mixed, self.sample_rate, self.config)
+                spectrum = (freqs, magnitude_db[0])
+                self.cache.put(key, spectrum)
+        return spectrum
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+def buffer_delay(time_info, start_attr):
+    """Seconds between a callback's current time and time_info.<start_attr>, or 0 when the host gives no times."""
+    try:
+        return abs(getattr(time_info, start_attr) - time_info.currentTime) if time_info.currentTime else 0.0
+    except AttributeError:
+        return 0.0
+
+
+class AudioSource:
+    """Something that writes float32 frames x channels into a SampleRing from its own thread.
+
+    start(ring, analyzer) begins writing and stop() ends it; finished becomes True when a
+    bounded source runs out. Every block is stamped with the time.perf_counter() time at
+    which its last sample was captured (or, for playback, will be heard), so
+    capture_time() can tell how long ago any recent ring position entered the system.
+    """
+    STAMPS = 256  # Block stamps kept for capture_time()
+
+    def __init__(self, sample_rate, channels, name):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.name = name
+        self.finished = False
+        self.underruns = 0
+        self.stamp_pos = np.full(self.STAMPS, -1, dtype=np.int64)
+        self.stamp_time = np.zeros(self.STAMPS)
+        self.stamps = 0
+
+    def write_block(self, ring, samples, end_time):
+        """Append samples to ring and stamp the position after them with end_time."""
+        ring.write(samples)
+        i = self.stamps % self.STAMPS
+        self.stamp_time[i] = end_time
+        self.stamp_pos[i] = ring.write_pos
+        self.stamps += 1
+
+    def capture_time(self, ring_pos):
+        """perf_counter time at which the sample just before ring_pos was captured, or None before any block.
+
+        Read from the GUI while blocks are stamped, so it may be off by one block.
+        """
+        later = self.stamp_pos >= ring_pos
+        if not later.any():
+            later = self.stamp_pos >= 0
+            if not later.any():
+                return None
+        candidates = np.flatnonzero(later)
+        i = candidates[np.argmin(self.stamp_pos[candidates])]
+        return self.stamp_time[i] - (self.stamp_pos[i] - ring_pos) / self.sample_rate
+
+    def start(self, ring, analyzer=None):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+class LoopRegion:
+    """Frames [start, end) of a file, played over and over by a FileSource.
+
+    The last crossfade frames of the loop are precomputed into tail: the end of the loop
+    fading out while the frames leading up to start fade in (equal power), so the join
+    into start is seamless and the callback only copies them. The crossfade is limited
+    to the frames available before start and to half the loop; with none it is a plain cut.
+    """
+
+    def __init__(self, data, start, end, channels, crossfade=0):
+        n = max(0, min(crossfade, start, (end - start) // 2))
+        self.start = start
+        self.end = end
+        self.tail_start = end - n
+        self.tail = np.zeros((n, channels), dtype=np.float32)
+        if n:
+            incoming = np.zeros_like(self.tail)
+            data.read_into(self.tail_start, self.tail)
+            data.read_into(start - n, incoming)
+            ramp = (np.arange(n, dtype=np.float32) + 0.5) * np.float32(np.pi / 2 / n)
+            self.tail *= np.cos(ramp)[:, None]
+            self.tail += incoming * np.sin(ramp)[:, None]
+
+    def read_into(self, data, position, out):
+        """Fill out with the frames heard from position (inside the loop) on, wrapping as a FileSource does."""
+        written = 0
+        while written < len(out):
+            n = min(len(out) - written, self.end - position)
+            chunk = out[written:written + n]
+            body = max(min(self.tail_start - position, n), 0)
+            data.read_into(position, chunk[:body])
+            offset = position + body - self.tail_start
+            chunk[body:] = self.tail[offset:offset + n - body, :out.shape[1]]
+            written += n
+            position = self.start
+
+
+def precompute_loop_spectra(data, sample_rate, region, view, cache, config=DEFAULT_CONFIG, stop_event=None):
+    """Put the spectrum of every frame starting inside a LoopRegion into cache; return the number of frames done.
+
+    Frames are read as they are played (the channels of view's weights), through the
+    crossfaded tail and across the seam into the loop start, and keyed like the
+    SpectrumAnalyzer's (see loop_view), so repeat passes of the loop analyse nothing. At
+    most half the cache is filled, from the start of the loop; setting stop_event
+    abandons the work between batches.
+    """
+    fft_size, hop = config.fft_size, config.hop
+    view_name, weights = view
+    first = -(-region.start // hop)
+    last = (region.end - 1) // hop
+    index = first
+    while index <= last and not (stop_event is not None and stop_event.is_set()):
+        count = min(LOOP_PRECOMPUTE_BATCH, last + 1 - index)
+        block = np.zeros(((count - 1) * hop + fft_size, len(weights)), dtype=np.float32)
+        region.read_into(data, index * hop, block)
+        frames = sliding_window_view(block, fft_size, axis=0)[::hop]
+        freqs, magnitude_db = frame_spectra_db(np.einsum('ncf,c->nf', frames, weights), sample_rate, config)
+        for i in range(count):
+            key = spectrum_key(index + i, sample_rate, loop_view(view_name, index + i, region, config), config)
+            cache.put(key, (freqs, magnitude_db[i].copy()))
+        if index == first:
+            last = min(last, first + max(1, cache.max_bytes // 2 // (freqs.nbytes + magnitude_db[0].nbytes)) - 1)
+        index += count
+    return index - first
+
+
+class FileSource(AudioSource):
+    """Play frames [start, end) of a loaded file through an sd.OutputStream, feeding what is played to the ring.
+
+    position is the next frame to play, written by the callback. seek() may be called from
+    the GUI at any time, also to move end; the callback applies the newest request at its
+    next buffer and starts a new analyzer segment there. With a LoopRegion set by set_loop() the callback
+    wraps from its end back to its start inside the running buffer, so repeats are
+    sample-accurate; a new region (or None to stop looping) is picked up at the next wrap,
+    and loops counts the wraps. Blocks are stamped with the time they reach the speaker.
+    If the output device has fewer channels than the file, the first ones are played.
+    """
+
+    def __init__(self, data, sample_rate, start=0, end=None, telemetry=None, name="file"):
+        import sounddevice as sd  # Raises OSError without PortAudio
+        channels = data.shape[1]
+        try:
+            device_channels = sd.query_devices(kind='output')['max_output_channels']
+        except Exception:
+            device_channels = channels
+        super().__init__(sample_rate, max(1, min(channels, device_channels)), name)
+        if self.channels < channels:
+            print(f"Output device has {device_channels} channels; playing the first {self.channels} of {channels}")
+        self.data = data
+        self.position = start
+        self.end = len(data) if end is None else end
+        self.seek_request = (0, start, self.end)  # (sequence number, position, end), replaced as a whole by seek()
+        self.applied_seek = 0  # Sequence number of the last request the callback applied
+        self.loop = None  # Newest LoopRegion requested by set_loop()
+        self.loops = 0
+        self.telemetry = telemetry or Telemetry()
+        self.stream = None
+
+    def seek(self, position=None, end=None):
+        """Ask the running callback to continue from position and stop at end; the newest request wins.
+
+        None keeps the position (or one still waiting to be applied) or the last end asked
+        for, so a range moves as a whole and a later seek cannot undo a new end.
+        """
+        previous = self.seek_request
+        if position is None and previous[0] != self.applied_seek:
+            position = previous[1]
+        self.seek_request = (previous[0] + 1, position, previous[2] if end is None else end)
+
+    def set_loop(self, loop):
+        """Loop over a LoopRegion, or stop looping with None, from the next wrap (at once if not looping yet)."""
+        self.loop = loop
+
+    def start(self, ring, analyzer=None):
+        import sounddevice as sd
+        telemetry = self.telemetry
+        clock = time.perf_counter
+        applied_seek = self.seek_request
+        loop = None
+
+        def audio_callback(outdata, frames, time_info, status):
+            # Real-time thread: copy samples and advance the position, nothing else
+            nonlocal applied_seek, loop
+            started = clock()
+            if loop is None and self.loop is not None:
+                loop = self.loop
+                if analyzer is not None:
+                    analyzer.seek(ring.write_pos, self.position, loop)
+            request = self.seek_request
+            if request is not applied_seek:
+                # Seek requested by the GUI: jump there within this same buffer
+                applied_seek = request
+                self.applied_seek = request[0]
+                self.end = request[2]
+                if request[1] is not None:
+                    self.position = request[1]
+                    if analyzer is not None:
+                        analyzer.seek(ring.write_pos, self.position, loop)
+            if status.output_underflow:
+                self.underruns += 1
+                telemetry.count('underruns')
+            if status.output_overflow:
+                telemetry.count('overflows')
+            heard = started + buffer_delay(time_info, 'outputBufferDacTime')
+            written = 0
+            while written < frames:
+                if loop is not None and self.position >= loop.end:
+                    # Loop boundary: wrap within this buffer, taking the newest region
+                    loop = self.loop
+                    if loop is not None:
+                        self.position = loop.start
+                        self.loops += 1
+                    if analyzer is not None:
+                        analyzer.seek(ring.write_pos, self.position, loop)
+                stop_at = self.end if loop is None else loop.end
+                out = outdata[written:written + max(min(frames - written, stop_at - self.position), 0)]
+                if len(out) == 0:
+                    break
+                if loop is not None and self.position + len(out) > loop.tail_start:
+                    # The crossfaded end of the loop comes precomputed
+                    body = max(loop.tail_start - self.position, 0)
+                    self.data.read_into(self.position, out[:body])
+                    offset = self.position + body - loop.tail_start
+                    out[body:] = loop.tail[offset:offset + len(out) - body]
+                    n = len(out)
+                else:
+                    # Scale straight from the memory map into the output buffer
+                    n = self.data.read_into(self.position, out)
+                written += n
+                self.position += n
+                self.write_block(ring, out[:n], heard + written / self.sample_rate)
+                if n < len(out):
+                    break
+            if written < frames:
+                outdata[written:] = 0
+                self.finished = True
+                raise sd.CallbackStop()
+            if telemetry.enabled:
+                telemetry.record('callback', clock() - started)
+
+        self.stream = sd.OutputStream(samplerate=self.sample_rate, channels=self.channels,
+                                      dtype='float32', callback=audio_callback)
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+
+class InputSource(AudioSource):
+    """Capture from an input device (None for the default) through an sd.InputStream.
+
+    Small blocks and PortAudio's low-latency setting keep the delay before samples reach
+    the ring short; each block is stamped with the ADC time of its last sample.
+    """
+
+    def __init__(self, device=None, sample_rate=None, channels=None, blocksize=LIVE_BLOCK_FRAMES, telemetry=None):
+        import sounddevice as sd  # Raises OSError without PortAudio
+        info = sd.query_devices(device, kind='input')
+        super().__init__(int(sample_rate or info['default_samplerate']),
+                         channels or max(1, min(2, info['max_input_channels'])), info['name'])
+        self.device = device
+        self.blocksize = blocksize
+        self.telemetry = telemetry or Telemetry()
+        self.stream = None
+
+    def start(self, ring, analyzer=None):
+        import sounddevice as sd
+        telemetry = self.telemetry
+        clock = time.perf_counter
+        frame_s = 1 / self.sample_rate
+
+        def input_callback(indata, frames, time_info, status):
+            # Real-time thread: copy samples into the ring, nothing else
+            started = clock()
+            if status.input_overflow:
+                telemetry.count('overflows')
+            self.write_block(ring, indata, started - buffer_delay(time_info, 'inputBufferAdcTime') + frames * frame_s)
+            if telemetry.enabled:
+                telemetry.record('callback', clock() - started)
+
+        self.stream = sd.InputStream(device=self.device, samplerate=self.sample_rate, channels=self.channels,
+                                     dtype='float32', blocksize=self.blocksize, latency='low',
+                                     callback=input_callback)
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+
+class FakeDeviceSource(AudioSource):
+    """A deterministic stand-in for an input device that replays a loaded file in fixed blocks.
+
+    A thread writes blocksize frames at a time, paced against perf_counter deadlines so it
+    runs in real time (or as fast as it can with realtime=False), looping the file unless
+    loop is False. Every run delivers the same samples in the same blocks, which makes it
+    usable for tests and benchmarks on machines without audio hardware.
+    """
+
+    def __init__(self, data, sample_rate, blocksize=LIVE_BLOCK_FRAMES, realtime=True, loop=True,
+                 name="fake device"):
+        super().__init__(sample_rate, data.shape[1], name)
+        self.data = data
+        self.blocksize = blocksize
+        self.realtime = realtime
+        self.loop = loop
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self, ring, analyzer=None):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, args=(ring,), daemon=True)
+        self.thread.start()
+
+    def run(self, ring):
+        block = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+        block_s = self.blocksize / self.sample_rate
+        position = 0
+        deadline = time.perf_counter()
+        while not self.stop_event.is_set():
+            n = self.data.read_into(position, block)
+            position += n
+            while n < self.blocksize and self.loop and len(self.data) > 0:
+                # Wrap as often as needed: the file may be shorter than a block
+                position = self.data.read_into(0, block[n:])
+                n += position
+            if self.realtime:
+                deadline += block_s
+                self.stop_event.wait(max(deadline - time.perf_counter(), 0.0))
+                self.write_block(ring, block[:n], deadline)
+            else:
+                self.write_block(ring, block[:n], time.perf_counter())
+            if n < self.blocksize:
+                self.finished = True
+                return
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,397 @@
+"""Live spectra streamed to several local clients over TCP, and the headless server that produces them.
+
+    python main.py serve test.wav --encoding uint8 --delta
+
+The server runs the same source, SampleRing and SpectrumAnalyzer pipeline as the window's
+live mode, without Qt. Needs only numpy and the standard library; sounddevice is only
+imported for --play and --input, as in disi.realtime.
+"""
+import os
+import json
+import time
+import zlib
+import socket
+import struct
+import asyncio
+import argparse
+import threading
+import numpy as np
+
+from .engine import AnalysisConfig, DEFAULT_CONFIG, CHUNK_SIZE, WINDOW_TYPES, SPECTROGRAM_FLOOR_DB, channel_mixes, power_peaks
+from .realtime import (LIVE_LATENCY_BUDGET_MS, SampleRing, SpectrumCache, SpectrumAnalyzer, FileSource, InputSource,
+                       FakeDeviceSource)
+from .wav import WavReader, MappedAudio
+
+# Spectrum streaming protocol.
+#
+# A connection carries messages framed by a 4-byte little-endian length. The server
+# first sends a hello: b'H' and a JSON object with the source name, sample rate,
+# analysis config, number of bins and encoding. Every analysed frame then follows as
+# b'F', FRAME_HEADER and the dB value of each bin, either as float16 or as uint8 steps
+# from STREAM_FLOOR_DB to 0 dB. With delta encoding, a frame that directly follows the
+# last frame a client received is sent as the zlib-compressed wrap-around difference
+# of the codes instead, which is exact and far smaller for slowly changing spectra. A
+# client that missed a frame gets a full key frame. Frames are encoded once, however
+# many clients there are. Each client has a one-frame slot like a LatestMailbox, so a
+# slow client loses frames instead of holding up the others.
+STREAM_PORT = int(os.environ.get('DISI_STREAM_PORT', '8765'))
+STREAM_ENCODINGS = ('uint8', 'float16')
+STREAM_FLOOR_DB = SPECTROGRAM_FLOOR_DB  # uint8 code 0; code 255 is 0 dB
+STREAM_BUFFER_BYTES = 64 << 10  # Unsent bytes queued per client, in the socket and in asyncio, before its frames drop
+FRAME_HEADER = struct.Struct('<cBIdd')  # b'F', flags, sequence number, frame time (s), capture time (epoch s)
+MESSAGE_LENGTH = struct.Struct('<I')
+DELTA_FLAG = 1
+
+
+def encode_codes(magnitude_db, encoding):
+    """The integer codes sent for a spectrum in dB: uint8 steps above STREAM_FLOOR_DB, or float16 bits."""
+    if encoding == 'uint8':
+        steps = (np.asarray(magnitude_db) - STREAM_FLOOR_DB) * (255 / -STREAM_FLOOR_DB)
+        return np.clip(np.rint(steps), 0, 255).astype(np.uint8)
+    return np.asarray(magnitude_db, dtype='<f2').view('<u2')
+
+
+def decode_codes(codes, encoding):
+    """Inverse of encode_codes(): float32 dB values."""
+    if encoding == 'uint8':
+        return codes.astype(np.float32) * np.float32(-STREAM_FLOOR_DB / 255) + np.float32(STREAM_FLOOR_DB)
+    return codes.view('<f2').astype(np.float32)
+
+
+def message(payload):
+    return MESSAGE_LENGTH.pack(len(payload)) + payload
+
+
+def read_message(sock):
+    """Read one message from a blocking socket; None once the connection is closed."""
+    header = recv_exactly(sock, MESSAGE_LENGTH.size)
+    return None if header is None else recv_exactly(sock, MESSAGE_LENGTH.unpack(header)[0])
+
+
+def recv_exactly(sock, n):
+    buffer = bytearray(n)
+    view = memoryview(buffer)
+    while view:
+        received = sock.recv_into(view)
+        if received == 0:
+            return None
+        view = view[received:]
+    return bytes(buffer)
+
+
+async def read_message_async(reader):
+    """Read one message from an asyncio StreamReader; None once the connection is closed."""
+    try:
+        header = await reader.readexactly(MESSAGE_LENGTH.size)
+        return await reader.readexactly(MESSAGE_LENGTH.unpack(header)[0])
+    except asyncio.IncompleteReadError:
+        return None
+
+
+class StreamFrame:
+    """One published spectrum, encoded once: key is the full message, delta the one relative to frame seq - 1."""
+
+    def __init__(self, seq, key, delta=None):
+        self.seq = seq
+        self.key = key
+        self.delta = delta
+
+
+class FrameDecoder:
+    """Turn the frame messages of one connection back into spectra, following the deltas.
+
+    freqs is the frequency axis described by the hello; missed counts frames the server
+    skipped for this client.
+    """
+
+    def __init__(self, hello):
+        self.encoding = hello['encoding']
+        self.config = AnalysisConfig(**hello['config'])
+        nfft = self.config.fft_size * self.config.zero_pad
+        self.freqs = np.fft.rfftfreq(nfft, 1.0 / hello['sample_rate'])[:hello['bins']]
+        self.dtype = np.dtype(np.uint8 if self.encoding == 'uint8' else '<u2')
+        self.codes = None
+        self.last_seq = None
+        self.missed = 0
+
+    def decode(self, payload):
+        """Return (seq, frame time in s, capture time in epoch s, magnitude_db) of a frame message."""
+        _, flags, seq, time_s, captured = FRAME_HEADER.unpack_from(payload)
+        body = payload[FRAME_HEADER.size:]
+        if flags & DELTA_FLAG:
+            if self.last_seq != seq - 1:
+                raise ValueError(f"Delta frame {seq} does not follow frame {self.last_seq}")
+            codes = self.codes + np.frombuffer(zlib.decompress(body), dtype=self.dtype)
+        else:
+            codes = np.frombuffer(body, dtype=self.dtype)
+        if self.last_seq is not None:
+            self.missed += seq - self.last_seq - 1
+        self.codes, self.last_seq = codes, seq
+        return seq, time_s, captured, decode_codes(codes, self.encoding)
+
+
+class ClientFeed:
+    """One connected client: a one-frame slot and the loop writing it out at the client's own pace."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.frame = None
+        self.task = None
+        self.ready = asyncio.Event()
+        self.last_seq = None
+        self.sent = 0
+        self.dropped = 0  # Frames replaced in the slot before they could be sent
+
+    def offer(self, frame):
+        if self.frame is not None:
+            self.dropped += 1
+        self.frame = frame
+        self.ready.set()
+
+    async def run(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            frame, self.frame = self.frame, None
+            delta = frame.delta is not None and self.last_seq == frame.seq - 1
+            self.writer.write(frame.delta if delta else frame.key)
+            self.last_seq = frame.seq
+            self.sent += 1
+            await self.writer.drain()  # Waits while the client is behind; newer frames replace the slot meanwhile
+
+
+class SpectrumServer:
+    """Publish spectra to every connected TCP client; put() makes it the mailbox of a SpectrumAnalyzer.
+
+    put() may be called from any thread. It stamps the frame with its time in the source
+    and its capture time, and hands it to the event loop, which encodes it once and
+    offers it to each ClientFeed. published counts the frames and dropped the frames
+    that departed clients lost for being slow.
+    """
+
+    def __init__(self, hello, source=None, encoding='uint8', delta=False):
+        if encoding not in STREAM_ENCODINGS:
+            raise ValueError(f"Unknown encoding {encoding!r}; choose from {', '.join(STREAM_ENCODINGS)}")
+        self.hello = dict(hello, encoding=encoding, delta=delta)
+        self.source = source
+        self.encoding = encoding
+        self.delta = delta
+        self.clients = set()
+        self.published = 0
+        self.dropped = 0
+        self.previous = None
+        self.loop = None
+        self.server = None
+        self.port = None
+
+    async def start(self, host='127.0.0.1', port=STREAM_PORT):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        tasks = [client.task for client in self.clients]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def put(self, item):
+        """Mailbox interface for the analyzer thread: item is (freqs, magnitude_db, ring position of the frame end)."""
+        _, magnitude_db, frame_end = item
+        captured = self.source.capture_time(frame_end) if self.source is not None else None
+        age = 0.0 if captured is None else time.perf_counter() - captured
+        captured = time.time() - age
+        time_s = (frame_end - self.hello['config']['fft_size']) / self.hello['sample_rate']
+        try:
+            self.loop.call_soon_threadsafe(self.publish, magnitude_db, time_s, captured)
+        except RuntimeError:
+            pass  # The event loop has closed; the analyzer is about to be stopped
+
+    def publish(self, magnitude_db, time_s, captured):
+        codes = encode_codes(magnitude_db, self.encoding)
+        self.published += 1
+        header = FRAME_HEADER.pack(b'F', 0, self.published, time_s, captured)
+        key = message(header + codes.tobytes())
+        delta = None
+        if self.delta and self.previous is not None:
+            difference = zlib.compress((codes - self.previous).tobytes(), 1)
+            delta = message(FRAME_HEADER.pack(b'F', DELTA_FLAG, self.published, time_s, captured) + difference)
+        self.previous = codes
+        frame = StreamFrame(self.published, key, delta)
+        for client in self.clients:
+            client.offer(frame)
+
+    async def handle_client(self, reader, writer):
+        # Small buffers make a slow client fall behind within a few frames rather than seconds
+        writer.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, STREAM_BUFFER_BYTES // 2)
+        writer.transport.set_write_buffer_limits(high=STREAM_BUFFER_BYTES // 2)
+        peer = writer.get_extra_info('peername')
+        writer.write(message(b'H' + json.dumps(self.hello).encode()))
+        client = ClientFeed(writer)
+        client.task = asyncio.current_task()
+        self.clients.add(client)
+        try:
+            await client.run()
+        except (ConnectionError, OSError, asyncio.CancelledError):
+            pass  # The client went away, or close() is shutting the server down
+        finally:
+            self.clients.discard(client)
+            self.dropped += client.dropped
+            writer.close()
+            print(f"Client {peer} left: {client.sent} frames sent, {client.dropped} dropped")
+
+
+async def serve(make_source, config=DEFAULT_CONFIG, host='127.0.0.1', port=STREAM_PORT, encoding='uint8', delta=False,
+                view=None, started=None, stop=None):
+    """Analyse the AudioSource returned by make_source and stream its spectra until it ends or stop is set.
+
+    view names the channel view streamed (see channel_mixes; by default mid for stereo,
+    otherwise the first channel). started(server) is called once clients can connect.
+    """
+    source = make_source()
+    views, _, mix = channel_mixes(source.channels)
+    view = view or ('mid' if 'mid' in views else views[0])
+    if view not in views:
+        raise ValueError(f"Unknown view {view!r}; choose from {', '.join(views)}")
+    hello = {'name': source.name, 'view': view, 'sample_rate': source.sample_rate, 'config': config.params(),
+             'bins': config.plan(source.sample_rate).n_bins}
+    server = SpectrumServer(hello, source, encoding, delta)
+    await server.start(host, port)
+    ring = SampleRing(max(config.fft_size * 8, source.sample_rate // 2), source.channels)
+    # Live frames never repeat, so the analyzer gets a one-entry cache
+    analyzer = SpectrumAnalyzer(ring, source.sample_rate, server, SpectrumCache(max_bytes=0),
+                                (view, mix[:, views.index(view)]), config=config,
+                                latency_budget=LIVE_LATENCY_BUDGET_MS / 1000)
+    analyzer.start()
+    source.start(ring, analyzer)
+    if started is not None:
+        started(server)
+    try:
+        while not source.finished and not (stop is not None and stop.is_set()):
+            await asyncio.sleep(0.1)
+    finally:
+        source.stop()
+        analyzer.stop()
+        await server.close()
+    return server
+
+
+class StreamClient:
+    """Receive a server's spectra on a thread and feed the mailbox and rings a live SpectrumAnalyzer would.
+
+    Connecting reads the hello, so name, sample_rate, config and freqs are known before
+    start(). Peak tracks (and band energies, with bands in the config passed to start())
+    are computed from the received spectra. Mailbox items carry the frame's sequence
+    number where an analyzer puts a ring position, and capture_time() maps it to the
+    perf_counter time of capture; across machines that is off by their clock difference.
+    finished becomes True when the server goes away.
+    """
+    STAMPS = 256  # Capture times kept for capture_time()
+
+    def __init__(self, host='127.0.0.1', port=STREAM_PORT, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        try:
+            hello = read_message(self.sock)
+            if hello is None or hello[:1] != b'H':
+                raise OSError(f"No disi stream at {host}:{port}")
+            self.hello = json.loads(hello[1:])
+        except BaseException:
+            self.sock.close()
+            raise
+        self.sock.settimeout(None)
+        self.decoder = FrameDecoder(self.hello)
+        self.name = f"{self.hello['name']} ({self.hello['view']}) at {host}:{port}"
+        self.sample_rate = self.hello['sample_rate']
+        self.config = self.decoder.config
+        self.freqs = self.decoder.freqs
+        self.channels = 1
+        self.finished = False
+        self.underruns = 0
+        self.received = 0
+        self.capture_times = np.zeros(self.STAMPS)
+        self.thread = None
+
+    def start(self, mailbox, spectrogram=None, tracks=None, config=None):
+        config = config or self.config
+        self.thread = threading.Thread(target=self.run, args=(mailbox, spectrogram, tracks, config), daemon=True)
+        self.thread.start()
+
+    def run(self, mailbox, spectrogram, tracks, config):
+        hop_s = self.config.hop / self.sample_rate
+        try:
+            while True:
+                payload = read_message(self.sock)
+                if payload is None:
+                    break
+                seq, time_s, captured, magnitude_db = self.decoder.decode(payload)
+                self.capture_times[seq % self.STAMPS] = captured - time.time() + time.perf_counter()
+                self.received += 1
+                if spectrogram is not None:
+                    spectrogram.write(int(round(time_s / hop_s)), magnitude_db)
+                if tracks is not None:
+                    power = np.power(10.0, magnitude_db / 10)
+                    peak_freqs, peak_db = power_peaks(self.freqs, power, config.interpolation, config.peaks)
+                    bands = None if config.filterbank is None else config.filterbank.energy_db(self.freqs, power)
+                    tracks.append(time_s, peak_freqs, peak_db, bands)
+                mailbox.put((self.freqs, magnitude_db, seq))
+        except (OSError, ValueError):
+            pass
+        self.finished = True
+
+    def capture_time(self, seq):
+        return self.capture_times[seq % self.STAMPS]
+
+    def stop(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def run_serve(argv):
+    """Entry point for the headless spectrum server."""
+    parser = argparse.ArgumentParser(prog='main.py serve', description="Analyse a file or an input device without a GUI and stream its spectra to clients over TCP.")
+    parser.add_argument('file', nargs='?', default='test.wav', help="WAV file to analyse (default: test.wav); replayed in real time, looping")
+    parser.add_argument('--play', action='store_true', help="Play the file through the output device once instead of replaying it silently")
+    parser.add_argument('--input', action='store_true', help="Capture the default input device instead of a file")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=STREAM_PORT, help=f"TCP port (default: {STREAM_PORT}, or DISI_STREAM_PORT)")
+    parser.add_argument('--encoding', choices=STREAM_ENCODINGS, default='uint8', help="dB values as uint8 steps or float16 (default: uint8)")
+    parser.add_argument('--delta', action='store_true', help="Send frames as compressed differences from the previous frame")
+    parser.add_argument('--view', help="Channel view to stream: ch1, ch2, ... or mid/side (default: mid for stereo, else ch1)")
+    parser.add_argument('--fft-size', type=int, default=CHUNK_SIZE, help=f"FFT frame length in samples (default: {CHUNK_SIZE})")
+    parser.add_argument('--hop', type=int, help="Samples between frame starts (default: the FFT size, no overlap)")
+    parser.add_argument('--window', choices=WINDOW_TYPES, default='hann', help="FFT window (default: hann)")
+    parser.add_argument('--max-freq', type=float, help="Highest frequency streamed in Hz (default: Nyquist)")
+    args = parser.parse_args(argv)
+    try:
+        config = AnalysisConfig(args.fft_size, args.hop, args.window, max_freq_hz=args.max_freq)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def make_source():
+        if args.input:
+            return InputSource()
+        data = MappedAudio(WavReader(args.file))
+        data.compute_gain()
+        sample_rate = data.reader.sample_rate
+        return FileSource(data, sample_rate) if args.play else FakeDeviceSource(data, sample_rate, name=args.file)
+
+    def started(server):
+        print(f"Streaming spectra on {args.host}:{server.port} ({args.encoding}{', delta' if args.delta else ''}); "
+              f"Ctrl+C stops")
+
+    try:
+        asyncio.run(serve(make_source, config, args.host, args.port, args.encoding, args.delta, args.view, started))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Cannot serve: {e}")
+        return 1
+    return 0
@@ -0,0 +1,115 @@
+"""Latency histograms, counters and gauges for the real-time paths, with a JSON endpoint."""
+import os
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Performance telemetry.
+#
+# Hot paths time themselves with time.perf_counter (monotonic) into preallocated
+# power-of-two histograms, guarded by a single `telemetry.enabled` check so a disabled
+# layer costs one attribute lookup per call. The GUI summarises the counters once per
+# second into the status-bar overlay, an optional JSON-lines file and an optional local
+# HTTP endpoint. DISI_TELEMETRY=1 shows the overlay at startup; DISI_TELEMETRY_FILE and
+# DISI_METRICS_PORT turn on the export and the endpoint (and with them the collection).
+TELEMETRY_ON_START = os.environ.get('DISI_TELEMETRY', '') not in ('', '0')
+TELEMETRY_FILE = os.environ.get('DISI_TELEMETRY_FILE') or None
+METRICS_PORT = int(os.environ.get('DISI_METRICS_PORT', '0'))
+TELEMETRY_STAGES = ('callback', 'analysis', 'render', 'fft_at_position', 'capture_to_display')
+
+
+class LatencyHistogram:
+    """Durations counted in power-of-two microsecond buckets; recording is a few integer operations."""
+    BUCKETS = 24  # The last bucket holds everything from about 8 s up
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Upper bound in microseconds of the bucket holding the p-th percentile."""
+        rank = p / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(float(1 << bucket), self.max * 1e6)
+        return 0.0
+
+    def summary(self):
+        return {'count': self.count, 'mean_us': self.total / self.count * 1e6 if self.count else 0.0,
+                'p50_us': self.percentile(50), 'p90_us': self.percentile(90), 'p99_us': self.percentile(99),
+                'max_us': self.max * 1e6}
+
+
+class Telemetry:
+    """Per-stage latency histograms, event counters and gauges shared by the audio, analyzer and GUI threads.
+
+    Counters are only ever incremented by one thread each, so no locks are taken; a
+    snapshot taken while they change may be off by an event or two.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = {name: LatencyHistogram() for name in TELEMETRY_STAGES}
+        self.counters = {'underruns': 0, 'overflows': 0, 'frames_rendered': 0, 'late_frames_skipped': 0,
+                         'over_latency_budget': 0}
+        self.gauges = {}
+
+    def record(self, stage, seconds):
+        self.stages[stage].record(seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def reset(self):
+        for histogram in self.stages.values():
+            histogram.reset()
+        for name in self.counters:
+            self.counters[name] = 0
+        self.gauges.clear()
+
+    def snapshot(self):
+        return {'time': time.time(), 'stages': {name: h.summary() for name, h in self.stages.items()},
+                'counters': dict(self.counters), 'gauges': dict(self.gauges)}
+
+
+class MetricsServer:
+    """Serve the latest telemetry snapshot as JSON on http://127.0.0.1:<port>/ from a daemon thread."""
+
+    def __init__(self, telemetry, port):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(telemetry.snapshot()).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Keep scrapes out of the console
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,193 @@
+"""WAV, RF64/BW64 and Wave64 reading through memory maps."""
+import os
+import struct
+import numpy as np
+
+# Memory-mapped WAV loading.
+#
+# WavReader parses RIFF, RF64/BW64 (for data beyond the 4 GB RIFF limit) and Sony
+# Wave64 headers itself and memory-maps the PCM data in its native dtype, so opening a
+# file costs only the header parse. MappedAudio exposes all channels (or one) as an
+# array-like whose slices are converted to normalized float32 on demand.
+W64_RIFF_GUID = b'riff\x2e\x91\xcf\x11\xa5\xd6\x28\xdb\x04\xc1\x00\x00'
+W64_GUID_SUFFIX = b'\xf3\xac\xd3\x11\x8c\xd1\x00\xc0\x4f\x8e\xdb\x8a'
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+GAIN_BLOCK_SIZE = 1 << 20  # Samples per block in the streaming normalization pass
+
+
+class WavReader:
+    """Memory-mapped reader for PCM and float WAV files (RIFF, RF64/BW64 and Wave64)."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file_size = os.path.getsize(file_path)
+        with open(file_path, 'rb') as f:
+            header = f.read(16)
+            if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+                fmt, data_offset, data_size = self._parse_riff(f, rf64=False)
+            elif header[:4] in (b'RF64', b'BW64') and header[8:12] == b'WAVE':
+                fmt, data_offset, data_size = self._parse_riff(f, rf64=True)
+            elif header == W64_RIFF_GUID:
+                fmt, data_offset, data_size = self._parse_w64(f)
+            else:
+                raise ValueError("Not a RIFF, RF64 or Wave64 WAVE file")
+        self._parse_fmt(fmt)
+
+        # Streamed or truncated files may claim more data than is actually present
+        data_size = min(data_size, self.file_size - data_offset)
+        self.n_frames = max(data_size, 0) // self.block_align
+        if self.sample_width == 3:
+            dtype, shape = np.uint8, (self.n_frames, self.channels, 3)
+        else:
+            dtype, shape = self.dtype, (self.n_frames, self.channels)
+        if self.n_frames:
+            self.samples = np.memmap(file_path, dtype=dtype, mode='r', offset=data_offset, shape=shape)
+        else:
+            self.samples = np.zeros(shape, dtype=dtype)
+
+    def _parse_riff(self, f, rf64):
+        """Walk RIFF-style chunks and return (fmt bytes, data offset, data size)."""
+        f.seek(12)
+        fmt = None
+        ds64_data_size = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                break
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+            if chunk_id == b'ds64':
+                ds64 = f.read(chunk_size)
+                ds64_data_size = struct.unpack('<Q', ds64[8:16])[0]
+                f.seek(chunk_size % 2, 1)
+            elif chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                f.seek(chunk_size % 2, 1)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError("WAV data chunk found before fmt chunk")
+                if rf64 and chunk_size == 0xFFFFFFFF:
+                    if ds64_data_size is None:
+                        raise ValueError("RF64 file is missing its ds64 chunk")
+                    chunk_size = ds64_data_size
+                return fmt, f.tell(), chunk_size
+            else:
+                f.seek(chunk_size + chunk_size % 2, 1)
+        raise ValueError("WAV file has no fmt or data chunk")
+
+    def _parse_w64(self, f):
+        """Walk Wave64 chunks (GUID ids, 64-bit sizes, 8-byte alignment)."""
+        f.seek(24)
+        if f.read(16) != b'wave' + W64_GUID_SUFFIX:
+            raise ValueError("Wave64 file is missing its wave GUID")
+        fmt = None
+        while True:
+            chunk_header = f.read(24)
+            if len(chunk_header) < 24:
+                break
+            chunk_guid, chunk_size = chunk_header[:16], struct.unpack('<Q', chunk_header[16:])[0]
+            body_size = chunk_size - 24
+            if chunk_guid == b'fmt ' + W64_GUID_SUFFIX:
+                fmt = f.read(body_size)
+            elif chunk_guid == b'data' + W64_GUID_SUFFIX:
+                if fmt is None:
+                    raise ValueError("WAV data chunk found before fmt chunk")
+                return fmt, f.tell(), body_size
+            else:
+                f.seek(body_size, 1)
+            f.seek(-chunk_size % 8, 1)
+        raise ValueError("WAV file has no fmt or data chunk")
+
+    def _parse_fmt(self, fmt):
+        """Decode the fmt chunk into sample rate, channel count and sample dtype."""
+        if fmt is None or len(fmt) < 16:
+            raise ValueError("WAV fmt chunk is missing or too short")
+        format_tag, self.channels, self.sample_rate, _, self.block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            format_tag = struct.unpack('<H', fmt[24:26])[0]
+        self.sample_width = bits // 8
+        if self.channels < 1 or self.block_align != self.channels * self.sample_width:
+            raise ValueError("Unsupported WAV layout")
+        if format_tag == WAVE_FORMAT_PCM and bits in (8, 16, 24, 32):
+            self.dtype = {8: np.dtype(np.uint8), 16: np.dtype('<i2'), 24: np.dtype('<i4'), 32: np.dtype('<i4')}[bits]
+        elif format_tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+            self.dtype = np.dtype('<f4') if bits == 32 else np.dtype('<f8')
+        else:
+            raise ValueError(f"Unsupported WAV format {format_tag} with {bits} bits per sample")
+
+    def read(self, start, stop, channel=None):
+        """Return frames [start, stop) as float32, centred but not normalized.
+
+        With channel=None the result is frames x channels, otherwise a single channel.
+        """
+        raw = self.samples[start:stop] if channel is None else self.samples[start:stop, channel]
+        if self.sample_width == 3:
+            padded = np.zeros(raw.shape[:-1] + (4,), dtype=np.uint8)
+            padded[..., 1:] = raw
+            return (padded.view('<i4')[..., 0] >> 8).astype(np.float32)
+        block = raw.astype(np.float32)
+        if self.dtype == np.uint8:
+            block -= 128
+        return block
+
+
+class MappedAudio:
+    """A WavReader's channels (or one of them) as a lazily scaled float32 array-like.
+
+    Supports len(), .shape, .ndim and contiguous slicing; each slice reads only the
+    requested frames from the memory map and multiplies them by the normalization gain.
+    With channel=None slices are frames x channels, otherwise 1D.
+    """
+
+    def __init__(self, reader, channel=None, gain=1.0):
+        self.reader = reader
+        self.channel = channel
+        self.gain = np.float32(gain)
+
+    @property
+    def shape(self):
+        if self.channel is None:
+            return (self.reader.n_frames, self.reader.channels)
+        return (self.reader.n_frames,)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __len__(self):
+        return self.reader.n_frames
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("MappedAudio only supports contiguous slices")
+        start, stop, _ = key.indices(len(self))
+        block = self.reader.read(start, max(start, stop), self.channel)
+        block *= self.gain
+        return block
+
+    def read_into(self, start, out):
+        """Scale frames starting at start straight into the float32 array out; return the frame count.
+
+        out is frames x output channels (at most self.shape[1]); only those channels are read.
+        """
+        n = max(min(len(out), len(self) - start), 0)
+        raw = self.reader.samples[start:start + n, :out.shape[1]]
+        if self.reader.sample_width == 3:
+            out[:n] = self.reader.read(start, start + n)[:, :out.shape[1]] * self.gain
+        elif self.reader.dtype == np.uint8:
+            np.subtract(raw, 128, out=out[:n], dtype=np.float32)
+            out[:n] *= self.gain
+        else:
+            np.multiply(raw, self.gain, out=out[:n], casting='unsafe')
+        return n
+
+    def compute_gain(self, block_size=GAIN_BLOCK_SIZE):
+        """Set the gain so the loudest sample peaks at 1.0, reading the file one block at a time."""
+        peak = 0.0
+        block_frames = max(block_size // self.reader.channels, 1)
+        for start in range(0, len(self), block_frames):
+            block = self.reader.read(start, start + block_frames, self.channel)
+            peak = max(peak, float(np.max(np.abs(block))))
+        self.gain = np.float32(1.0 / peak if peak > 0 else 1.0)
+        return self.gain
@@ -0,0 +1,77 @@
+"""AnnotationStore growth and removal, the visible-marker query and the CSV round trip."""
+import numpy as np
+import pytest
+
+from disi.annotations import MARKER_COLUMNS, AnnotationStore, visible_markers
+
+
+def filled_store(n, capacity=4):
+    store = AnnotationStore(capacity)
+    times = np.arange(n) * 0.5
+    store.add_many(times, times * 100, -times, [f'm{i}' for i in range(n)])
+    return store
+
+
+def test_add_many_grows_past_capacity():
+    store = AnnotationStore(capacity=4)
+    store.add(0.0, 100.0, -3.0, 'first')
+    version = store.version
+    store.add_many(np.arange(1, 11), np.arange(1, 11) * 10, np.zeros(10))
+    assert len(store) == 11 and store.version > version
+    np.testing.assert_array_equal(store.times, np.arange(11))
+    np.testing.assert_array_equal(store.freqs[1:], np.arange(1, 11) * 10)
+    assert store.freqs[0] == 100.0 and store.powers[0] == -3.0
+    assert list(store.labels) == ['first'] + [''] * 10
+    store.add_many([], [], [])
+    assert len(store) == 11
+
+
+def test_remove_a_time_range():
+    store = filled_store(20)
+    store.remove((store.times >= 2) & (store.times < 5))
+    np.testing.assert_array_equal(store.times, np.r_[np.arange(4), np.arange(10, 20)] * 0.5)
+    np.testing.assert_array_equal(store.freqs, store.times * 100)
+    assert list(store.labels) == [f'm{i}' for i in [*range(4), *range(10, 20)]]
+    store.remove([0, len(store) - 1])
+    assert (store.times[0], store.times[-1], len(store)) == (0.5, 9.0, 12)
+    version = store.version
+    store.remove(np.zeros(len(store), dtype=bool))
+    assert store.version == version
+    store.clear()
+    assert len(store) == 0 and len(store.times) == 0
+
+
+def test_visible_markers_cull_to_the_view_and_spread_the_labels():
+    xs = np.arange(1000) * 0.1
+    visible, labelled = visible_markers(xs, 10.0, 20.0, 64)
+    np.testing.assert_array_equal(visible, np.arange(100, 201))
+    assert len(labelled) == 64 and labelled[0] == 100 and labelled[-1] == 200
+    assert np.all(np.diff(labelled) > 0) and np.diff(labelled).max() <= 2
+    visible, labelled = visible_markers(xs, 10.0, 12.0, 64)
+    np.testing.assert_array_equal(labelled, visible)
+    visible, labelled = visible_markers(xs, 200.0, 300.0, 64)
+    assert len(visible) == len(labelled) == 0
+
+
+def test_csv_round_trip(tmp_path):
+    store = filled_store(5)
+    store.add(3.25, 440.0, -12.5, 'comma, "quoted"')
+    path = str(tmp_path / 'markers.csv')
+    store.save_csv(path)
+    with open(path) as f:
+        assert f.readline().strip() == ','.join(MARKER_COLUMNS)
+    loaded = AnnotationStore()
+    assert loaded.load_csv(path) == len(store)
+    for name in ('times', 'freqs', 'powers'):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(store, name))
+    assert list(loaded.labels) == list(store.labels)
+    assert list(tmp_path.iterdir()) == [tmp_path / 'markers.csv']
+
+
+def test_csv_without_the_marker_columns_is_rejected(tmp_path):
+    path = tmp_path / 'other.csv'
+    path.write_text('time_s,value\n1.0,2.0\n')
+    store = AnnotationStore()
+    with pytest.raises(ValueError):
+        store.load_csv(str(path))
+    assert len(store) == 0
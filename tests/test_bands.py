@@ -0,0 +1,86 @@
+"""Filterbank band energies against direct sums of rfft bins, band specs, and the batch band table."""
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+from disi import AnalysisConfig, Filterbank, frame_power
+from disi.batch import analyze_file, run_analyze
+
+SAMPLE_RATE = 44100
+CONFIG = AnalysisConfig()
+
+
+def tone_power(hz):
+    """(freqs, power) of one frame of a pure tone."""
+    t = np.arange(CONFIG.fft_size) / SAMPLE_RATE
+    return frame_power(np.sin(2 * np.pi * hz * t)[None, :], SAMPLE_RATE, CONFIG)
+
+
+@pytest.mark.parametrize('spec, band', [('octave', '1k'), ('third-octave', '1k'), ('third-octave', '4k'),
+                                        ('hum=45-65,tone=900-1100,air=10000-', 'tone')])
+def test_tone_lands_in_its_band(spec, band):
+    hz = 4000 if band == '4k' else 1000
+    freqs, power = tone_power(hz)
+    filterbank = Filterbank(spec)
+    energy = filterbank.energy_db(freqs, power)[0]
+    assert filterbank.names[int(np.nanargmax(energy))] == band
+
+
+def test_tone_lands_in_the_mel_band_around_it():
+    freqs, power = tone_power(1000)
+    filterbank = Filterbank('mel:20:8000')
+    energy = filterbank.energy_db(freqs, power)[0]
+    weights = filterbank.matrix(freqs)
+    band = int(np.nanargmax(energy))
+    covered = freqs[weights[:, band] > 0]
+    assert covered[0] < 1000 < covered[-1]
+
+
+def test_band_energy_is_the_sum_of_its_bins():
+    freqs, power = tone_power(1000)
+    power = power[0] + np.random.default_rng(0).uniform(0, 1e-4, power.shape[1])
+    energy = Filterbank('low=0-500,tone=900-1100,high=5000-').energy_db(freqs, power)
+    for value, (low, high) in zip(energy, [(0, 500), (900, 1100), (5000, np.inf)]):
+        expected = 10 * np.log10(power[(freqs >= low) & (freqs < high)].sum() + 1e-10)
+        assert value == pytest.approx(expected, abs=1e-9)
+
+
+def test_band_specs_parse():
+    assert len(Filterbank('octave')) == 10 and len(Filterbank('third-octave')) == 30
+    mel = Filterbank('mel:10:4000')
+    assert (mel.count, mel.high, mel.names[0]) == (10, 4000.0, 'mel1')
+    assert Filterbank('linear').count == 24
+    custom = Filterbank('hum=45-65, 300-3400, ultrasonic=20000-')
+    assert custom.names == ['hum', '300-3.4k', 'ultrasonic']
+    assert custom.ranges == [(45.0, 65.0), (300.0, 3400.0), (20000.0, None)]
+    assert AnalysisConfig(bands=' octave ').bands == 'octave' and AnalysisConfig(bands=' ').filterbank is None
+
+
+@pytest.mark.parametrize('spec', ['mel:x', 'mel:0', 'linear:4:100:5', '100-50', 'speech=300', 'foo', '-5-10'])
+def test_bad_band_specs_raise(spec):
+    with pytest.raises(ValueError):
+        Filterbank(spec)
+    with pytest.raises(ValueError):
+        AnalysisConfig(bands=spec)
+
+
+def test_batch_rejects_a_bad_band_spec(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        run_analyze([str(tmp_path), '--bands', 'mel:0'])
+    assert 'mel:0' in capsys.readouterr().err
+
+
+def test_batch_writes_the_band_table(tmp_path):
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    source = str(tmp_path / 'tone.wav')
+    wavfile.write(source, SAMPLE_RATE, (0.5 * np.sin(2 * np.pi * 1000 * t)).astype(np.float32))
+    config = AnalysisConfig(bands='low=0-500,tone=900-1100')
+    record = analyze_file(source, str(tmp_path / 'out' / 'tone'), 'csv', config)
+    with open(record['bands_output']) as f:
+        assert f.readline().strip() == 'time_s,band_db_low,band_db_tone'
+    table = np.loadtxt(record['bands_output'], delimiter=',', skiprows=1)
+    assert table.shape == (CONFIG.frame_count(SAMPLE_RATE), 3)
+    frame = np.sin(2 * np.pi * 1000 * t[5 * 1024:6 * 1024])  # Row 5; the file is normalized to peak 1
+    freqs, power = frame_power(frame[None, :], SAMPLE_RATE, config)
+    np.testing.assert_allclose(table[5, 1:], config.filterbank.energy_db(freqs, power)[0], atol=1e-3)
+    assert table[5, 2] > table[5, 1] + 30
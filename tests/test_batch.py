@@ -0,0 +1,54 @@
+"""Batch resume: reruns skip finished files until the file, the format or the config changes."""
+import os
+import json
+
+import numpy as np
+from scipy.io import wavfile
+
+from disi import AnalysisConfig
+from disi.batch import is_done, run_analyze
+
+SAMPLE_RATE = 8000
+
+
+def write_tone(path, hz):
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    wavfile.write(path, SAMPLE_RATE, (0.5 * np.sin(2 * np.pi * hz * t)).astype(np.float32))
+
+
+def analyze(tmp_path, *args):
+    """Run the batch analyser on tmp_path/in and return (analysed, skipped) from its summary."""
+    assert run_analyze([str(tmp_path / 'in'), '-o', str(tmp_path / 'out'), '-j', '1', *args]) == 0
+    with open(tmp_path / 'out' / 'summary.json') as f:
+        summary = json.load(f)
+    return summary['analysed'], summary['skipped']
+
+
+def test_rerun_skips_until_the_file_format_or_config_changes(tmp_path):
+    os.makedirs(tmp_path / 'in')
+    source = str(tmp_path / 'in' / 'take.wav')
+    output_base = str(tmp_path / 'out' / 'take')
+    write_tone(source, 440)
+    assert analyze(tmp_path) == (1, 0)
+    assert is_done(source, output_base, 'csv') is not None
+    assert analyze(tmp_path) == (0, 1)
+
+    write_tone(source, 880)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert is_done(source, output_base, 'csv') is None
+    assert analyze(tmp_path) == (1, 0)
+    assert analyze(tmp_path) == (0, 1)
+
+    assert is_done(source, output_base, 'npy') is None
+    assert analyze(tmp_path, '-f', 'npy') == (1, 0)
+    assert analyze(tmp_path, '-f', 'npy') == (0, 1)
+
+    assert is_done(source, output_base, 'npy', AnalysisConfig(512)) is None
+    assert analyze(tmp_path, '-f', 'npy', '--fft-size', '512') == (1, 0)
+    assert analyze(tmp_path, '-f', 'npy', '--fft-size', '512', '--keep-silence') == (1, 0)
+    assert analyze(tmp_path, '-f', 'npy', '--fft-size', '512', '--keep-silence') == (0, 1)
+
+    os.remove(output_base + '.npy')
+    assert analyze(tmp_path, '-f', 'npy', '--fft-size', '512', '--keep-silence') == (1, 0)
+    assert analyze(tmp_path, '-f', 'npy', '--fft-size', '512', '--keep-silence', '--force') == (1, 0)
@@ -0,0 +1,51 @@
+"""AnalysisCache entries that cannot be read back are misses, not errors."""
+import json
+
+import numpy as np
+
+from disi import ActivityIndex, AnalysisCache
+
+
+def store_entry(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    cache.store('entry', np.arange(5.0), np.ones((5, 1)), np.ones((5, 1)), 0.5)
+    return cache, tmp_path / 'entry.json'
+
+
+def test_round_trip(tmp_path):
+    cache, _ = store_entry(tmp_path)
+    timestamps, max_freqs, max_powers, gain = cache.load('entry')
+    np.testing.assert_array_equal(timestamps, np.arange(5.0))
+    assert max_freqs.shape == (5, 1) and gain == 0.5
+
+
+def test_metadata_without_gain_is_a_miss(tmp_path):
+    cache, meta_path = store_entry(tmp_path)
+    meta = json.loads(meta_path.read_text())
+    del meta['gain']
+    meta_path.write_text(json.dumps(meta))
+    assert cache.load('entry') is None
+
+
+def test_truncated_metadata_is_a_miss(tmp_path):
+    cache, meta_path = store_entry(tmp_path)
+    meta_path.write_text(meta_path.read_text()[:10])
+    assert cache.load('entry') is None
+
+
+def test_activity_round_trip(tmp_path):
+    levels = np.array([-120, -20, -10, -20, -120, -5, -120], dtype=np.float32)
+    activity = ActivityIndex(levels, 0.1, -30)
+    cache = AnalysisCache(str(tmp_path))
+    cache.store('entry', np.arange(7.0), np.ones((7, 1)), np.ones((7, 1)), 0.5, activity=activity)
+    stored_levels, stored_onsets = cache.load_activity('entry')
+    np.testing.assert_array_equal(stored_levels, levels)
+    np.testing.assert_array_equal(stored_onsets, activity.onsets)
+    reloaded = ActivityIndex(stored_levels, 0.1, -30, stored_onsets)
+    np.testing.assert_array_equal(reloaded.onset_times, activity.onset_times)
+    np.testing.assert_array_equal(reloaded.active, activity.active)
+
+
+def test_entry_without_activity_has_none(tmp_path):
+    cache, _ = store_entry(tmp_path)
+    assert cache.load_activity('entry') is None
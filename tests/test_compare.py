@@ -0,0 +1,56 @@
+"""Comparison tracks passed back from worker processes through shared memory."""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+from disi import AnalysisConfig, MappedAudio, WavReader, channel_mixes, compute_peak_tracks
+from disi.compare import analyze_to_shared_memory, discard_result, receive_tracks
+
+SAMPLE_RATE = 8000
+CONFIG = AnalysisConfig(fft_size=512, peaks=2)
+
+
+def write_take(path, seconds=2.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    left = 0.5 * np.sin(2 * np.pi * (300 + 200 * t) * t)
+    right = 0.3 * np.sin(2 * np.pi * 1200 * t) + 0.1 * np.sin(2 * np.pi * 2500 * t)
+    wavfile.write(path, SAMPLE_RATE, np.stack([left, right], axis=1).astype(np.float32))
+    return path
+
+
+def assert_unlinked(header):
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=header['shm'])
+
+
+def test_worker_tracks_match_in_process_analysis(tmp_path):
+    paths = [write_take(str(tmp_path / f'take{i}.wav'), seconds) for i, seconds in enumerate((2.0, 1.3))]
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as pool:
+        headers = list(pool.map(analyze_to_shared_memory, paths, [CONFIG] * len(paths)))
+    for path, header in zip(paths, headers):
+        received = receive_tracks(path, header)
+        assert_unlinked(header)
+        reader = WavReader(path)
+        views, _, mix = channel_mixes(reader.channels)
+        data = MappedAudio(reader)
+        data.compute_gain()
+        timestamps, freqs, powers = compute_peak_tracks(data, SAMPLE_RATE, CONFIG, mix=mix)
+        assert received.views == views and received.freqs.shape == (len(timestamps), len(views), CONFIG.peaks)
+        assert received.duration == pytest.approx(reader.n_frames / SAMPLE_RATE)
+        np.testing.assert_array_equal(received.timestamps, timestamps)
+        np.testing.assert_array_equal(received.freqs, np.reshape(freqs, received.freqs.shape))
+        np.testing.assert_array_equal(received.powers, np.reshape(powers, received.powers.shape))
+
+
+def test_discarded_results_are_unlinked(tmp_path):
+    path = write_take(str(tmp_path / 'take.wav'), 0.5)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        future = pool.submit(analyze_to_shared_memory, path, CONFIG)
+        header = future.result()
+    discard_result(future)
+    assert_unlinked(header)
+    discard_result(future)  # A second release finds nothing to unlink
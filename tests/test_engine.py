@@ -0,0 +1,136 @@
+"""Checks of the batched engine against the per-chunk welch analysis it replaced, and of silence skipping."""
+import numpy as np
+from scipy.signal import welch
+
+from disi import CHUNK_SIZE, AnalysisConfig, activity_index, channel_mixes, compute_peak_tracks, frame_levels
+
+SAMPLE_RATE = 44100
+
+
+def signal(seconds=2.0, seed=0):
+    """Two drifting tones in noise, with a partial last frame."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE) + 300) / SAMPLE_RATE
+    tones = np.sin(2 * np.pi * (440 + 200 * t) * t) + 0.5 * np.sin(2 * np.pi * 3150 * t)
+    return (tones + 0.05 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def welch_tracks(data, chunk_size=1024):
+    """The original analysis: one welch call per chunk, then argmax in dB."""
+    timestamps, max_freqs, max_powers = [], [], []
+    for i in range(0, len(data), chunk_size):
+        chunk = data[i:i + chunk_size]
+        nperseg = min(chunk_size, len(chunk))
+        freqs, psd = welch(chunk, fs=SAMPLE_RATE, window='hann', nperseg=nperseg, noverlap=nperseg // 2,
+                           scaling='spectrum')
+        magnitude_db = 10 * np.log10(psd + 1e-10)
+        max_idx = np.argmax(magnitude_db)
+        timestamps.append(i / SAMPLE_RATE)
+        max_freqs.append(freqs[max_idx])
+        max_powers.append(magnitude_db[max_idx])
+    return np.array(timestamps), np.array(max_freqs), np.array(max_powers)
+
+
+def test_matches_welch_without_refinement():
+    data = signal()
+    expected = welch_tracks(data)
+    config = AnalysisConfig(interpolation='none')
+    timestamps, max_freqs, max_powers = compute_peak_tracks(data, SAMPLE_RATE, config, block_frames=16)
+    np.testing.assert_array_equal(timestamps, expected[0])
+    np.testing.assert_array_equal(max_freqs, expected[1])
+    np.testing.assert_allclose(max_powers, expected[2], rtol=0, atol=1e-6)
+
+
+def test_channel_views_match_mono_analysis():
+    left, right = signal(seed=2), signal(seed=3)[::-1].copy()
+    stereo = np.stack([left, right], axis=1)
+    config = AnalysisConfig(silence_db=None, peaks=2)
+    views, _, mix = channel_mixes(2)
+    timestamps, max_freqs, max_powers = compute_peak_tracks(stereo, SAMPLE_RATE, config, block_frames=16, mix=mix)
+    assert max_freqs.shape == (len(timestamps), len(views), 2)
+    for v, mono in enumerate((left, right, (left + right) / 2, (left - right) / 2)):
+        expected = compute_peak_tracks(mono, SAMPLE_RATE, config, block_frames=16)
+        np.testing.assert_allclose(max_freqs[:, v], expected[1], rtol=0, atol=1e-6)
+        np.testing.assert_allclose(max_powers[:, v], expected[2], rtol=0, atol=1e-4)
+
+
+def test_default_config_matches_welch():
+    data = signal(seed=1)
+    expected = welch_tracks(data)
+    _, max_freqs, max_powers = compute_peak_tracks(data, SAMPLE_RATE)
+    np.testing.assert_array_equal(max_freqs, expected[1])
+    np.testing.assert_allclose(max_powers, expected[2], rtol=0, atol=1e-6)
+
+
+def test_quiet_recording_is_not_silent():
+    data = signal(seed=1) * np.float32(1e-4)  # About -80 dBFS throughout
+    expected = welch_tracks(data)
+    _, max_freqs, max_powers = compute_peak_tracks(data, SAMPLE_RATE)
+    np.testing.assert_array_equal(max_freqs, expected[1])
+    np.testing.assert_allclose(max_powers, expected[2], rtol=0, atol=1e-4)
+
+
+def test_refinement_is_opt_in_and_finer():
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    data = np.sin(2 * np.pi * 1000.0 * t)  # Between bins 23 (990.5 Hz) and 24 (1033.6 Hz)
+    config = AnalysisConfig(silence_db=None, interpolation='gaussian')
+    _, coarse, _ = compute_peak_tracks(data, SAMPLE_RATE, AnalysisConfig(silence_db=None))
+    _, fine, _ = compute_peak_tracks(data, SAMPLE_RATE, config)
+    assert np.abs(coarse[:-1] - 1000).max() > 5
+    assert np.abs(fine[:-1] - 1000).max() < 1
+
+
+def test_empty_signal_has_an_empty_activity_index():
+    activity = activity_index(np.zeros(0, dtype=np.float32), SAMPLE_RATE)
+    assert len(activity.active) == 0 and len(activity.regions) == 0 and len(activity.onsets) == 0
+    assert activity.active_fraction == 0.0 and activity.next_event(0.0) is None
+
+
+def test_frame_levels_of_integer_samples_do_not_overflow():
+    data = signal(seed=4)
+    pcm = np.round(data / np.abs(data).max() * 32767).astype(np.int16)
+    config = AnalysisConfig(hop=300)
+    np.testing.assert_allclose(frame_levels(pcm, config), frame_levels(pcm.astype(np.float64), config), atol=1e-4)
+
+
+BURSTS_S = (0.5, 2.0, 3.2)  # Starts of the 0.3 s tone bursts in bursts()
+
+
+def bursts():
+    """Tone bursts in four seconds of silence."""
+    t = np.arange(4 * SAMPLE_RATE) / SAMPLE_RATE
+    on = np.zeros(len(t), dtype=bool)
+    for start in BURSTS_S:
+        on |= (t >= start) & (t < start + 0.3)
+    return np.where(on, np.sin(2 * np.pi * 1000 * t), 0).astype(np.float32)
+
+
+def test_silent_frames_are_skipped():
+    data = bursts()
+    activity = activity_index(data, SAMPLE_RATE)
+    timestamps, max_freqs, max_powers = compute_peak_tracks(data, SAMPLE_RATE)
+    _, all_freqs, all_powers = compute_peak_tracks(data, SAMPLE_RATE, AnalysisConfig(silence_db=None))
+    assert len(activity.regions) == len(BURSTS_S) and 0.1 < activity.active_fraction < 0.5
+    np.testing.assert_array_equal(np.isnan(max_powers), ~activity.active)
+    assert np.isnan(max_freqs[np.searchsorted(timestamps, 1.4)])
+    np.testing.assert_array_equal(max_freqs[activity.active], all_freqs[activity.active])
+    np.testing.assert_array_equal(max_powers[activity.active], all_powers[activity.active])
+
+
+def test_onsets_land_at_the_bursts():
+    activity = activity_index(bursts(), SAMPLE_RATE)
+    hop_s = CHUNK_SIZE / SAMPLE_RATE
+    assert len(activity.onset_times) == len(BURSTS_S)
+    np.testing.assert_allclose(activity.onset_times, BURSTS_S, atol=hop_s)
+
+
+def test_events_step_between_onsets():
+    activity = activity_index(bursts(), SAMPLE_RATE)
+    first, second, third = activity.onset_times
+    assert activity.next_event(0.0) == first
+    assert activity.next_event(first) == second
+    assert activity.next_event(third) is None
+    assert activity.previous_event(third) == second
+    assert activity.previous_event(second + 0.5) == second
+    assert activity.previous_event(second + 0.1) == first  # Within the tolerance, so it keeps going back
+    assert activity.previous_event(first) is None
@@ -0,0 +1,28 @@
+"""MinMaxPyramid grown block by block must equal one built at once."""
+import numpy as np
+
+from disi.plotting import MinMaxPyramid
+
+
+def assert_same_levels(grown, built):
+    assert len(grown.levels) == len(built.levels)
+    for grown_level, built_level in zip(grown.levels, built.levels):
+        for grown_array, built_array in zip(grown_level, built_level):
+            np.testing.assert_array_equal(grown_array, built_array)
+
+
+def test_extend_matches_full_build():
+    rng = np.random.default_rng(0)
+    x = np.arange(50000) * 0.01
+    for y in (rng.standard_normal(len(x)), rng.standard_normal((len(x), 3))):
+        y[rng.random(len(x)) < 0.1] = np.nan  # Missing peaks
+        pyramid = MinMaxPyramid(x[:0], y[:0])
+        n = 0
+        while n < len(x):
+            n = min(len(x), n + int(rng.integers(1, 3000)))
+            pyramid.extend(x[:n], y[:n])
+            if n in (1000, len(x)) or rng.random() < 0.1:
+                assert_same_levels(pyramid, MinMaxPyramid(x[:n], y[:n]))
+        for view in ((0, 500, 800), (10, 12, 800), (0, 1, 10)):
+            for got, expected in zip(pyramid.visible(*view), MinMaxPyramid(x, y).visible(*view)):
+                np.testing.assert_array_equal(got, expected)
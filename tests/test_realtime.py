@@ -0,0 +1,185 @@
+"""FileSource playback and looping driven by hand through a stand-in sounddevice module, and FakeDeviceSource looping."""
+import sys
+import time
+import types
+
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+from disi import AnalysisConfig, MappedAudio, WavReader, frame_spectra_db
+from disi.realtime import (FakeDeviceSource, FileSource, LatestMailbox, LoopRegion, SampleRing, SpectrogramRing,
+                           SpectrumAnalyzer, SpectrumCache, loop_view, precompute_loop_spectra, spectrum_key)
+
+BLOCK = 256
+
+
+class CallbackStop(Exception):
+    pass
+
+
+class OutputStream:
+    """Records the callback instead of opening a device; step() runs it for one buffer."""
+
+    def __init__(self, samplerate, channels, dtype, callback, **kwargs):
+        self.channels = channels
+        self.callback = callback
+        self.finished = False
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+    def step(self):
+        out = np.full((BLOCK, self.channels), np.nan, dtype=np.float32)
+        status = types.SimpleNamespace(output_underflow=False, output_overflow=False)
+        try:
+            self.callback(out, BLOCK, types.SimpleNamespace(currentTime=0), status)
+        except CallbackStop:
+            self.finished = True
+        return out
+
+
+@pytest.fixture
+def sounddevice(monkeypatch):
+    module = types.ModuleType('sounddevice')
+    module.CallbackStop = CallbackStop
+    module.query_devices = lambda device=None, kind=None: {'max_output_channels': 2}
+    module.OutputStream = OutputStream
+    monkeypatch.setitem(sys.modules, 'sounddevice', module)
+    return module
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = str(tmp_path / 'ramp.wav')
+    wavfile.write(path, 8000, (np.arange(8000, dtype=np.float32) / 8000)[:, None].repeat(2, axis=1))
+    data = MappedAudio(WavReader(path))
+    data.compute_gain()
+    return data
+
+
+def expected(data, start, stop):
+    out = np.zeros((stop - start, 1), dtype=np.float32)
+    data.read_into(start, out)
+    return out[:, 0]
+
+
+def play(source):
+    """Start source on a ring and return a function that plays one buffer."""
+    source.start(SampleRing(8 * BLOCK, source.channels))
+    return lambda: source.stream.step()[:, 0]
+
+
+def test_range_change_moves_start_and_end(sounddevice, audio):
+    source = FileSource(audio, 8000)
+    step = play(source)
+    np.testing.assert_array_equal(step(), expected(audio, 0, BLOCK))
+    source.seek(1000, 1000 + BLOCK + 100)
+    np.testing.assert_array_equal(step(), expected(audio, 1000, 1000 + BLOCK))
+    last = step()
+    np.testing.assert_array_equal(last[:100], expected(audio, 1000 + BLOCK, 1000 + BLOCK + 100))
+    assert source.stream.finished and not last[100:].any()
+
+
+def test_seek_keeps_a_pending_end(sounddevice, audio):
+    source = FileSource(audio, 8000)
+    step = play(source)
+    step()
+    source.seek(end=3 * BLOCK)
+    source.seek(2 * BLOCK)  # Scrubbing before the new end was applied must not undo it
+    np.testing.assert_array_equal(step(), expected(audio, 2 * BLOCK, 3 * BLOCK))
+    step()
+    assert source.stream.finished
+
+
+def test_fake_device_wraps_files_shorter_than_a_block(tmp_path, audio):
+    path = str(tmp_path / 'short.wav')
+    wavfile.write(path, 8000, np.asarray(audio[:100]))
+    source = FakeDeviceSource(MappedAudio(WavReader(path)), 8000, blocksize=BLOCK, realtime=False)
+    ring = SampleRing(8 * BLOCK, source.channels)
+    write = ring.write
+
+    def write_four_blocks(samples):
+        write(samples)
+        if ring.write_pos >= 4 * BLOCK:
+            source.stop_event.set()
+
+    ring.write = write_four_blocks
+    source.run(ring)
+    assert ring.write_pos == 4 * BLOCK and not source.finished
+    got = np.zeros((4 * BLOCK, source.channels), dtype=np.float32)
+    ring.read_at(0, got)
+    np.testing.assert_array_equal(got[:, 0], np.tile(np.asarray(audio[:100])[:, 0], 11)[:4 * BLOCK])
+
+
+class RecordingSpectrogram(SpectrogramRing):
+    """Remembers the frame index of every column written and counts clears."""
+
+    def __init__(self, capacity, n_bins):
+        super().__init__(capacity, n_bins)
+        self.frames = []
+        self.clears = 0
+
+    def write(self, frame_index, magnitude_db):
+        super().write(frame_index, magnitude_db)
+        self.frames.append(frame_index)
+
+    def clear(self):
+        super().clear()
+        self.clears += 1
+
+
+LOOP_CONFIG = AnalysisConfig(fft_size=BLOCK)
+
+
+def test_loop_region_reads_what_is_played(sounddevice, audio):
+    region = LoopRegion(audio, 1000, 1800, 2, crossfade=100)
+    source = FileSource(audio, 8000, start=1000)
+    source.set_loop(region)
+    step = play(source)
+    played = np.concatenate([step() for _ in range(10)])
+    expected_played = np.zeros((len(played), 2), dtype=np.float32)
+    region.read_into(audio, 1000, expected_played)
+    np.testing.assert_array_equal(played, expected_played[:, 0])
+    assert source.loops == 3
+
+
+def test_precomputed_seam_frames_use_the_crossfaded_samples(audio):
+    region = LoopRegion(audio, 1000, 1800, 2, crossfade=100)
+    view = ('ch1', np.array([1.0, 0.0], dtype=np.float32))
+    cache = SpectrumCache()
+    assert precompute_loop_spectra(audio, 8000, region, view, cache, LOOP_CONFIG) == 4  # Frames 4 to 7
+    for index in (4, 7):  # Inside the loop, and across its seam
+        played = np.zeros((BLOCK, 2), dtype=np.float32)
+        region.read_into(audio, index * BLOCK, played)
+        _, expected_db = frame_spectra_db(played[None, :, 0], 8000, LOOP_CONFIG)
+        key = spectrum_key(index, 8000, loop_view('ch1', index, region, LOOP_CONFIG), LOOP_CONFIG)
+        np.testing.assert_allclose(cache.get(key)[1], expected_db[0], rtol=0, atol=1e-4)
+    assert cache.get(spectrum_key(7, 8000, 'ch1', LOOP_CONFIG)) is None  # The file's own frame 7 is not replaced
+
+
+def test_spectrogram_builds_up_across_loop_wraps(sounddevice, audio):
+    region = LoopRegion(audio, 1000, 1800, 2, crossfade=100)
+    source = FileSource(audio, 8000, start=1000)
+    source.set_loop(region)
+    ring = SampleRing(8 * BLOCK, source.channels)
+    spectrogram = RecordingSpectrogram(64, LOOP_CONFIG.plan(8000).n_bins)
+    analyzer = SpectrumAnalyzer(ring, 8000, LatestMailbox(), SpectrumCache(), ('ch1', np.array([1.0, 0.0])),
+                                position_offset=1000, config=LOOP_CONFIG, spectrogram=spectrogram)
+    analyzer.start()
+    source.start(ring, analyzer)
+    try:
+        for _ in range(12):
+            source.stream.step()
+            time.sleep(0.05)
+    finally:
+        analyzer.stop()
+    assert source.loops >= 3 and spectrogram.clears == 1
+    passes = [spectrogram.frames[i:i + 4] for i in range(0, len(spectrogram.frames) - 3, 4)]
+    assert len(passes) >= 3 and all(frames == [4, 5, 6, 7] for frames in passes)
@@ -0,0 +1,156 @@
+"""Spectrum streaming: frame encoding, message framing and a loopback server with a slow client."""
+import json
+import socket
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from disi import AnalysisConfig
+from disi.stream import (FrameDecoder, SpectrumServer, decode_codes, encode_codes, message, read_message,
+                         read_message_async)
+
+SAMPLE_RATE = 8000
+
+
+def make_hello(fft_size=1024):
+    config = AnalysisConfig(fft_size)
+    return {'name': 'test', 'view': 'ch1', 'sample_rate': SAMPLE_RATE, 'config': config.params(),
+            'bins': config.plan(SAMPLE_RATE).n_bins}
+
+
+def spectra(n, bins, seed=0):
+    """Slowly changing spectra in dB, as deltas expect."""
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(-90, -10, bins)
+    return [start + drift for drift in np.cumsum(rng.normal(0, 0.5, (n, bins)), axis=0)]
+
+
+class Recorder:
+    """Stands in for a ClientFeed and keeps every frame offered to it."""
+
+    def __init__(self):
+        self.frames = []
+
+    def offer(self, frame):
+        self.frames.append(frame)
+
+
+@pytest.mark.parametrize('encoding', ['uint8', 'float16'])
+def test_key_and_delta_frames_round_trip(encoding):
+    hello = make_hello()
+    server = SpectrumServer(hello, encoding=encoding, delta=True)
+    recorder = Recorder()
+    server.clients.add(recorder)
+    sent = spectra(5, hello['bins'])
+    for i, db in enumerate(sent):
+        server.publish(db, i * 0.1, 1000.0 + i)
+    first, *rest = recorder.frames
+    assert first.delta is None and all(frame.delta is not None for frame in rest)
+
+    decoder = FrameDecoder(server.hello)
+    payloads = [first.key] + [frame.delta for frame in rest]
+    for i, (payload, db) in enumerate(zip(payloads, sent)):
+        seq, time_s, captured, decoded = decoder.decode(payload[4:])
+        assert (seq, time_s, captured) == (i + 1, i * 0.1, 1000.0 + i)
+        np.testing.assert_array_equal(decoded, decode_codes(encode_codes(db, encoding), encoding))
+    assert decoder.missed == 0
+    np.testing.assert_allclose(decoded, sent[-1], atol=0.3 if encoding == 'uint8' else 0.05)
+
+
+def test_key_frame_resumes_after_a_missed_frame():
+    server = SpectrumServer(make_hello(), delta=True)
+    recorder = Recorder()
+    server.clients.add(recorder)
+    sent = spectra(3, server.hello['bins'])
+    for i, db in enumerate(sent):
+        server.publish(db, i * 0.1, 0.0)
+    decoder = FrameDecoder(server.hello)
+    decoder.decode(recorder.frames[0].key[4:])
+    with pytest.raises(ValueError):
+        decoder.decode(recorder.frames[2].delta[4:])
+    _, _, _, decoded = decoder.decode(recorder.frames[2].key[4:])
+    np.testing.assert_array_equal(decoded, decode_codes(encode_codes(sent[2], 'uint8'), 'uint8'))
+    assert decoder.missed == 1
+
+
+def fragmented_stream():
+    """Three messages as one byte string, and the chunks it arrives in, split across headers and bodies."""
+    payloads = [b'H' + json.dumps(make_hello()).encode(), b'', b'F' + bytes(range(256)) * 3]
+    data = b''.join(message(payload) for payload in payloads)
+    cuts = [0, 1, 3, 6, 50, 51, len(data) - 1, len(data)]
+    return payloads, [data[a:b] for a, b in zip(cuts, cuts[1:])]
+
+
+def test_read_message_reassembles_fragments():
+    payloads, chunks = fragmented_stream()
+    reader, writer = socket.socketpair()
+
+    def send():
+        for chunk in chunks:
+            writer.sendall(chunk)
+            threading.Event().wait(0.01)
+        writer.close()
+
+    thread = threading.Thread(target=send)
+    thread.start()
+    try:
+        assert [read_message(reader) for _ in payloads] == payloads
+        assert read_message(reader) is None
+    finally:
+        thread.join()
+        reader.close()
+
+
+def test_read_message_async_reassembles_fragments():
+    payloads, chunks = fragmented_stream()
+
+    async def main():
+        reader = asyncio.StreamReader()
+
+        async def read_all():
+            return [await read_message_async(reader) for _ in payloads]
+
+        received = asyncio.ensure_future(read_all())
+        for chunk in chunks:
+            reader.feed_data(chunk)
+            await asyncio.sleep(0)
+        reader.feed_eof()
+        return await received, await read_message_async(reader)
+
+    assert asyncio.run(main()) == (payloads, None)
+
+
+def test_stalled_client_drops_frames_without_holding_up_a_fast_one():
+    hello = make_hello(8192)
+    n_frames = 300
+
+    async def main():
+        server = SpectrumServer(hello)
+        await server.start('127.0.0.1', 0)
+        stalled = socket.socket()
+        stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        stalled.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(stalled, ('127.0.0.1', server.port))
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+        try:
+            decoder = FrameDecoder(json.loads((await read_message_async(reader))[1:]))
+            while len(server.clients) < 2:
+                await asyncio.sleep(0.01)
+            received = []
+            for i, db in enumerate(spectra(n_frames, hello['bins'])):
+                server.publish(db, i * 0.1, 0.0)
+                received.append(decoder.decode(await read_message_async(reader))[0])
+            feeds = sorted(server.clients, key=lambda client: client.sent)
+            return received, decoder.missed, [(client.sent, client.dropped) for client in feeds]
+        finally:
+            writer.close()
+            stalled.close()
+            await server.close()
+
+    received, missed, ((stalled_sent, stalled_dropped), (fast_sent, fast_dropped)) = \
+        asyncio.run(asyncio.wait_for(main(), 60))
+    assert received == list(range(1, n_frames + 1)) and missed == 0
+    assert (fast_sent, fast_dropped) == (n_frames, 0)
+    assert stalled_sent < n_frames and stalled_dropped > 0
@@ -0,0 +1,109 @@
+"""WavReader and MappedAudio against hand-built files of each sample width and container."""
+import struct
+
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+from disi import MappedAudio, WavReader
+from disi.wav import W64_GUID_SUFFIX, W64_RIFF_GUID
+
+SAMPLE_RATE = 8000
+
+
+def fmt_chunk(channels, bits, format_tag=1):
+    block_align = channels * bits // 8
+    return struct.pack('<HHIIHH', format_tag, channels, SAMPLE_RATE, SAMPLE_RATE * block_align, block_align, bits)
+
+
+def pcm(samples, bits):
+    """Little-endian PCM bytes of integer samples (frames x channels); 8-bit is offset binary."""
+    samples = np.asarray(samples, dtype=np.int64)
+    if bits == 8:
+        return (samples + 128).astype(np.uint8).tobytes()
+    if bits == 24:
+        return (samples.astype('<i4').view(np.uint8).reshape(samples.shape + (4,))[..., :3]).tobytes()
+    return samples.astype('<i2').tobytes()
+
+
+def write_riff(path, samples, bits):
+    fmt = fmt_chunk(samples.shape[1], bits)
+    data = pcm(samples, bits)
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'data' + struct.pack('<I', len(data)) + data
+    path.write_bytes(b'RIFF' + struct.pack('<I', len(body)) + body)
+    return str(path)
+
+
+def ramp(bits, frames=300, channels=2):
+    """Samples sweeping the full signed range of the sample width, different in each channel."""
+    top = 1 << (bits - 1)
+    values = np.linspace(-top, top - 1, frames).astype(np.int64)
+    return np.stack([values, values[::-1]][:channels], axis=1)
+
+
+@pytest.mark.parametrize('bits', [8, 16, 24])
+def test_read_into_matches_slicing(tmp_path, bits):
+    samples = ramp(bits)
+    audio = MappedAudio(WavReader(write_riff(tmp_path / f'{bits}.wav', samples, bits)))
+    audio.compute_gain()
+    np.testing.assert_allclose(audio[0:len(samples)], samples / (1 << (bits - 1)), rtol=0, atol=1e-6)
+    for start, frames, channels in ((0, 300, 2), (7, 50, 1), (290, 20, 2)):
+        out = np.full((frames, channels), np.nan, dtype=np.float32)
+        n = audio.read_into(start, out)
+        assert n == min(frames, len(samples) - start)
+        np.testing.assert_array_equal(out[:n], audio[start:start + n][:, :channels])
+
+
+def write_rf64(path, fmt, data, magic=b'RF64'):
+    """An RF64/BW64 file whose RIFF and data sizes are left to the ds64 chunk, with an odd-sized chunk before data."""
+    ds64 = struct.pack('<QQQI', 0, len(data), 0, 0)
+    chunks = (b'ds64' + struct.pack('<I', len(ds64)) + ds64 + b'fmt ' + struct.pack('<I', len(fmt)) + fmt +
+              b'bext' + struct.pack('<I', 3) + b'abc\0' + b'data' + struct.pack('<I', 0xFFFFFFFF) + data)
+    path.write_bytes(magic + struct.pack('<I', 0xFFFFFFFF) + b'WAVE' + chunks)
+    return str(path)
+
+
+def w64_chunk(name, body):
+    """A Wave64 chunk: GUID, 64-bit size including the 24-byte header, body padded to 8 bytes."""
+    return name + W64_GUID_SUFFIX + struct.pack('<Q', 24 + len(body)) + body + bytes(-len(body) % 8)
+
+
+def write_w64(path, fmt, data):
+    """A Wave64 file with an unaligned chunk between fmt and data."""
+    chunks = w64_chunk(b'fmt ', fmt) + w64_chunk(b'junk', b'12345') + w64_chunk(b'data', data)
+    path.write_bytes(W64_RIFF_GUID + struct.pack('<Q', 40 + len(chunks)) + b'wave' + W64_GUID_SUFFIX + chunks)
+    return str(path)
+
+
+@pytest.mark.parametrize('container', ['rf64', 'bw64', 'w64'])
+@pytest.mark.parametrize('dtype, bits, format_tag', [('<i2', 16, 1), ('<f4', 32, 3)])
+def test_rf64_and_w64_match_scipy(tmp_path, container, dtype, bits, format_tag):
+    rng = np.random.default_rng(bits)
+    frames, channels = 1001, 3
+    samples = rng.uniform(-0.9, 0.9, (frames, channels))
+    samples = (samples * 32767).astype(dtype) if bits == 16 else samples.astype(dtype)
+    reference = str(tmp_path / 'reference.wav')
+    wavfile.write(reference, SAMPLE_RATE, samples)
+    fmt, data = fmt_chunk(channels, bits, format_tag), samples.tobytes()
+    if container == 'w64':
+        path = write_w64(tmp_path / 'audio.w64', fmt, data)
+    else:
+        path = write_rf64(tmp_path / f'{container}.wav', fmt, data, container.upper().encode())
+
+    reader = WavReader(path)
+    assert (reader.sample_rate, reader.channels, reader.n_frames) == (SAMPLE_RATE, channels, frames)
+    expected = wavfile.read(reference)[1].astype(np.float32)
+    audio = MappedAudio(reader)
+    np.testing.assert_array_equal(audio[0:frames], expected)
+    np.testing.assert_array_equal(MappedAudio(reader, channel=1)[10:20], expected[10:20, 1])
+    audio.compute_gain()
+    np.testing.assert_allclose(audio[0:frames], expected / np.abs(expected).max(), rtol=1e-6)
+
+
+def test_rf64_without_ds64_is_rejected(tmp_path):
+    fmt, data = fmt_chunk(1, 16), bytes(20)
+    path = tmp_path / 'broken.wav'
+    path.write_bytes(b'RF64' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt +
+                     b'data' + struct.pack('<I', 0xFFFFFFFF) + data)
+    with pytest.raises(ValueError):
+        WavReader(str(path))